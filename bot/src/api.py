@@ -1,22 +1,98 @@
+import asyncio
+
 import aiofiles
 import aiohttp
 
+from src import log
 from src.config import settings
 
 
-async def get_video_from_flow(start_time: int, end_time: int) -> str:
+async def get_video_from_flow(
+    start_time: int, end_time: int, flow: str = "main"
+) -> str:
+    """
+    Download a clip of the flow, from the local trs archive when CLIP_URL is
+    set, falling back to the remote archive.
+
+    :param start_time: Start of the clip, seconds since epoch
+    :param end_time: End of the clip, seconds since epoch
+    :param flow: Name of the flow in trs
+    :return: Path to the saved clip, ".mp4" or ".m4a" when trs only archives the audio
+    """
     dur = min(100, end_time - start_time)
+
+    if settings.CLIP_URL:
+        try:
+            return await _get_local_clip(flow, start_time, dur)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.warning(
+                f"Local clip unavailable, using the remote archive: {e}"
+            )
+
     ENDPOINT = (
         settings.REQUEST_URL
         + f"/archive-{start_time}-{dur}.mp4?token={settings.TOKEN}"
     )
-    save_path = f"data/{start_time}-{dur}.mp4"
+    save_path = f"data/{flow}-{start_time}-{dur}.mp4"
 
     async with aiohttp.ClientSession() as session:
         async with session.get(ENDPOINT) as response:
             response.raise_for_status()
-            async with aiofiles.open(save_path, "wb") as f:
-                while chunk := await response.content.read(1024 * 1024):
-                    await f.write(chunk)
+            await _save(response, save_path)
+
+    return save_path
+
+
+async def _get_local_clip(flow: str, start_time: int, dur: int) -> str:
+    """
+    Download a clip from the rolling archive of trs.
+
+    :param flow: Name of the flow in trs
+    :param start_time: Start of the clip, seconds since epoch
+    :param dur: Duration of the clip in seconds
+    :return: Path to the saved clip
+    """
+    timeout = aiohttp.ClientTimeout(total=settings.CLIP_TIMEOUT)
+    params = {"flow": flow, "start": start_time, "end": start_time + dur}
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.get(
+            settings.CLIP_URL + "/clip", params=params
+        ) as response:
+            response.raise_for_status()
+            extension = "mp4" if response.content_type == "video/mp4" else "m4a"
+            save_path = f"data/{flow}-{start_time}-{dur}.{extension}"
+            await _save(response, save_path)
 
+    log.info(f"Clip of flow {flow} taken from the local archive")
     return save_path
+
+
+async def search_transcripts(
+    words: str, flow: str | None = None, limit: int = 10
+) -> list[dict]:
+    """
+    Search the transcript index of trs, most recent segments first.
+
+    :param words: Words the transcript segments contain, all of them
+    :param flow: Name of the flow in trs, None for every flow
+    :param limit: Maximum number of segments
+    :return: Segments with their flow, start and end timestamps and text
+    """
+    timeout = aiohttp.ClientTimeout(total=settings.CLIP_TIMEOUT)
+    params = {"q": words, "limit": limit}
+    if flow is not None:
+        params["flow"] = flow
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.get(
+            settings.CLIP_URL + "/search", params=params
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+async def _save(response: aiohttp.ClientResponse, save_path: str) -> None:
+    async with aiofiles.open(save_path, "wb") as f:
+        while chunk := await response.content.read(1024 * 1024):
+            await f.write(chunk)
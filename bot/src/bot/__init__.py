@@ -12,7 +12,4 @@ async def start_bot(bot: Bot):
     dp = Dispatcher()
     dp.update.middleware(BotMiddleware(bot))
     register_handlers(dp)
-    try:
-        await dp.start_polling(bot)
-    finally:
-        await bot.session.close()
+    await dp.start_polling(bot)
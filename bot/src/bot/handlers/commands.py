@@ -1,6 +1,15 @@
+import asyncio
+import html
+
+import aiohttp
 from aiogram import Router
-from aiogram.filters import CommandStart
-from aiogram.types import Message
+from aiogram.filters import Command, CommandObject, CommandStart
+from aiogram.types import FSInputFile, Message
+
+from src import log
+from src.api import get_video_from_flow, search_transcripts
+from src.bot.utils import delete_file, to_normal_datetime
+from src.config import settings
 
 router = Router()
 
@@ -9,3 +18,60 @@ router = Router()
 async def start_command(message: Message):
     username = message.from_user.username
     await message.answer(f"Hello {username}!")
+
+
+@router.message(Command("search"))
+async def search_command(message: Message, command: CommandObject):
+    """
+    Find when words were said in the flows, with clips of the latest matches.
+
+    :param message: The command message, "/search <words>"
+    :param command: The parsed command
+    :return: None
+    """
+    if not command.args:
+        await message.answer("Usage: /search <words>")
+        return
+    if not settings.CLIP_URL:
+        await message.answer("Search is not available.")
+        return
+
+    try:
+        segments = await search_transcripts(
+            command.args, limit=settings.SEARCH_RESULTS
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        log.warning(f"Transcript search failed: {e}")
+        await message.answer("Search failed, try again later.")
+        return
+    if not segments:
+        await message.answer("Nothing found.")
+        return
+
+    await message.answer(
+        "\n\n".join(
+            f"<b>{to_normal_datetime(segment['start'] + 60 * 60 * 3)}</b> "
+            f"({html.escape(segment['flow'])})\n"
+            f"{html.escape(segment['text'][:300])}"
+            for segment in segments
+        )
+    )
+
+    for segment in segments[: settings.SEARCH_CLIPS]:
+        try:
+            clip = await get_video_from_flow(
+                int(segment["start"]) - 5,
+                int(segment["end"]) + 5,
+                segment["flow"],
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.warning(f"Clip of a search result unavailable: {e}")
+            continue
+
+        caption = to_normal_datetime(segment["start"] + 60 * 60 * 3)
+        # The local archive of trs may only have the audio
+        if clip.endswith(".m4a"):
+            await message.answer_audio(FSInputFile(clip), caption=caption)
+        else:
+            await message.answer_video(FSInputFile(clip), caption=caption)
+        delete_file(clip)
@@ -6,10 +6,12 @@ from aiogram.types import FSInputFile
 from src import log
 from src.api import get_video_from_flow
 from src.config import settings
+from src.profiling import flow, profiled
 
 from src.bot.utils import to_normal_time, delete_file
 
 
+@profiled
 async def send_message(bot: Bot, message: str) -> None:
     """
     Send a message to channel with video or document.
@@ -19,6 +21,8 @@ async def send_message(bot: Bot, message: str) -> None:
     :return: None
     """
     message_json = json.loads(message)
+    flow_name = message_json.get("flow", "main")
+    flow.set(flow_name)
 
     start_time, end_time = map(
         int, map(float, message_json["time_range"].split(" - "))
@@ -34,17 +38,25 @@ async def send_message(bot: Bot, message: str) -> None:
         )
     )
 
-    video = await get_video_from_flow(int(start_time), int(end_time))
+    video = await get_video_from_flow(int(start_time), int(end_time), flow_name)
     video = FSInputFile(video)
     log.info(f"Video saved to {video}")
 
     log.info(
         f"Sending video to channel {settings.CHANNEL_NAME}, Video: {video.path}, Caption: {caption}"
     )
-    await bot.send_video(
-        chat_id=settings.CHANNEL_NAME,
-        video=video,
-        caption=caption,
-    )
+    # The local archive of trs may only have the audio
+    if str(video.path).endswith(".m4a"):
+        await bot.send_audio(
+            chat_id=settings.CHANNEL_NAME,
+            audio=video,
+            caption=caption,
+        )
+    else:
+        await bot.send_video(
+            chat_id=settings.CHANNEL_NAME,
+            video=video,
+            caption=caption,
+        )
 
     delete_file(video.path)
@@ -16,6 +16,18 @@ def to_normal_time(seconds: float) -> str:
     return datetime.fromtimestamp(seconds).strftime("%H:%M:%S")
 
 
+def to_normal_datetime(seconds: float) -> str:
+    """
+    Convert seconds since epoch to a human-readable date and time.
+
+    :param seconds: Seconds since epoch
+
+    :return: Formatted date and time string in the format "DD-MM-YYYY HH:MM:SS"
+    """
+
+    return datetime.fromtimestamp(seconds).strftime("%d-%m-%Y %H:%M:%S")
+
+
 def delete_file(file: str) -> None:
     """
     Delete file if it exists.
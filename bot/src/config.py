@@ -10,10 +10,22 @@ class Settings(BaseSettings):
     RABBITMQ_HOST: str
     RABBITMQ_PORT: int
     RABBITMQ_QUEUE: str
+    RABBITMQ_CONCURRENCY: int = 4  # messages sent to the channel at once
+    RABBITMQ_DRAIN_TIMEOUT: float = 60  # seconds to finish them on shutdown
 
     REQUEST_URL: str
     TOKEN: str
 
+    CLIP_URL: str = ""  # trs clip server, e.g. http://trs-service:8000
+    CLIP_TIMEOUT: float = 10
+    SEARCH_RESULTS: int = 10  # transcript segments listed by /search
+    SEARCH_CLIPS: int = 1  # clips of the most recent ones sent
+
+    PROFILE_ON_START: bool = False  # otherwise profile on SIGUSR1
+    PROFILE_DURATION: float = 30
+    PROFILE_INTERVAL: float = 0.01  # seconds between stack samples
+    PROFILE_DIR: str = "profiles"
+
     class Config:
         env_file = ".env"
 
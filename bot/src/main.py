@@ -7,7 +7,8 @@ from aiogram.enums import ParseMode
 
 from src.bot import start_bot
 from src.config import settings
-from src.mq.consume import start_consume
+from src.mq.consume import start_consume, stop_consume
+from src.profiling import profiler
 
 
 async def main():
@@ -16,8 +17,15 @@ async def main():
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
     os.makedirs("data", exist_ok=True)
-    await asyncio.gather(start_bot(bot), start_consume(bot))
+    rabbitmq = await start_consume(bot)
+    try:
+        await start_bot(bot)
+    finally:
+        # Messages being sent still need the bot session
+        await stop_consume(rabbitmq)
+        await bot.session.close()
 
 
 if __name__ == "__main__":
+    profiler.install()
     asyncio.run(main())
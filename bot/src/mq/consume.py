@@ -5,10 +5,17 @@ from src.config import settings
 from src.mq.rabbitmq import AsyncRabbitMQ
 
 
-async def start_consume(bot: Bot):
+async def start_consume(bot: Bot) -> AsyncRabbitMQ:
     rabbitmq = AsyncRabbitMQ()
     await rabbitmq.connect()
     await rabbitmq.consume(
         settings.RABBITMQ_QUEUE,
         callback=lambda message: send_message(bot, message),
+        concurrency=settings.RABBITMQ_CONCURRENCY,
     )
+    return rabbitmq
+
+
+async def stop_consume(rabbitmq: AsyncRabbitMQ) -> None:
+    await rabbitmq.drain(settings.RABBITMQ_DRAIN_TIMEOUT)
+    await rabbitmq.close()
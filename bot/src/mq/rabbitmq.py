@@ -1,9 +1,12 @@
+import asyncio
+
 import aio_pika
-from aio_pika.abc import AbstractIncomingMessage
+from aio_pika.abc import AbstractIncomingMessage, AbstractQueue
 from typing import Callable, Optional, Awaitable
 
 from src.mq import log
 from src.config import settings
+from src.profiling import profiled
 
 
 class AsyncRabbitMQ:
@@ -17,6 +20,10 @@ class AsyncRabbitMQ:
         self.port = settings.RABBITMQ_PORT
         self.connection: Optional[aio_pika.RobustConnection] = None
         self.channel: Optional[aio_pika.RobustChannel] = None
+        # Очереди и теги их потребителей, отменяемые при остановке
+        self._consumers: list[tuple[AbstractQueue, str]] = []
+        # Задачи обрабатываемых сообщений
+        self._in_flight: set[asyncio.Task] = set()
 
     async def connect(self) -> None:
         """
@@ -61,15 +68,24 @@ class AsyncRabbitMQ:
             raise
 
     async def consume(
-        self, queue_name: str, callback: Callable[[str], Awaitable[None]]
+        self,
+        queue_name: str,
+        callback: Callable[[str], Awaitable[None]],
+        concurrency: int = settings.RABBITMQ_CONCURRENCY,
     ) -> None:
         """
         Асинхронное потребление сообщений из указанной очереди.
 
+        До `concurrency` сообщений обрабатываются одновременно, и брокер
+        выдаёт не больше неподтверждённых сообщений, так что медленное
+        сообщение не задерживает остальные. Каждое сообщение подтверждается
+        по завершении своей обработки.
+
         Args:
             queue_name: Имя очереди для потребления.
             callback: Функция обратного вызова для обработки сообщений.
                       Принимает декодированное тело сообщения (str).
+            concurrency: Число сообщений, обрабатываемых одновременно.
 
         Raises:
             ValueError: Если соединение или канал не установлены.
@@ -84,23 +100,41 @@ class AsyncRabbitMQ:
             # Объявление очереди
             queue = await self.channel.declare_queue(queue_name, durable=True)
             # Установка ограничения на количество сообщений
-            await self.channel.set_qos(prefetch_count=1)
-
-            # Внутренний callback для обработки сообщений
-            async def on_message(message: AbstractIncomingMessage):
+            await self.channel.set_qos(prefetch_count=concurrency)
+            # Ограничение числа одновременно обрабатываемых сообщений
+            workers = asyncio.Semaphore(concurrency)
+
+            @profiled
+            async def process(message: AbstractIncomingMessage):
+                body = message.body.decode()
+                log.info(f"Получено сообщение из очереди {queue_name}: {body}")
                 try:
-                    async with message.process():
-                        body = message.body.decode()
-                        log.info(
-                            f"Получено сообщение из очереди {queue_name}: {body}"
-                        )
-                        await callback(body)
+                    await callback(body)
                 except Exception as e:
                     log.error(f"Ошибка обработки сообщения: {e}")
+                    await message.reject(requeue=False)
+                    raise
+                await message.ack()
+
+            # Внутренний callback, вызываемый в отдельной задаче на сообщение
+            async def on_message(message: AbstractIncomingMessage):
+                task = asyncio.current_task()
+                self._in_flight.add(task)
+                try:
+                    async with workers:
+                        await process(message)
+                except asyncio.CancelledError:
+                    # Обработка прервана при остановке: сообщение
+                    # возвращается в очередь, пока канал открыт
+                    if not message.processed:
+                        await message.nack(requeue=True)
                     raise
+                finally:
+                    self._in_flight.discard(task)
 
             # Запуск потребления
-            await queue.consume(on_message)
+            consumer_tag = await queue.consume(on_message)
+            self._consumers.append((queue, consumer_tag))
             log.info(f"Ожидание сообщений из очереди {queue_name}")
 
         except aio_pika.exceptions.AMQPError as e:
@@ -110,6 +144,39 @@ class AsyncRabbitMQ:
             log.error(f"Неизвестная ошибка при потреблении: {e}")
             raise
 
+    async def drain(
+        self, timeout: float = settings.RABBITMQ_DRAIN_TIMEOUT
+    ) -> None:
+        """
+        Остановка потребления с ожиданием обрабатываемых сообщений.
+
+        Новые сообщения больше не принимаются. Обработка сообщений, не
+        завершённая за `timeout`, прерывается, и они возвращаются в очередь
+        для повторной доставки.
+
+        Args:
+            timeout: Максимальное время ожидания в секундах.
+        """
+        for queue, consumer_tag in self._consumers:
+            try:
+                await queue.cancel(consumer_tag)
+            except Exception as e:
+                log.error(f"Ошибка при отмене потребления: {e}")
+        self._consumers.clear()
+
+        if not self._in_flight:
+            return
+        log.info(f"Ожидание обработки {len(self._in_flight)} сообщений")
+        _, pending = await asyncio.wait(set(self._in_flight), timeout=timeout)
+        if pending:
+            log.warning(
+                f"{len(pending)} сообщений не обработано за {timeout:.0f} с, "
+                f"они возвращаются в очередь"
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
     async def publish(self, queue_name: str, message: str) -> None:
         """
         Асинхронная публикация сообщения в указанную очередь.
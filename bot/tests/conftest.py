@@ -0,0 +1,16 @@
+import os
+
+# src.config reads the environment on import, the tests never reach the
+# services themselves
+for name, value in {
+    "BOT_TOKEN": "test",
+    "CHANNEL_NAME": "test",
+    "RABBITMQ_USER": "test",
+    "RABBITMQ_PASSWORD": "test",
+    "RABBITMQ_HOST": "127.0.0.1",
+    "RABBITMQ_PORT": "5672",
+    "RABBITMQ_QUEUE": "test",
+    "REQUEST_URL": "http://127.0.0.1:9",
+    "TOKEN": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,144 @@
+import asyncio
+
+from src.mq.rabbitmq import AsyncRabbitMQ
+
+
+class _Message:
+    def __init__(self, body: str):
+        self.body = body.encode()
+        self.processed = False
+        self.result: tuple | None = None
+
+    async def ack(self):
+        self.processed = True
+        self.result = ("ack",)
+
+    async def reject(self, requeue: bool = False):
+        self.processed = True
+        self.result = ("reject", requeue)
+
+    async def nack(self, requeue: bool = True):
+        self.processed = True
+        self.result = ("nack", requeue)
+
+
+class _Queue:
+    def __init__(self):
+        self.callback = None
+        self.cancelled = False
+        self.tasks: list[asyncio.Task] = []
+
+    async def consume(self, callback):
+        self.callback = callback
+        return "consumer"
+
+    async def cancel(self, consumer_tag: str):
+        assert consumer_tag == "consumer"
+        self.cancelled = True
+
+    def deliver(self, *bodies: str) -> list[_Message]:
+        # Like aio_pika, every delivered message is handled in its own task
+        messages = [_Message(body) for body in bodies]
+        for message in messages:
+            self.tasks.append(asyncio.create_task(self.callback(message)))
+        return messages
+
+
+class _Channel:
+    def __init__(self):
+        self.queue = _Queue()
+        self.prefetch_count = None
+
+    async def declare_queue(self, name: str, durable: bool):
+        return self.queue
+
+    async def set_qos(self, prefetch_count: int):
+        self.prefetch_count = prefetch_count
+
+
+async def _consume(callback, concurrency: int = 2):
+    rabbitmq = AsyncRabbitMQ()
+    rabbitmq.channel = _Channel()
+    await rabbitmq.consume("events", callback, concurrency)
+    return rabbitmq, rabbitmq.channel.queue
+
+
+def test_concurrent_handlers_are_limited():
+    async def run():
+        active = []
+        most = 0
+        release = asyncio.Event()
+
+        async def callback(body: str):
+            nonlocal most
+            active.append(body)
+            most = max(most, len(active))
+            await release.wait()
+            active.remove(body)
+
+        rabbitmq, queue = await _consume(callback, concurrency=2)
+        messages = queue.deliver(*"abcde")
+        await asyncio.sleep(0.05)
+        assert len(active) == 2
+        release.set()
+        await rabbitmq.drain(timeout=5)
+
+        assert rabbitmq.channel.prefetch_count == 2
+        assert most == 2
+        assert [message.result for message in messages] == [("ack",)] * 5
+
+    asyncio.run(run())
+
+
+def test_drain_waits_for_messages_in_flight():
+    async def run():
+        async def callback(body: str):
+            await asyncio.sleep(0.1)
+
+        rabbitmq, queue = await _consume(callback)
+        messages = queue.deliver("a", "b")
+        await asyncio.sleep(0)
+        await rabbitmq.drain(timeout=5)
+
+        assert queue.cancelled
+        assert [message.result for message in messages] == [("ack",)] * 2
+        assert not rabbitmq._in_flight
+
+    asyncio.run(run())
+
+
+def test_drain_requeues_messages_not_handled_in_time():
+    async def run():
+        async def callback(body: str):
+            if body != "fast":
+                await asyncio.Event().wait()
+
+        rabbitmq, queue = await _consume(callback, concurrency=2)
+        # "waiting" never gets a worker before the drain times out
+        fast, slow, stuck, waiting = queue.deliver(
+            "fast", "slow", "stuck", "waiting"
+        )
+        await asyncio.sleep(0.05)
+        await rabbitmq.drain(timeout=0.1)
+
+        assert fast.result == ("ack",)
+        for message in (slow, stuck, waiting):
+            assert message.result == ("nack", True)
+        assert not rabbitmq._in_flight
+
+    asyncio.run(run())
+
+
+def test_failed_message_is_rejected():
+    async def run():
+        async def callback(body: str):
+            raise ValueError("broken")
+
+        _, queue = await _consume(callback)
+        (message,) = queue.deliver("a")
+        (error,) = await asyncio.gather(*queue.tasks, return_exceptions=True)
+
+        assert isinstance(error, ValueError)
+        assert message.result == ("reject", False)
+
+    asyncio.run(run())
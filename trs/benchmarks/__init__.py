@@ -0,0 +1,19 @@
+import os
+
+# Benchmarks run against local stand-ins only, so provide every required
+# setting to let src.config load without a .env file
+for key, value in {
+    "FLOW": "benchmark",
+    "AI_BASE_URL": "http://127.0.0.1",
+    "AI_EMAIL": "benchmark",
+    "AI_PASSWORD": "benchmark",
+    "TRANSCRIPTION_BASE_URL": "http://127.0.0.1",
+    "TRANSCRIPTION_USERNAME": "benchmark",
+    "TRANSCRIPTION_PASSWORD": "benchmark",
+    "RABBITMQ_USER": "benchmark",
+    "RABBITMQ_PASSWORD": "benchmark",
+    "RABBITMQ_HOST": "127.0.0.1",
+    "RABBITMQ_PORT": "5672",
+    "RABBITMQ_QUEUE": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
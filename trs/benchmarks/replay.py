@@ -0,0 +1,377 @@
+"""
+End-to-end benchmark of StreamService without live streams or backends.
+
+Recorded audio files are decoded by ffmpeg through get_stream as fast as it
+can, one flow per file, while local stub servers stand in for the
+transcription (/api/v1/transcription/transcribe) and AI
+(/api/chat/completions) services with configurable latency. Events are
+collected in memory instead of being published to RabbitMQ. With
+--backend local, segments are transcribed by the in-process engine instead
+of the transcription stub. Once every file
+has been processed, throughput, per-stage latency, the memory high-water mark
+and the real-time factor are reported.
+
+Usage: python -m benchmarks.replay FILE [FILE ...] [options]
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+SEGMENT_SECONDS = 5  # duration of the stub transcription segments
+STAGES = [
+    "ffmpeg_read",
+    "silence_detection",
+    "encoding",
+    "transcription",
+    "chat_completion",
+]
+
+
+class StubBackends:
+    """
+    Transcription and AI services answering after a configurable delay.
+    """
+
+    def __init__(
+        self,
+        transcription_latency: float,
+        transcription_rtf: float,
+        chat_latency: float,
+        event_every: int,
+    ):
+        """
+        :param transcription_latency: Fixed delay of a transcription request, in seconds.
+        :param transcription_rtf: Additional delay per second of uploaded audio, in seconds.
+        :param chat_latency: Delay of a chat completion request, in seconds.
+        :param event_every: Every n-th chat completion detects an event, 0 never does.
+        """
+        self.transcription_latency = transcription_latency
+        self.transcription_rtf = transcription_rtf
+        self.chat_latency = chat_latency
+        self.event_every = event_every
+        self.requests: Counter[str] = Counter()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    def start(self) -> str:
+        """
+        Start serving on a free local port.
+        :return: Base URL of both services.
+        """
+        backends = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with backends._lock:
+                    backends.in_flight += 1
+                    backends.requests[self.path] += 1
+                    calls = backends.requests[self.path]
+                try:
+                    backends._handle(self, body, calls)
+                finally:
+                    with backends._lock:
+                        backends.in_flight -= 1
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def close(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _handle(
+        self, handler: BaseHTTPRequestHandler, body: bytes, calls: int
+    ) -> None:
+        if handler.path == "/api/v1/auth/login":
+            self._reply(handler, {"access_token": "stub", "expires_in": 3600})
+        elif handler.path == "/api/v1/auths/signin":
+            self._reply(handler, {"token": "stub"})
+        elif handler.path == "/api/v1/transcription/transcribe":
+            # The upload is a WAV file, its size tells the duration
+            duration = len(body) / (SAMPLE_RATE * SAMPLE_WIDTH)
+            time.sleep(
+                self.transcription_latency + self.transcription_rtf * duration
+            )
+            self._reply(handler, {"srt": self._segments(duration, calls)})
+        elif handler.path == "/api/chat/completions":
+            time.sleep(self.chat_latency)
+            answer = "-"
+            if self.event_every and calls % self.event_every == 0:
+                answer = json.dumps({"summary": f"benchmark event {calls}"})
+            if json.loads(body).get("stream"):
+                self._stream(handler, answer)
+            else:
+                self._reply(
+                    handler, {"choices": [{"message": {"content": answer}}]}
+                )
+        else:
+            handler.send_error(404)
+
+    @staticmethod
+    def _segments(duration: float, calls: int) -> list[dict]:
+        return [
+            {
+                "number": i + 1,
+                "start": start,
+                "end": min(start + SEGMENT_SECONDS, duration),
+                "text": f"request {calls} segment {i + 1}",
+            }
+            for i, start in enumerate(
+                range(0, int(duration) + 1, SEGMENT_SECONDS)
+            )
+            if start < duration
+        ]
+
+    @staticmethod
+    def _reply(handler: BaseHTTPRequestHandler, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    @staticmethod
+    def _stream(handler: BaseHTTPRequestHandler, answer: str) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        try:
+            for i in range(0, len(answer), 4):
+                delta = {"choices": [{"delta": {"content": answer[i : i + 4]}}]}
+                handler.wfile.write(f"data: {json.dumps(delta)}\n\n".encode())
+            handler.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stops reading once the verdict is known
+        handler.close_connection = True
+
+
+class CollectingPublisher:
+    """
+    Stand-in for RabbitMQPublisher keeping the events in memory.
+    """
+
+    def __init__(self):
+        self.events: list[str] = []
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def publish(self, queue_name: str, message: str, flow: str = "") -> None:
+        self.events.append(message)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.replay", description=__doc__.split("\n")[1]
+    )
+    parser.add_argument("files", nargs="+", type=Path, help="audio files")
+    parser.add_argument(
+        "--transcription-latency",
+        type=float,
+        default=1.0,
+        help="fixed delay of a transcription request, in seconds",
+    )
+    parser.add_argument(
+        "--transcription-rtf",
+        type=float,
+        default=0.05,
+        help="delay of a transcription request per second of audio",
+    )
+    parser.add_argument(
+        "--chat-latency",
+        type=float,
+        default=0.5,
+        help="delay of a chat completion request, in seconds",
+    )
+    parser.add_argument(
+        "--event-every",
+        type=int,
+        default=10,
+        help="every n-th chat completion detects an event, 0 never does",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["stub", "local"],
+        default="stub",
+        help="transcribe with the stub service or the in-process engine",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse transcripts and verdicts of repeated content",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="show the service logs"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=3600,
+        help="give up after this many seconds",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    backends = StubBackends(
+        args.transcription_latency,
+        args.transcription_rtf,
+        args.chat_latency,
+        args.event_every,
+    )
+    base_url = backends.start()
+
+    # src.config reads the environment on import, so the stubs come first
+    os.environ["AI_BASE_URL"] = base_url
+    os.environ["TRANSCRIPTION_BASE_URL"] = base_url
+    os.environ["TRANSCRIPTION_CODEC"] = "wav"
+    os.environ["CACHE_ENABLED"] = str(args.cache).lower()
+    os.environ["CACHE_PATH"] = ""
+    from src import log
+    from src.stream import StreamService
+    from src.stream.ffmpeg import FFmpegStream
+    from src.api import AIClient, TranscriptionClient
+    from src.api.transcription import get_transcription_backend
+    from prometheus_client import REGISTRY
+
+    if not args.verbose:
+        log.setLevel(logging.WARNING)
+
+    class ReplayStream(FFmpegStream):
+        """
+        Decodes the file once: the end of the file is reported as a
+        reconnect with no gap, so the last audio is split off, and the
+        reader then waits for the benchmark to stop.
+        """
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.finished = threading.Event()
+            self.bytes_read = 0
+
+        def readinto(self, buffer, size, timeout=None):
+            read = super().readinto(buffer, size, timeout)
+            self.bytes_read += read or 0
+            return read
+
+        def reconnect(self, stop: threading.Event) -> float | None:
+            if self.finished.is_set():
+                stop.wait()
+                return None
+            self.finished.set()
+            return 0.0
+
+    publisher = CollectingPublisher()
+    executor = ThreadPoolExecutor(thread_name_prefix="worker")
+    ai_client = AIClient()
+    transcription_client = (
+        get_transcription_backend("local")
+        if args.backend == "local"
+        else TranscriptionClient()
+    )
+
+    names = [f"{i}-{path.stem}" for i, path in enumerate(args.files)]
+    services: list[tuple[StreamService, ReplayStream]] = []
+    for name, path in zip(names, args.files, strict=True):
+        stream = ReplayStream(str(path), SAMPLE_RATE, name=name)
+        service = StreamService(
+            str(path),
+            name=name,
+            stats_interval=3600,
+            ai_client=ai_client,
+            transcription_client=transcription_client,
+            executor=executor,
+            publisher=publisher,
+            stream=stream,
+        )
+        services.append((service, stream))
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=service.process, daemon=True)
+        for service, _ in services
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Done once every file was read and the pipelines stayed idle for a while
+    idle = 0
+    busy = started
+    while idle < 3 and time.perf_counter() - started < args.timeout:
+        time.sleep(0.5)
+        finished = all(stream.finished.is_set() for _, stream in services)
+        drained = all(
+            not any(service.queue_depths().values()) for service, _ in services
+        )
+        if finished and drained and not backends.in_flight:
+            idle += 1
+        else:
+            idle = 0
+            busy = time.perf_counter()
+    elapsed = busy - started
+
+    for service, _ in services:
+        service.stop()
+    for thread in threads:
+        thread.join()
+    executor.shutdown()
+    backends.close()
+
+    audio = sum(stream.bytes_read for _, stream in services) / (
+        SAMPLE_RATE * SAMPLE_WIDTH
+    )
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"files:             {len(services)}")
+    print(f"audio:             {audio:.1f} s")
+    print(f"wall time:         {elapsed:.1f} s")
+    print(f"throughput:        {audio / elapsed:.1f}x real time")
+    print(f"real-time factor:  {elapsed / audio if audio else 0:.4f}")
+    print(f"memory high-water: {memory:.0f} MiB")
+    print(
+        f"requests:          {sum(backends.requests.values())} "
+        f"({dict(backends.requests)})"
+    )
+    print(f"events:            {len(publisher.events)}")
+    print()
+    print(f"{'stage':<18} {'count':>6} {'mean, s':>10} {'total, s':>10}")
+    for stage in STAGES:
+        count = total = 0
+        for name in names:
+            labels = {"flow": name, "stage": stage}
+            value = REGISTRY.get_sample_value
+            count += int(value("trs_stage_seconds_count", labels) or 0)
+            total += value("trs_stage_seconds_sum", labels) or 0
+        mean = total / count if count else 0
+        print(f"{stage:<18} {count:>6} {mean:>10.4f} {total:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
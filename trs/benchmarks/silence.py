@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of silence detection: the previous pydub path against the
+NumPy detector, both on a whole buffer and fed incrementally in 30s chunks
+the way StreamService does when no silence is found for a while.
+
+Usage: python -m benchmarks.silence [seconds ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+
+from src.stream.detection import SilenceDetector, get_split_ms
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30
+DEFAULT_DURATIONS = [30, 5 * 60, 30 * 60]
+
+
+def get_split_ms_pydub(audio_bytes: bytes, sample_rate=16000) -> int:
+    """
+    The pydub implementation get_split_ms used to have.
+    """
+    audio = AudioSegment(
+        data=audio_bytes,
+        sample_width=2,
+        frame_rate=sample_rate,
+        channels=1,
+    )
+    silences = detect_silence(audio, min_silence_len=300, silence_thresh=-40)
+    if not silences:
+        return 0
+    return sum(silences[-1]) // 2
+
+
+def make_audio(seconds: int, seed: int = 0) -> bytes:
+    """
+    Generate speech-like audio: noise bursts of varying loudness separated by
+    short pauses, with a single long pause in the middle.
+    """
+    rng = np.random.default_rng(seed)
+    samples = np.empty(seconds * SAMPLE_RATE, dtype=np.int16)
+    position = 0
+    while position < len(samples):
+        length = int(rng.integers(SAMPLE_RATE // 10, SAMPLE_RATE * 2))
+        amplitude = rng.choice([50, 2000, 6000])
+        burst = rng.normal(0, amplitude, length).clip(-32768, 32767)
+        samples[position : position + length] = burst[: len(samples) - position]
+        position += length
+    middle = len(samples) // 2
+    samples[middle : middle + SAMPLE_RATE] = 0
+    return samples.tobytes()
+
+
+def measure(func, *args) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def feed_incrementally(audio_bytes: bytes) -> tuple[float, int]:
+    """
+    Feed 30s chunks to one detector and return the time spent on the last chunk.
+    """
+    detector = SilenceDetector(SAMPLE_RATE)
+    chunk_size = CHUNK_SECONDS * SAMPLE_RATE * 2
+    elapsed = 0.0
+    for start in range(0, len(audio_bytes), chunk_size):
+        elapsed, _ = measure(
+            detector.feed, audio_bytes[start : start + chunk_size]
+        )
+    return elapsed, detector.split_ms()
+
+
+def main() -> None:
+    durations = [int(arg) for arg in sys.argv[1:]] or DEFAULT_DURATIONS
+
+    print(
+        f"{'buffer':>8} {'pydub, s':>10} {'numpy, s':>10} "
+        f"{'speedup':>8} {'last chunk, s':>14} {'match':>6}"
+    )
+    for seconds in durations:
+        audio_bytes = make_audio(seconds)
+        pydub_time, pydub_split = measure(
+            get_split_ms_pydub, audio_bytes, SAMPLE_RATE
+        )
+        numpy_time, numpy_split = measure(
+            get_split_ms, audio_bytes, SAMPLE_RATE
+        )
+        chunk_time, chunk_split = feed_incrementally(audio_bytes)
+        match = pydub_split == numpy_split == chunk_split
+        print(
+            f"{seconds:>7}s {pydub_time:>10.3f} {numpy_time:>10.3f} "
+            f"{pydub_time / numpy_time:>7.0f}x {chunk_time:>14.4f} "
+            f"{str(match):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,6 @@ import logging
 
 logging.basicConfig(
     level=logging.INFO,
-    format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    format="%(levelname)s - %(asctime)s - %(name)s - %(threadName)s - %(message)s",
 )
 log = logging.getLogger(__name__)
@@ -1,4 +1,5 @@
-import requests
+import json
+from typing import Iterator
 
 from src.api.client import BaseClient
 from src.config import settings
@@ -19,38 +20,78 @@ class AIClient(BaseClient):
         ENDPOINT = self.base_url + "/api/v1/auths/signin"
         DATA = self.credentials
 
-        response = requests.post(ENDPOINT, json=DATA)
+        response = self.session.post(ENDPOINT, json=DATA, timeout=self.timeout)
         response.raise_for_status()
 
-        token = response.json()["token"]
-        self.headers["Authorization"] = f"Bearer {token}"
+        body = response.json()
+        self._set_token(body["token"], body.get("expires_at"))
 
-    def chat_completions(self, model: str, messages: list[Message]) -> str:
+    def chat_completions(
+        self, model: str, messages: list[Message], system: str = ""
+    ) -> str:
         """
         Get chat completions from the AI service.
         :param model: The model to use for chat completions
         :param messages: The messages to use for chat completions
+        :param system: System prompt sent before the messages, empty for none
         :return: The response content from the AI service
         """
-        if not self.headers["Authorization"]:
-            self.login()
-
         ENDPOINT = self.base_url + "/api/chat/completions"
 
-        DATA = {
-            "model": model,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": message["content"],
-                    "keep-alive": 60,
-                }
-                for message in messages
-            ],
-        }
+        DATA = self._completions_data(model, messages, system)
 
         response = self._post(endpoint=ENDPOINT, json=DATA)
         response.raise_for_status()
         result = response.json()
 
         return result["choices"][0]["message"]["content"]
+
+    def stream_chat_completions(
+        self, model: str, messages: list[Message]
+    ) -> Iterator[str]:
+        """
+        Stream chat completions from the AI service as server-sent events.
+        Closing the generator closes the connection, which cancels the rest of the generation.
+        :param model: The model to use for chat completions
+        :param messages: The messages to use for chat completions
+        :return: Iterator over the content tokens as they arrive
+        """
+        ENDPOINT = self.base_url + "/api/chat/completions"
+
+        DATA = {**self._completions_data(model, messages), "stream": True}
+
+        response = self._post(endpoint=ENDPOINT, json=DATA, stream=True)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+
+                payload = line.removeprefix("data:").strip()
+                if payload == "[DONE]":
+                    return
+
+                choices = json.loads(payload).get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+        finally:
+            response.close()
+
+    @staticmethod
+    def _completions_data(
+        model: str, messages: list[Message], system: str = ""
+    ) -> dict:
+        return {
+            "model": model,
+            "messages": [
+                *([{"role": "system", "content": system}] if system else []),
+                *(
+                    {
+                        "role": "user",
+                        "content": message["content"],
+                        "keep-alive": 60,
+                    }
+                    for message in messages
+                ),
+            ],
+        }
@@ -1,27 +1,57 @@
+import threading
+import time
 from abc import ABC, abstractmethod
 
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
 
-from src.api.utils import retry_on_unauthorized
+from src.api.utils import (
+    get_token_expiry,
+    retry_on_transient_error,
+    retry_on_unauthorized,
+)
+from src.config import settings
 
 
 class BaseClient(ABC):
     """
     Base class for API clients.
+    Every client owns a pooled keep-alive session and caches its token,
+    refreshing it shortly before it expires.
     """
 
-    def __init__(self, base_url: str, credentials: dict[str, str]):
+    def __init__(
+        self,
+        base_url: str,
+        credentials: dict[str, str],
+        pool_size: int = settings.HTTP_POOL_SIZE,
+        connect_timeout: float = settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = settings.HTTP_READ_TIMEOUT,
+    ):
         """
         Initialize the client with base URL and credentials.
 
         :param base_url: The base URL for the API.
         :param credentials: A dictionary containing authentication credentials.
+        :param pool_size: Maximum number of kept-alive connections to the API.
+        :param connect_timeout: Timeout for establishing a connection, in seconds.
+        :param read_timeout: Timeout for waiting for the response, in seconds.
         """
         self.base_url = base_url
         self.credentials = credentials
         self.headers = {"Authorization": None}
+        self.timeout = (connect_timeout, read_timeout)
 
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._token_expires_at: float | None = None
+        self._token_lock = threading.Lock()
+
+    @retry_on_transient_error
     @retry_on_unauthorized
     def _post(self, endpoint: str, **kwargs) -> Response:
         """
@@ -30,7 +60,35 @@ class BaseClient(ABC):
         :param kwargs: Additional parameters to pass to the request, such as `data`, `files`, etc.
         :return: Response object containing the server's response.
         """
-        return requests.post(endpoint, headers=self.headers, **kwargs)
+        self.ensure_token()
+        return self.session.post(
+            endpoint, headers=self.headers, timeout=self.timeout, **kwargs
+        )
+
+    def ensure_token(self, force: bool = False) -> None:
+        """
+        Log in if there is no token yet or the cached one is about to expire.
+        :param force: Log in even if the cached token is still valid.
+        :return: None
+        """
+        with self._token_lock:
+            expires_soon = (
+                self._token_expires_at is not None
+                and time.time()
+                > self._token_expires_at - settings.TOKEN_REFRESH_MARGIN
+            )
+            if force or not self.headers["Authorization"] or expires_soon:
+                self.login()
+
+    def _set_token(self, token: str, expires_at: float | None = None) -> None:
+        """
+        Cache the token and its expiry time.
+        :param token: The access token.
+        :param expires_at: Expiry timestamp, read from the token itself if not given.
+        :return: None
+        """
+        self.headers["Authorization"] = f"Bearer {token}"
+        self._token_expires_at = expires_at or get_token_expiry(token)
 
     @abstractmethod
     def login(self) -> None:
@@ -1,3 +1,8 @@
+from .backend import TranscriptionBackend, get_transcription_backend
 from .client import TranscriptionClient
 
-__all__ = ["TranscriptionClient"]
+__all__ = [
+    "TranscriptionBackend",
+    "TranscriptionClient",
+    "get_transcription_backend",
+]
@@ -0,0 +1,58 @@
+import functools
+from typing import Any, Protocol
+
+from src.api.transcription.client import TranscriptionClient
+from src.api.transcription.schemas import Segment
+from src.config import settings
+
+
+class TranscriptionBackend(Protocol):
+    """
+    Turns 16-bit mono PCM audio into transcript segments.
+
+    Transcription happens in two steps, so the caller can release the stream
+    buffer as soon as the audio has been copied out of it: `prepare` puts the
+    audio in the form the backend takes, `transcribe_prepared` transcribes it.
+    """
+
+    def prepare(
+        self,
+        pcm: bytes | memoryview,
+        sample_rate: int = 16000,
+        codec: str = "wav",
+    ) -> Any:
+        """
+        Copy the audio into the form taken by `transcribe_prepared`.
+        :param pcm: Bytes or memoryview representing the audio data.
+        :param sample_rate: Sample rate of the audio (default is 16000).
+        :param codec: Codec of backends uploading the audio, "wav", "flac" or "opus" (default is "wav").
+        :return: The prepared audio.
+        """
+
+    def transcribe_prepared(
+        self, audio: Any, model: str | None = None
+    ) -> list[Segment]:
+        """
+        Transcribe prepared audio.
+        :param audio: Audio returned by `prepare`.
+        :param model: Model to use instead of the default one, e.g. a cheaper one.
+        :return: List of dictionaries containing transcription results.
+        """
+
+
+@functools.cache
+def get_transcription_backend(
+    name: str = settings.TRANSCRIPTION_BACKEND,
+) -> TranscriptionBackend:
+    """
+    Get the transcription backend of the process, created on first use.
+    :param name: "remote" for the transcription service, "local" for the in-process engine.
+    :return: The backend.
+    """
+    if name == "remote":
+        return TranscriptionClient()
+    if name == "local":
+        from src.api.transcription.local import LocalTranscriber
+
+        return LocalTranscriber()
+    raise ValueError(f"Unsupported transcription backend: {name}")
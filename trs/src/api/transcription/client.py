@@ -1,7 +1,9 @@
-import requests
+import time
+from pathlib import Path
 
 from src.api.client import BaseClient
 from src.api.transcription.schemas import Segment
+from src.api.transcription.utils import encode_pcm
 from src.config import settings
 
 
@@ -19,11 +21,15 @@ class TranscriptionClient(BaseClient):
         ENDPOINT = self.base_url + "/api/v1/auth/login"
         DATA = self.credentials
 
-        response = requests.post(ENDPOINT, json=DATA)
+        response = self.session.post(ENDPOINT, json=DATA, timeout=self.timeout)
         response.raise_for_status()
 
-        token = response.json()["access_token"]
-        self.headers["Authorization"] = f"Bearer {token}"
+        body = response.json()
+        expires_in = body.get("expires_in")
+        self._set_token(
+            body["access_token"],
+            time.time() + expires_in if expires_in else None,
+        )
 
     def transcribe(
         self,
@@ -40,9 +46,78 @@ class TranscriptionClient(BaseClient):
         :param model: Model to use for transcription (default is "turbo").
         :return: List of dictionaries containing transcription results.
         """
-        if not self.headers["Authorization"]:
-            self.login()
+        with open(audio_file_path, "rb") as audio_file:
+            audio = audio_file.read()
+
+        return self.transcribe_audio(
+            audio, Path(audio_file_path).name, language, result_format, model
+        )
+
+    def transcribe_pcm(
+        self,
+        pcm: bytes | memoryview,
+        sample_rate: int = 16000,
+        codec: str = "wav",
+        model: str | None = None,
+    ) -> list[Segment]:
+        """
+        Transcribe raw 16-bit mono PCM audio, encoded in memory without touching disk.
+        :param pcm: Bytes or memoryview representing the audio data.
+        :param sample_rate: Sample rate of the audio (default is 16000).
+        :param codec: Codec to upload the audio with, "wav", "flac" or "opus" (default is "wav").
+        :param model: Model to use instead of "turbo".
+        :return: List of dictionaries containing transcription results.
+        """
+        return self.transcribe_prepared(
+            self.prepare(pcm, sample_rate, codec), model
+        )
+
+    def prepare(
+        self,
+        pcm: bytes | memoryview,
+        sample_rate: int = 16000,
+        codec: str = "wav",
+    ) -> tuple[bytes, str]:
+        """
+        Encode raw 16-bit mono PCM audio for upload, see encode_pcm.
+        :param pcm: Bytes or memoryview representing the audio data.
+        :param sample_rate: Sample rate of the audio (default is 16000).
+        :param codec: Codec to upload the audio with, "wav", "flac" or "opus" (default is "wav").
+        :return: The encoded file contents and its file name.
+        """
+        return encode_pcm(pcm, sample_rate, codec=codec)
 
+    def transcribe_prepared(
+        self, audio: tuple[bytes, str], model: str | None = None
+    ) -> list[Segment]:
+        """
+        Transcribe audio encoded by `prepare`.
+        :param audio: The encoded file contents and its file name.
+        :param model: Model to use instead of "turbo".
+        :return: List of dictionaries containing transcription results.
+        """
+        contents, filename = audio
+        if model:
+            return self.transcribe_audio(contents, filename, model=model)
+        return self.transcribe_audio(contents, filename)
+
+    def transcribe_audio(
+        self,
+        audio: bytes,
+        filename: str,
+        language: str = "en",
+        result_format: str = "srt",
+        model: str = "turbo",
+    ) -> list[Segment]:
+        """
+        Transcribe the contents of an audio file using the transcription service.
+        :param audio: Contents of the audio file.
+        :param filename: Name of the audio file, its extension tells the service the format.
+        :param language: Language of the audio (default is "en").
+        :param result_format: Format of the transcription result (default is "srt").
+        :param model: Model to use for transcription (default is "turbo").
+        :return: List of dictionaries containing transcription results.
+        """
         ENDPOINT = self.base_url + "/api/v1/transcription/transcribe"
 
         DATA = {
@@ -51,9 +126,8 @@ class TranscriptionClient(BaseClient):
             "model": model,
         }
 
-        with open(audio_file_path, "rb") as audio_file:
-            FILES = {"file": audio_file}
-            response = self._post(endpoint=ENDPOINT, files=FILES, data=DATA)
+        FILES = {"file": (filename, audio)}
+        response = self._post(endpoint=ENDPOINT, files=FILES, data=DATA)
 
         response.raise_for_status()
 
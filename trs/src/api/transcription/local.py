@@ -0,0 +1,207 @@
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from src import log
+from src.api.transcription.schemas import Segment
+from src.config import settings
+
+SAMPLE_RATE = 16000  # the only rate Whisper models take
+WINDOW_SAMPLES = 30 * SAMPLE_RATE  # audio a Whisper model decodes at once
+
+# (audio, model, result)
+_Request = tuple[np.ndarray, str, Future]
+
+
+class LocalTranscriber:
+    """
+    In-process CPU transcription with a quantized Whisper model, using
+    faster-whisper (the optional "local" dependency).
+
+    Every model is loaded once, on first use. A single engine thread owns
+    the models: requests of all flows are queued and the ones arriving
+    within a short window are transcribed as one batch, each segment split
+    into 30-second clips decoded together.
+    """
+
+    def __init__(
+        self,
+        model: str = settings.LOCAL_TRANSCRIPTION_MODEL,
+        compute_type: str = settings.LOCAL_TRANSCRIPTION_COMPUTE_TYPE,
+        cpu_threads: int = settings.LOCAL_TRANSCRIPTION_THREADS,
+        batch_size: int = settings.LOCAL_TRANSCRIPTION_BATCH_SIZE,
+        batch_wait: float = 0.05,
+        language: str = "en",
+    ):
+        """
+        :param model: Default model, a Whisper model size or a path to a converted model.
+        :param compute_type: Quantization of the model weights, e.g. "int8".
+        :param cpu_threads: Number of threads of the inference engine, 0 for its default.
+        :param batch_size: Maximum number of clips decoded together.
+        :param batch_wait: Time to wait for more requests to batch, in seconds.
+        :param language: Language of the audio.
+        """
+        try:
+            from faster_whisper import BatchedInferencePipeline, WhisperModel
+        except ImportError as e:
+            raise ImportError(
+                "The local transcription backend requires faster-whisper, "
+                'install the "local" extra'
+            ) from e
+
+        self._model_class = WhisperModel
+        self._pipeline_class = BatchedInferencePipeline
+        self._default_model = model
+        self._compute_type = compute_type
+        self._cpu_threads = cpu_threads
+        self._batch_size = batch_size
+        self._batch_wait = batch_wait
+        self._language = language
+        self._pipelines: dict[str, object] = {}
+
+        self._requests: queue.Queue[_Request] = queue.Queue()
+        threading.Thread(
+            target=self._run, name="local-transcriber", daemon=True
+        ).start()
+
+    def prepare(
+        self,
+        pcm: bytes | memoryview,
+        sample_rate: int = 16000,
+        codec: str = "wav",
+    ) -> np.ndarray:
+        """
+        Convert raw 16-bit mono PCM audio to the float samples the model takes.
+        :param pcm: Bytes or memoryview representing the audio data.
+        :param sample_rate: Sample rate of the audio, must be 16000.
+        :param codec: Ignored, the audio is not encoded.
+        :return: The samples, scaled to [-1, 1).
+        """
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(
+                f"Local transcription takes {SAMPLE_RATE} Hz audio, "
+                f"got {sample_rate} Hz"
+            )
+        return np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 2**15
+
+    def transcribe_prepared(
+        self, audio: np.ndarray, model: str | None = None
+    ) -> list[Segment]:
+        """
+        Transcribe audio converted by `prepare`, batched with concurrent requests.
+        :param audio: The samples.
+        :param model: Model to use instead of the default one, loaded on first use.
+        :return: List of dictionaries containing transcription results.
+        """
+        result: Future = Future()
+        self._requests.put((audio, model or self._default_model, result))
+        return result.result()
+
+    def _run(self) -> None:
+        """
+        Engine loop: collect a batch of requests and transcribe it.
+        """
+        while True:
+            batch = [self._requests.get()]
+            clips = -(-len(batch[0][0]) // WINDOW_SAMPLES)
+            deadline = time.monotonic() + self._batch_wait
+            while clips < self._batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+                clips += -(-len(batch[-1][0]) // WINDOW_SAMPLES)
+
+            models: dict[str, list[_Request]] = {}
+            for request in batch:
+                models.setdefault(request[1], []).append(request)
+            for model, requests in models.items():
+                try:
+                    results = self._transcribe(model, requests)
+                except Exception as e:
+                    log.error(f"Local transcription failed: {e}")
+                    for _, _, result in requests:
+                        result.set_exception(e)
+                    continue
+                for (_, _, result), segments in zip(
+                    requests, results, strict=True
+                ):
+                    result.set_result(segments)
+
+    def _transcribe(
+        self, model: str, requests: list[_Request]
+    ) -> list[list[Segment]]:
+        """
+        Transcribe the audio of several requests in a single batched pass.
+        The audio is concatenated and cut into clips that never cross
+        a request boundary, so every decoded segment belongs to one request.
+        """
+        # The pipeline merges adjacent clips into chunks of up to a window.
+        # Every request starts on a window boundary, with silence between
+        # them that no clip covers, so no chunk spans two requests.
+        offsets = []
+        clips = []
+        audios = []
+        position = 0
+        for audio, _, _ in requests:
+            offsets.append(position)
+            end = position + len(audio)
+            for start in range(position, end, WINDOW_SAMPLES):
+                clips.append(
+                    {"start": start, "end": min(start + WINDOW_SAMPLES, end)}
+                )
+            padding = -len(audio) % WINDOW_SAMPLES
+            audios += [audio, np.zeros(padding, np.float32)]
+            position = end + padding
+
+        started = time.monotonic()
+        segments, _ = self._pipeline(model).transcribe(
+            np.concatenate(audios),
+            language=self._language,
+            batch_size=self._batch_size,
+            vad_filter=False,
+            clip_timestamps=clips,
+        )
+
+        results: list[list[Segment]] = [[] for _ in requests]
+        for segment in segments:
+            i = bisect.bisect_right(offsets, segment.start * SAMPLE_RATE) - 1
+            offset = offsets[i] / SAMPLE_RATE
+            results[i].append(
+                {
+                    "number": len(results[i]) + 1,
+                    "start": round(segment.start - offset, 3),
+                    "end": round(segment.end - offset, 3),
+                    "text": segment.text.strip(),
+                }
+            )
+
+        duration = sum(len(audio) for audio, _, _ in requests) / SAMPLE_RATE
+        log.info(
+            f"Transcribed {len(requests)} segments, {duration:.1f}s "
+            f"of audio in {time.monotonic() - started:.2f}s"
+        )
+        return results
+
+    def _pipeline(self, model: str):
+        """
+        Batched inference pipeline of a model, loading the model on first use.
+        """
+        if model not in self._pipelines:
+            log.info(f"Loading transcription model {model}")
+            self._pipelines[model] = self._pipeline_class(
+                model=self._model_class(
+                    model,
+                    device="cpu",
+                    compute_type=self._compute_type,
+                    cpu_threads=self._cpu_threads,
+                )
+            )
+        return self._pipelines[model]
@@ -0,0 +1,69 @@
+import io
+import subprocess
+import wave
+
+# codec -> (file extension, ffmpeg output options)
+AUDIO_CODECS: dict[str, tuple[str, list[str]]] = {
+    "wav": ("wav", []),
+    "flac": ("flac", ["-c:a", "flac", "-f", "flac"]),
+    "opus": (
+        "ogg",
+        ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"],
+    ),
+}
+
+
+def encode_pcm(
+    pcm: bytes | memoryview,
+    sample_rate: int = 16000,
+    sample_width: int = 2,
+    channels: int = 1,
+    codec: str = "wav",
+) -> tuple[bytes, str]:
+    """
+    Encode raw PCM audio into an in-memory audio file.
+    WAV is written with the wave module, other codecs are encoded by ffmpeg through pipes.
+    :param pcm: Bytes or memoryview representing the audio data.
+    :param sample_rate: Sample rate of the audio (default is 16000).
+    :param sample_width: Width of each sample in bytes (default is 2).
+    :param channels: Number of audio channels (default is 1).
+    :param codec: One of "wav", "flac" or "opus" (default is "wav").
+    :return: The encoded file contents and a file name with the matching extension.
+    """
+    if codec not in AUDIO_CODECS:
+        raise ValueError(f"Unsupported audio codec: {codec}")
+
+    extension, options = AUDIO_CODECS[codec]
+    filename = f"audio.{extension}"
+
+    if codec == "wav":
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(channels)
+            wf.setsampwidth(sample_width)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm)
+        return buffer.getvalue(), filename
+
+    result = subprocess.run(
+        [
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-f",
+            f"s{sample_width * 8}le",
+            "-ar",
+            str(sample_rate),
+            "-ac",
+            str(channels),
+            "-i",
+            "pipe:0",
+            *options,
+            "pipe:1",
+        ],
+        input=pcm,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    return result.stdout, filename
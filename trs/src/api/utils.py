@@ -1,5 +1,15 @@
+import base64
+import binascii
+import json
+import random
+import time
 from functools import wraps
 
+from requests import ConnectionError, HTTPError
+
+from src import log
+from src.config import settings
+
 
 def retry_on_unauthorized(func):
     """
@@ -10,9 +20,63 @@ def retry_on_unauthorized(func):
     def wrapper(self, *args, **kwargs):
         response = func(self, *args, **kwargs)
         if response.status_code == 401:
-            self.login()
+            self.ensure_token(force=True)
             response = func(self, *args, **kwargs)
         response.raise_for_status()
         return response
 
     return wrapper
+
+
+def retry_on_transient_error(func):
+    """
+    Decorator to retry a function on connection errors, 5xx and 429 responses,
+    waiting an exponentially growing, jittered delay between attempts.
+    Read timeouts are not retried: the request was sent and may still be
+    processed, so a chat completion would be paid for and run twice.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(settings.HTTP_MAX_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except (ConnectionError, HTTPError) as e:
+                transient = not isinstance(e, HTTPError) or (
+                    e.response is not None
+                    and (
+                        e.response.status_code >= 500
+                        or e.response.status_code == 429
+                    )
+                )
+                if not transient or attempt == settings.HTTP_MAX_RETRIES:
+                    raise
+                delay = random.uniform(
+                    0, settings.HTTP_RETRY_BACKOFF * 2**attempt
+                )
+                log.warning(f"{e}, retrying in {delay:.2f} seconds")
+                time.sleep(delay)
+
+    return wrapper
+
+
+def get_token_expiry(token: str) -> float | None:
+    """
+    Read the expiry timestamp from the `exp` claim of a JWT.
+    :param token: The access token.
+    :return: The expiry timestamp, or None if the token is not a JWT or has no expiry.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        )
+        return float(claims["exp"])
+    except (
+        IndexError,
+        KeyError,
+        TypeError,
+        ValueError,
+        binascii.Error,
+    ):
+        return None
@@ -1,24 +1,110 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env")
 
-    FLOW: str
+    FLOW: str = ""
+    FLOWS: dict[str, str] = {}  # flow name -> flow URL, enables supervisor mode
+    WORKER_POOL_SIZE: int = 8
+    FLOW_RESTART_DELAY: float = 5
+    FLOW_RESTART_MAX_DELAY: float = 300
+
+    PROFILE_ON_START: bool = False  # otherwise profile on SIGUSR1
+    PROFILE_DURATION: float = 30
+    PROFILE_INTERVAL: float = 0.01  # seconds between stack samples
+    PROFILE_DIR: str = "profiles"
+
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000  # metrics and local endpoints, 0 disables
+
+    ARCHIVE_DIR: str = ""  # rolling archive of every flow, empty disables
+    ARCHIVE_DURATION: float = 1800  # seconds kept
+    ARCHIVE_VIDEO: bool = False  # also copy the video to segment files
+    ARCHIVE_MAX_CLIP_DURATION: float = 600
+
+    SUBTITLES_DIR: str = ""  # live subtitles of every flow, empty disables
+    SUBTITLES_SEGMENT_DURATION: float = 10  # seconds per subtitle file
+    SUBTITLES_WINDOW: int = 30  # segments listed in the HLS playlist
+    SUBTITLES_RETENTION: float = 3600  # seconds of subtitle files kept
+
+    INDEX_PATH: str = ""  # full-text transcript index, empty disables
+    INDEX_BATCH_SIZE: int = 500  # segments written per transaction
+    INDEX_FLUSH_INTERVAL: float = 1  # seconds before segments are written
+    INDEX_MAX_RESULTS: int = 100
+
+    FFMPEG_RECONNECT_DELAY: float = 1  # seconds, the first retry is immediate
+    FFMPEG_RECONNECT_MAX_DELAY: float = 60
+    FFMPEG_STALL_TIMEOUT: float = 30  # seconds without output before a restart
+
+    MAX_SEGMENT_DURATION: float = 60  # seconds, audio is force-split past it
+    SEGMENT_OVERLAP: float = 1  # seconds shared by force-split segments
+    SPLIT_SEARCH_WINDOW: float = 5  # seconds searched for the quietest point
+
+    ADAPTIVE_CHUNKS: bool = False  # tune the chunk duration to backend latency
+    CHUNK_MIN_DURATION: int = 10
+    CHUNK_MAX_DURATION: int = 45
+    LATENCY_TARGET: float = 90  # seconds from the end of a chunk to the verdict
+    SHED_LAG_THRESHOLD: float = 0  # seconds behind real time, 0 disables
+    SHED_TRANSCRIPTION_MODEL: str = "base"  # used from twice the threshold
+
+    VAD_ENABLED: bool = False
+    VAD_MIN_SPEECH_RATIO: float = 0.2  # segments with less speech are skipped
+
+    # flow name, or "*" for every flow -> {regular expression: weight},
+    # flows without rules call the analyzer on every segment
+    RELEVANCE_RULES: dict[str, dict[str, float]] = {}
+    RELEVANCE_THRESHOLD: float = 1
+    RELEVANCE_MAX_PENDING_CHARS: int = 2000  # calls the analyzer anyway
+
+    CACHE_ENABLED: bool = False  # reuse transcripts and verdicts of repeats
+    CACHE_MAX_ENTRIES: int = 1000
+    CACHE_TTL: float = 86400
+    CACHE_PATH: str = ""  # SQLite database, empty to keep it in memory only
+
+    HTTP_POOL_SIZE: int = 10
+    HTTP_CONNECT_TIMEOUT: float = 5
+    HTTP_READ_TIMEOUT: float = 300
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_RETRY_BACKOFF: float = 0.5  # seconds, doubled on every retry
+    TOKEN_REFRESH_MARGIN: float = 60  # seconds before expiry
 
     AI_BASE_URL: str
     AI_EMAIL: str
     AI_PASSWORD: str
+    AI_STREAMING: bool = False
+    AI_SUMMARY_MODEL: str = "trs-summarizer-main"
+    AI_CONTEXT_MAX_CHARS: int = 8000  # roughly 2000 tokens
+    AI_CONTEXT_MAX_MESSAGES: int = 10
 
     TRANSCRIPTION_BASE_URL: str
     TRANSCRIPTION_USERNAME: str
     TRANSCRIPTION_PASSWORD: str
+    TRANSCRIPTION_CODEC: str = "wav"  # wav, flac or opus
+    TRANSCRIPTION_CONCURRENCY: int = 1  # segments transcribed in parallel
+    TRANSCRIPTION_BACKEND: str = "remote"  # remote service or local engine
+
+    # in-process engine, needs the "local" extra
+    LOCAL_TRANSCRIPTION_MODEL: str = (
+        "small"  # model size or converted model path
+    )
+    LOCAL_TRANSCRIPTION_COMPUTE_TYPE: str = "int8"
+    LOCAL_TRANSCRIPTION_THREADS: int = 0  # 0 for the engine default
+    LOCAL_TRANSCRIPTION_BATCH_SIZE: int = 8  # 30-second clips decoded together
 
     RABBITMQ_USER: str
     RABBITMQ_PASSWORD: str
     RABBITMQ_HOST: str
     RABBITMQ_PORT: int
     RABBITMQ_QUEUE: str
+    RABBITMQ_OUTBOX_PATH: str = "outbox.jsonl"
+
+    @model_validator(mode="after")
+    def _check_flows(self) -> "Settings":
+        if not (self.FLOW or self.FLOWS):
+            raise ValueError("Set FLOW, or FLOWS for supervisor mode")
+        return self
 
 
 settings = Settings()
@@ -1,9 +1,30 @@
 from src.config import settings
-from src.stream import StreamService
+from src.profiling import profiler
+from src.server import Server
+from src.stream import FlowSupervisor, StreamService
+from src.stream.archive import serve_clip
+from src.stream.index import open_index, serve_search
 
 
 def main():
-    StreamService(settings.FLOW).process()
+    profiler.install()
+
+    if settings.SERVER_PORT:
+        server = Server()
+        if settings.ARCHIVE_DIR:
+            server.route("/clip", serve_clip)
+        if settings.INDEX_PATH:
+            server.route("/search", serve_search)
+        server.start()
+
+    try:
+        if settings.FLOWS:
+            FlowSupervisor(settings.FLOWS).run()
+        else:
+            StreamService(settings.FLOW).process()
+    finally:
+        if settings.INDEX_PATH:
+            open_index().close()
 
 
 if __name__ == "__main__":
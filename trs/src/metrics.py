@@ -0,0 +1,79 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+
+STAGE_SECONDS = Histogram(
+    "trs_stage_seconds",
+    "Duration of a pipeline step: ffmpeg_read, silence_detection, encoding, "
+    "transcription or chat_completion.",
+    ("flow", "stage"),
+    buckets=_BUCKETS,
+)
+PUBLISH_SECONDS = Histogram(
+    "trs_publish_seconds",
+    "Delay between queuing an event for RabbitMQ and committing it.",
+    ("flow",),
+    buckets=_BUCKETS,
+)
+BUFFER_BYTES = Gauge(
+    "trs_buffer_bytes",
+    "Audio held in the buffer, pending or being transcribed.",
+    ("flow",),
+)
+REAL_TIME_FACTOR = Gauge(
+    "trs_real_time_factor",
+    "Transcription time divided by the duration of the last transcribed segment.",
+    ("flow",),
+)
+SPEECH_RATIO = Gauge(
+    "trs_speech_ratio",
+    "Share of speech in the audio segmented so far, when the speech gate is on.",
+    ("flow",),
+)
+LAG_SECONDS = Gauge(
+    "trs_lag_seconds",
+    "Delay of the last transcribed segment behind real time.",
+    ("flow",),
+)
+AI_DECISIONS = Counter(
+    "trs_ai_decisions",
+    'Analyzer verdicts: "-", "wait", "event" or "json_error".',
+    ("flow", "decision"),
+)
+SHED_DECISIONS = Counter(
+    "trs_shed_decisions",
+    "Load shedding decisions taken while behind real time.",
+    ("flow", "decision"),
+)
+RELEVANCE_DECISIONS = Counter(
+    "trs_relevance_decisions",
+    'Pre-filter decisions before the analyzer: "skipped", "relevant", '
+    '"accumulated" or "forced".',
+    ("flow", "decision"),
+)
+CACHE_LOOKUPS = Counter(
+    "trs_cache_lookups",
+    'Content cache lookups by cache ("audio" or "verdict") and result.',
+    ("flow", "cache", "result"),
+)
+RECONNECTS = Counter(
+    "trs_ffmpeg_reconnects",
+    "ffmpeg reconnects.",
+    ("flow",),
+)
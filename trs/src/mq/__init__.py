@@ -1,3 +1,3 @@
-from .client import RabbitMQ
+from .client import RabbitMQ, RabbitMQPublisher
 
-__all__ = ["RabbitMQ"]
+__all__ = ["RabbitMQ", "RabbitMQPublisher"]
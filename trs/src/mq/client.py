@@ -1,5 +1,12 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
 from typing import Optional
 
 import pika
@@ -7,7 +14,12 @@ from pika import BlockingConnection
 from pika.channel import Channel
 from pika.exceptions import AMQPConnectionError
 
+from src import log
 from src.config import settings
+from src.metrics import PUBLISH_SECONDS
+
+# queue name, message, flow and timestamp it was queued at
+OutboxEntry = tuple[str, str, str, float]
 
 
 class RabbitMQ:
@@ -22,6 +34,7 @@ class RabbitMQ:
         self.port = settings.RABBITMQ_PORT
         self.connection: Optional[BlockingConnection] = None
         self.channel: Optional[Channel] = None
+        self._declared_queues: set[str] = set()
 
     def connect(self) -> None:
         """
@@ -38,6 +51,7 @@ class RabbitMQ:
             )
             self.connection = pika.BlockingConnection(parameters)
             self.channel = self.connection.channel()
+            self._declared_queues.clear()
         except AMQPConnectionError as e:
             raise
         except Exception as e:
@@ -77,8 +91,10 @@ class RabbitMQ:
             raise ValueError("")
 
         try:
-            # Объявление очереди
-            self.channel.queue_declare(queue=queue_name, durable=True)
+            # Объявление очереди, один раз на соединение
+            if queue_name not in self._declared_queues:
+                self.channel.queue_declare(queue=queue_name, durable=True)
+                self._declared_queues.add(queue_name)
             # Публикация сообщения
             self.channel.basic_publish(
                 exchange="",
@@ -92,3 +108,214 @@ class RabbitMQ:
             raise
         except Exception as e:
             raise
+
+
+class RabbitMQPublisher:
+    """
+    Long-lived RabbitMQ publisher running on its own thread.
+
+    `publish` only appends the message to a local outbox and returns, so it
+    never blocks the caller. The publisher thread keeps one connection open,
+    reconnecting with backoff when it drops, and publishes the outbox in
+    batches, each batch committed in one AMQP transaction. Messages leave the
+    outbox only once their batch is committed. The outbox is mirrored to a
+    file, so messages also survive a restart while the broker is unreachable.
+
+    The file is a log: messages are appended as they are queued and every
+    committed batch appends the number of messages it removed. It is
+    truncated whenever the outbox empties, and rewritten with the waiting
+    messages only once the removed ones outnumber them, so the file I/O per
+    message stays constant however long the outbox grows.
+    """
+
+    def __init__(
+        self,
+        outbox_path: str = settings.RABBITMQ_OUTBOX_PATH,
+        batch_size: int = 100,
+        reconnect_delay: float = 1,
+        reconnect_max_delay: float = 60,
+    ):
+        """
+        :param outbox_path: File mirroring the outbox, empty to keep it in memory only.
+        :param batch_size: Maximum number of messages committed at once.
+        :param reconnect_delay: Initial delay before reconnecting, in seconds.
+        :param reconnect_max_delay: Maximum delay before reconnecting, in seconds.
+        """
+        self._outbox_path = Path(outbox_path) if outbox_path else None
+        self._batch_size = batch_size
+        self._reconnect_delay = reconnect_delay
+        self._reconnect_max_delay = reconnect_max_delay
+
+        self._outbox: deque[OutboxEntry] = deque(self._load_outbox())
+        self._stale_lines = 0  # of published messages and acks in the file
+        self._lock = threading.Lock()
+        if self._outbox_path:
+            self._outbox_path.parent.mkdir(parents=True, exist_ok=True)
+            self._rewrite_outbox()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._mq: Optional[RabbitMQ] = None
+
+    def __len__(self) -> int:
+        """
+        Number of messages waiting in the outbox.
+        """
+        return len(self._outbox)
+
+    def start(self) -> None:
+        """
+        Start the publisher thread.
+        :return: None
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="publisher", daemon=True
+        )
+        self._thread.start()
+
+    def close(self, timeout: float = 10) -> None:
+        """
+        Stop the publisher thread, giving it some time to flush the outbox.
+        :param timeout: Maximum time to wait for the flush, in seconds.
+        :return: None
+        """
+        deadline = time.monotonic() + timeout
+        while self._outbox and time.monotonic() < deadline:
+            if not (self._thread and self._thread.is_alive()):
+                break
+            time.sleep(0.1)
+
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._outbox:
+            log.warning(f"{len(self._outbox)} messages left in the outbox")
+
+    def publish(self, queue_name: str, message: str, flow: str = "") -> None:
+        """
+        Add a message to the outbox. It is published by the publisher thread.
+        :param queue_name: The name of the queue to publish the message to.
+        :param message: The message to be published.
+        :param flow: Name of the flow the message comes from, used in metrics.
+        :return: None
+        """
+        entry = (queue_name, message, flow, time.time())
+        with self._lock:
+            self._outbox.append(entry)
+            self._append_outbox(json.dumps(entry))
+
+    def _run(self) -> None:
+        delay = self._reconnect_delay
+
+        while not self._stop.is_set():
+            try:
+                self._connect()
+                delay = self._reconnect_delay
+                self._flush()
+            except Exception as e:
+                log.error(f"RabbitMQ publisher error: {e}")
+                self._disconnect()
+                self._stop.wait(delay)
+                delay = min(delay * 2, self._reconnect_max_delay)
+
+        self._disconnect()
+
+    def _connect(self) -> None:
+        if self._mq and self._mq.connection and self._mq.connection.is_open:
+            return
+        self._mq = RabbitMQ()
+        self._mq.connect()
+        self._mq.channel.tx_select()
+        if self._outbox:
+            log.info(f"Connected to RabbitMQ, flushing {len(self)} messages")
+
+    def _disconnect(self) -> None:
+        if self._mq:
+            try:
+                self._mq.close()
+            except Exception as e:
+                log.warning(f"Failed to close RabbitMQ connection: {e}")
+            self._mq = None
+
+    def _flush(self) -> None:
+        """
+        Publish the outbox batch by batch, servicing heartbeats while it is empty.
+        """
+        while not self._stop.is_set():
+            with self._lock:
+                batch = list(islice(self._outbox, self._batch_size))
+            if not batch:
+                self._mq.connection.process_data_events(time_limit=0.5)
+                continue
+
+            for queue_name, message, _, _ in batch:
+                self._mq.publish(queue_name, message)
+            self._mq.channel.tx_commit()
+
+            committed = time.time()
+            for _, _, flow, queued in batch:
+                PUBLISH_SECONDS.labels(flow).observe(committed - queued)
+            with self._lock:
+                for _ in batch:
+                    self._outbox.popleft()
+                self._ack_outbox(len(batch))
+
+    def _load_outbox(self) -> list[OutboxEntry]:
+        """
+        Replay the outbox file: messages, each ack removing the oldest ones.
+        """
+        if not self._outbox_path or not self._outbox_path.exists():
+            return []
+        messages: deque[OutboxEntry] = deque()
+        with self._outbox_path.open() as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line of a file cut short by a crash
+                    continue
+                if isinstance(entry, int):
+                    for _ in range(min(entry, len(messages))):
+                        messages.popleft()
+                elif len(entry) == 2:
+                    # Queued before the flow and the time were recorded
+                    messages.append((*entry, "", time.time()))
+                else:
+                    messages.append(tuple(entry))
+        if messages:
+            log.info(f"Loaded {len(messages)} messages from the outbox")
+        return list(messages)
+
+    def _append_outbox(self, line: str) -> None:
+        if self._outbox_path:
+            with self._outbox_path.open("a") as f:
+                f.write(line + "\n")
+
+    def _ack_outbox(self, count: int) -> None:
+        """
+        Record that the oldest messages were published.
+        Must be called with the lock held.
+        """
+        if not self._outbox_path:
+            return
+        self._stale_lines += count + 1
+        if not self._outbox:
+            self._outbox_path.open("w").close()
+            self._stale_lines = 0
+        elif self._stale_lines > len(self._outbox):
+            self._rewrite_outbox()
+        else:
+            self._append_outbox(json.dumps(count))
+
+    def _rewrite_outbox(self) -> None:
+        """
+        Replace the outbox file with the waiting messages only.
+        """
+        tmp_path = self._outbox_path.with_suffix(".tmp")
+        with tmp_path.open("w") as f:
+            for entry in self._outbox:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, self._outbox_path)
+        self._stale_lines = 0
@@ -0,0 +1,211 @@
+import functools
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from src import log
+from src.config import settings
+
+
+class Profiler:
+    """
+    On-demand profiler of the running process.
+
+    SIGUSR1, or PROFILE_ON_START at startup, opens a profiling window:
+    - a statistical sampler records the Python stacks of every thread,
+      written per flow (the thread name prefix, e.g. "main" of "main:reader",
+      other threads go to "process") in the collapsed format of flame graph tools;
+    - functions decorated with `profiled` record their calls per flow;
+    - tracemalloc traces the allocations made during the window and the
+      heap growth by line at its end is written.
+    tracemalloc slows allocations down, by up to a third in allocation-heavy
+    code, so it is stopped with the window. Nothing is traced outside of a
+    window.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.PROFILE_DIR,
+        duration: float = settings.PROFILE_DURATION,
+        interval: float = settings.PROFILE_INTERVAL,
+    ):
+        """
+        :param directory: Directory the profiles are written to.
+        :param duration: Length of a profiling window, in seconds.
+        :param interval: Interval between stack samples, in seconds.
+        """
+        self._directory = Path(directory)
+        self._duration = duration
+        self._interval = interval
+        self.active = False
+        self._calls: dict[tuple[str, str], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        """
+        Open a profiling window on SIGUSR1, and right away if PROFILE_ON_START is set.
+        Must be called from the main thread.
+        :return: None
+        """
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.trigger())
+        log.info(
+            f"Send SIGUSR1 to process {os.getpid()} to profile it "
+            f"for {self._duration:.0f} seconds"
+        )
+        if settings.PROFILE_ON_START:
+            self.trigger()
+
+    def trigger(self) -> bool:
+        """
+        Open a profiling window unless one is already open.
+        :return: True if a window was opened.
+        """
+        with self._lock:
+            if self.active:
+                return False
+            self.active = True
+        threading.Thread(target=self._run, name="profiler", daemon=True).start()
+        return True
+
+    def record(self, function: str, elapsed: float) -> None:
+        """
+        Record a call of a profiled function.
+        :param function: Qualified name of the function.
+        :param elapsed: Duration of the call, in seconds.
+        :return: None
+        """
+        key = (current_flow(), function)
+        with self._lock:
+            calls = self._calls.setdefault(key, [0, 0.0, 0.0])
+            calls[0] += 1
+            calls[1] += elapsed
+            calls[2] = max(calls[2], elapsed)
+
+    def _run(self) -> None:
+        """
+        Sample stacks for the duration of the window and write the profiles.
+        """
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        log.info(f"Profiling for {self._duration:.0f} seconds")
+
+        # Tracing started by other means, e.g. PYTHONTRACEMALLOC, is left on
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        start_snapshot = tracemalloc.take_snapshot()
+
+        stacks: dict[str, Counter[str]] = defaultdict(Counter)
+        own = threading.get_ident()
+        deadline = time.monotonic() + self._duration
+        try:
+            while time.monotonic() < deadline:
+                names = {
+                    thread.ident: thread.name
+                    for thread in threading.enumerate()
+                }
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    # Threads outside of the flows are grouped together
+                    name, _, stage = names.get(ident, "").partition(":")
+                    stacks[name if stage else "process"][_collapse(frame)] += 1
+                time.sleep(self._interval)
+
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+            with self._lock:
+                calls, self._calls = self._calls, {}
+                self.active = False
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        for flow, flow_stacks in stacks.items():
+            tag = re.sub(r"[^\w.-]", "_", flow)
+            self._write(
+                f"{stamp}-{tag}-cpu.txt",
+                [f"{stack} {count}" for stack, count in flow_stacks.items()],
+            )
+        self._write(
+            f"{stamp}-calls.txt",
+            [
+                f"{flow} {function} calls={count} total={total:.4f}s "
+                f"mean={total / count:.4f}s max={longest:.4f}s"
+                for (flow, function), (count, total, longest) in sorted(
+                    calls.items()
+                )
+            ],
+        )
+        self._write(f"{stamp}-memory.txt", _memory(snapshot, start_snapshot))
+        log.info(f"Profiles written to {self._directory}/{stamp}-*")
+
+    def _write(self, filename: str, lines: list[str]) -> None:
+        (self._directory / filename).write_text("\n".join(lines) + "\n")
+
+
+def current_flow() -> str:
+    """
+    Flow the current thread works for, taken from the thread name prefix.
+    """
+    return threading.current_thread().name.split(":")[0]
+
+
+def _memory(
+    snapshot: tracemalloc.Snapshot, start_snapshot: tracemalloc.Snapshot
+) -> list[str]:
+    """
+    Heap growth by line between two snapshots, without the profiler's own
+    allocations.
+    """
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = snapshot.filter_traces(filters).compare_to(
+        start_snapshot.filter_traces(filters), "lineno"
+    )
+    return [
+        "Heap growth by line during the window",
+        *(str(stat) for stat in stats[:50]),
+    ]
+
+
+def _collapse(frame) -> str:
+    """
+    A stack as a single line of frames separated by semicolons, outermost first.
+    """
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+profiler = Profiler()
+
+
+def profiled(func):
+    """
+    Decorator recording the calls of a function while a profiling window is open.
+    Outside of a window it costs a single attribute check per call.
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.active:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.record(name, time.perf_counter() - started)
+
+    return wrapper
@@ -0,0 +1,88 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from src import log
+from src.config import settings
+
+# query parameters -> (status, content type, body)
+Handler = Callable[[dict[str, list[str]]], tuple[int, str, bytes]]
+
+
+class Server:
+    """
+    Small HTTP server running in a background thread of the process.
+    Serves the Prometheus metrics on /metrics and any other registered route.
+    """
+
+    def __init__(
+        self, host: str = settings.SERVER_HOST, port: int = settings.SERVER_PORT
+    ):
+        """
+        :param host: Address to listen on.
+        :param port: Port to listen on.
+        """
+        self._address = (host, port)
+        self._routes: dict[str, Handler] = {"/metrics": _metrics}
+        self._server: ThreadingHTTPServer | None = None
+
+    def route(self, path: str, handler: Handler) -> None:
+        """
+        Serve GET requests on a path.
+        :param path: The path, e.g. "/clip".
+        :param handler: Function taking the query parameters and returning the status, content type and body.
+        :return: None
+        """
+        self._routes[path] = handler
+
+    def start(self) -> None:
+        """
+        Start serving in a daemon thread.
+        :return: None
+        """
+        routes = self._routes
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                handler = routes.get(url.path)
+                if handler is None:
+                    self.send_error(404)
+                    return
+                try:
+                    status, content_type, body = handler(parse_qs(url.query))
+                except Exception as e:
+                    log.exception(f"Failed to serve {self.path}: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                log.debug(format % args)
+
+        self._server = ThreadingHTTPServer(self._address, RequestHandler)
+        threading.Thread(
+            target=self._server.serve_forever, name="server", daemon=True
+        ).start()
+        log.info(f"Serving on {self._address[0]}:{self._address[1]}")
+
+    def close(self) -> None:
+        """
+        Stop serving.
+        :return: None
+        """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _metrics(query: dict[str, list[str]]) -> tuple[int, str, bytes]:
+    return 200, CONTENT_TYPE_LATEST, generate_latest()
@@ -1,3 +1,4 @@
 from .services import StreamService
+from .supervisor import FlowSupervisor
 
-__all__ = ["StreamService"]
+__all__ = ["FlowSupervisor", "StreamService"]
@@ -0,0 +1,179 @@
+import threading
+
+from src import log
+
+
+class LatencyModel:
+    """
+    Online estimate of request latency as a fixed overhead plus a rate per
+    second of audio, fitted by least squares over exponentially decaying
+    samples so that it follows changes in backend load.
+    """
+
+    def __init__(self, decay: float = 0.9):
+        """
+        :param decay: Weight kept by previous samples on every new one (default is 0.9).
+        """
+        self._decay = decay
+        self._w = self._x = self._y = self._xx = self._xy = 0.0
+
+    def __bool__(self) -> bool:
+        return self._w > 0
+
+    def observe(self, seconds: float, latency: float) -> None:
+        """
+        Add a measured request.
+        :param seconds: Duration of the audio the request was about, in seconds.
+        :param latency: Duration of the request, in seconds.
+        :return: None
+        """
+        d = self._decay
+        self._w = self._w * d + 1
+        self._x = self._x * d + seconds
+        self._y = self._y * d + latency
+        self._xx = self._xx * d + seconds * seconds
+        self._xy = self._xy * d + seconds * latency
+
+    def estimate(self) -> tuple[float, float]:
+        """
+        Get the fitted latency model.
+        :return: Overhead in seconds and rate in seconds per second of audio.
+        """
+        if not self._w:
+            return 0.0, 0.0
+
+        mean_x = self._x / self._w
+        mean_y = self._y / self._w
+        variance = self._xx / self._w - mean_x**2
+
+        # Requests of (nearly) the same duration cannot tell overhead
+        # and rate apart, so the latency is taken as proportional
+        if variance < 1:
+            return 0.0, mean_y / mean_x if mean_x else 0.0
+
+        rate = (self._xy / self._w - mean_x * mean_y) / variance
+        rate = max(rate, 0.0)
+        return max(mean_y - rate * mean_x, 0.0), rate
+
+
+class ChunkController:
+    """
+    Adaptive read chunk duration, which is also the target segment duration.
+
+    Transcription and AI latencies are measured per request. The controller
+    picks the shortest chunk the backends can keep up with, so news reach the
+    analyzer sooner while the backends are fast, and longer chunks, meaning
+    fewer requests with less overhead, while they are slow. A warning is
+    logged when the end-to-end latency target cannot be met, since keeping
+    up with the stream takes precedence over it.
+    """
+
+    def __init__(
+        self,
+        chunk_duration: float,
+        min_duration: float,
+        max_duration: float,
+        latency_target: float,
+        concurrency: int = 1,
+        utilization: float = 0.8,
+        name: str = "main",
+    ):
+        """
+        :param chunk_duration: Initial chunk duration, in seconds.
+        :param min_duration: Minimum chunk duration, in seconds.
+        :param max_duration: Maximum chunk duration, in seconds.
+        :param latency_target: Target delay from the end of a chunk to the analyzer verdict, in seconds.
+        :param concurrency: Number of segments transcribed in parallel.
+        :param utilization: Share of real time the backends may be busy (default is 0.8).
+        :param name: Name of the flow, used in log messages.
+        """
+        self._duration = float(chunk_duration)
+        self._min_duration = min_duration
+        self._max_duration = max_duration
+        self._latency_target = latency_target
+        self._concurrency = concurrency
+        self._utilization = utilization
+        self._name = name
+        self._transcription = LatencyModel()
+        self._analysis = LatencyModel()
+        self._late = False  # the latency target cannot be met
+        self._lock = threading.Lock()
+
+    @property
+    def chunk_duration(self) -> int:
+        """
+        Current chunk duration, in whole seconds.
+        """
+        return round(self._duration)
+
+    def observe_transcription(self, seconds: float, latency: float) -> None:
+        """
+        Record a transcription request.
+        :param seconds: Duration of the transcribed audio, in seconds.
+        :param latency: Duration of the request, in seconds.
+        :return: None
+        """
+        with self._lock:
+            self._transcription.observe(seconds, latency)
+            self._update()
+
+    def observe_analysis(self, seconds: float, latency: float) -> None:
+        """
+        Record an AI request.
+        :param seconds: Duration of the analyzed audio, in seconds.
+        :param latency: Duration of the request, in seconds.
+        :return: None
+        """
+        with self._lock:
+            self._analysis.observe(seconds, latency)
+            self._update()
+
+    def _update(self) -> None:
+        """
+        Move the chunk duration halfway towards the current optimum.
+        """
+        if not (self._transcription and self._analysis):
+            return
+
+        transcription_overhead, transcription_rate = (
+            self._transcription.estimate()
+        )
+        analysis_overhead, analysis_rate = self._analysis.estimate()
+
+        # Shortest chunk each backend keeps up with: overhead + rate * d <= u * d,
+        # where transcription requests share the load between workers
+        shortest = self._min_duration
+        for overhead, rate in (
+            (
+                transcription_overhead / self._concurrency,
+                transcription_rate / self._concurrency,
+            ),
+            (analysis_overhead, analysis_rate),
+        ):
+            if rate >= self._utilization:
+                shortest = self._max_duration
+            elif overhead:
+                shortest = max(shortest, overhead / (self._utilization - rate))
+
+        # Longest chunk within the latency target: d + both latencies <= target
+        longest = (
+            self._latency_target - transcription_overhead - analysis_overhead
+        ) / (1 + transcription_rate + analysis_rate)
+
+        late = longest < shortest
+        if late and not self._late:
+            log.warning(
+                f"Flow {self._name} cannot meet the latency target of "
+                f"{self._latency_target:.0f}s with the current backend latency"
+            )
+        self._late = late
+
+        target = max(self._min_duration, min(shortest, self._max_duration))
+
+        previous = self.chunk_duration
+        self._duration += (target - self._duration) / 2
+        if self.chunk_duration != previous:
+            log.info(
+                f"Chunk duration of flow {self._name} changed from "
+                f"{previous}s to {self.chunk_duration}s"
+            )
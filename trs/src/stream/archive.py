@@ -0,0 +1,457 @@
+import math
+import mmap
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from src import log
+from src.config import settings
+
+
+class AudioArchive:
+    """
+    Rolling archive of the last minutes of a flow in a memory-mapped ring file.
+
+    Audio is appended with the timestamp of its first sample. Audio
+    continuing the previous write extends the current span, any other
+    timestamp (after a gap) starts a new one, so every byte of the ring maps
+    back to its time in the stream. Reading a time range copies the archived
+    audio out and fills what is missing with silence.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        duration: float,
+        sample_rate: int = 16000,
+        sample_width: int = 2,
+    ):
+        """
+        :param path: The ring file, created or overwritten.
+        :param duration: Duration of the archived audio, in seconds.
+        :param sample_rate: Sample rate of the audio.
+        :param sample_width: Width of each sample in bytes.
+        """
+        self.sample_rate = sample_rate
+        self._sample_width = sample_width
+        self._bytes_per_second = sample_rate * sample_width
+        self._capacity = int(duration * sample_rate) * sample_width
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = path.open("w+b")
+        self._file.truncate(self._capacity)
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+
+        self._total = 0  # bytes written since the start
+        self._end: float | None = None  # timestamp of the end of the audio
+        self._spans: deque[tuple[float, int]] = deque()  # (timestamp, total)
+        self._lock = threading.Lock()
+
+    def write(self, timestamp: float, audio: bytes | memoryview) -> None:
+        """
+        Append audio to the archive.
+        :param timestamp: Absolute timestamp of the first sample.
+        :param audio: Bytes representing the audio data.
+        :return: None
+        """
+        if len(audio) > self._capacity:
+            skipped = len(audio) - self._capacity
+            timestamp += skipped / self._bytes_per_second
+            audio = audio[skipped:]
+
+        with self._lock:
+            if self._end is None or abs(timestamp - self._end) > 0.01:
+                self._spans.append((timestamp, self._total))
+
+            position = self._total % self._capacity
+            head = min(len(audio), self._capacity - position)
+            self._map[position : position + head] = audio[:head]
+            self._map[: len(audio) - head] = audio[head:]
+            self._total += len(audio)
+            self._end = timestamp + len(audio) / self._bytes_per_second
+
+            # Forget spans that were overwritten entirely
+            while (
+                len(self._spans) > 1
+                and self._spans[1][1] <= self._total - self._capacity
+            ):
+                self._spans.popleft()
+
+    def read(self, start: float, end: float) -> bytes | None:
+        """
+        Copy the audio of a time range out of the archive.
+        :param start: Absolute timestamp of the start of the range.
+        :param end: Absolute timestamp of the end of the range.
+        :return: The audio, with silence where nothing was archived, or None if nothing of the range was.
+        """
+        size = self._align((end - start) * self._bytes_per_second)
+        if size <= 0:
+            return None
+        output = bytearray(size)
+        found = False
+
+        with self._lock:
+            oldest = max(self._total - self._capacity, 0)
+            spans = list(self._spans)
+            for i, (timestamp, total) in enumerate(spans):
+                span_end = (
+                    spans[i + 1][1] if i + 1 < len(spans) else self._total
+                )
+                # Bytes of the span still archived that fall in the range
+                first = max(
+                    total
+                    + self._align((start - timestamp) * self._bytes_per_second),
+                    total,
+                    oldest,
+                )
+                last = min(
+                    total
+                    + self._align((end - timestamp) * self._bytes_per_second),
+                    span_end,
+                )
+                if first >= last:
+                    continue
+
+                # Position of the first byte in the clip, which may be off by
+                # a sample before the clip start
+                offset = self._align(
+                    (timestamp - start) * self._bytes_per_second
+                    + (first - total)
+                )
+                offset = min(max(offset, 0), size)
+                last = min(last, first + size - offset)
+                if first >= last:
+                    continue
+                output[offset : offset + last - first] = self._copy(first, last)
+                found = True
+
+        assert len(output) == size
+        return bytes(output) if found else None
+
+    def close(self) -> None:
+        """
+        Unmap and close the ring file.
+        :return: None
+        """
+        with self._lock:
+            self._map.close()
+            self._file.close()
+
+    def _copy(self, first: int, last: int) -> bytes:
+        """
+        Bytes of the ring between two totals, which are at most a capacity apart.
+        """
+        position = first % self._capacity
+        head = min(last - first, self._capacity - position)
+        return (
+            self._map[position : position + head]
+            + self._map[: last - first - head]
+        )
+
+    def _align(self, size: float) -> int:
+        """
+        Round a byte position down to a sample boundary, negative ones included.
+        """
+        return math.floor(size) // self._sample_width * self._sample_width
+
+
+class VideoArchive:
+    """
+    Rolling archive of the original stream, video included.
+
+    The ffmpeg process decoding the flow also copies its input without
+    re-encoding into short MPEG-TS segments, so the origin is pulled only
+    once. Every ffmpeg process starts a session of segments, listed with
+    their start and end times in the output of that process. The stream
+    service anchors each session on the timeline of the flow, so video
+    clips line up with the audio archive across reconnects. Segments older
+    than the archive duration are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        duration: float,
+        segment_time: float = 10,
+        name: str = "main",
+    ):
+        """
+        :param directory: Directory of the segments of the flow, cleared on start.
+        :param duration: Duration of the archived stream, in seconds.
+        :param segment_time: Duration of a segment, in seconds.
+        :param name: Name of the flow, used in log messages.
+        """
+        self._directory = directory
+        self._duration = duration
+        self._segment_time = segment_time
+        self._name = name
+        # session -> timestamp of its output time 0, None until anchored
+        self._sessions: dict[str, float | None] = {}
+        self._session: str | None = None
+        self._lock = threading.Lock()
+
+        # Segments of a previous run cannot be anchored any more
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+
+    def output_args(self) -> list[str]:
+        """
+        Start a new session of segments.
+        :return: ffmpeg arguments of an output writing the segments of the session.
+        """
+        with self._lock:
+            self._session = f"{time.time_ns()}"
+            self._sessions[self._session] = None
+            prefix = self._directory / self._session
+        return [
+            "-map",
+            "0",
+            "-c",
+            "copy",
+            "-f",
+            "segment",
+            "-segment_time",
+            str(self._segment_time),
+            "-reset_timestamps",
+            "1",
+            "-segment_list",
+            f"{prefix}.csv",
+            "-segment_list_type",
+            "csv",
+            f"{prefix}-%06d.ts",
+        ]
+
+    def anchor(self, timestamp: float) -> None:
+        """
+        Place the latest session on the timeline of the flow.
+        :param timestamp: Absolute timestamp of the start of the output of its ffmpeg process.
+        :return: None
+        """
+        with self._lock:
+            if self._session:
+                self._sessions[self._session] = timestamp
+                log.info(
+                    f"Video archive session {self._session} of flow "
+                    f"{self._name} anchored at {timestamp:.3f}"
+                )
+
+    def segments(self, start: float, end: float) -> list[tuple[float, Path]]:
+        """
+        Segments covering a time range.
+        :param start: Absolute timestamp of the start of the range.
+        :param end: Absolute timestamp of the end of the range.
+        :return: Start timestamps and paths of the segments, in order.
+        """
+        segments = []
+        last = -math.inf
+        for timestamp, segment_end, path in self._list():
+            # Skip segments a reconnected ffmpeg delivered again in full
+            if segment_end <= last + 0.5:
+                continue
+            last = segment_end
+            if timestamp < end and segment_end > start:
+                segments.append((timestamp, path))
+        return segments
+
+    def prune(self) -> None:
+        """
+        Delete expired segments and the lists of sessions without segments left.
+        :return: None
+        """
+        expired = time.time() - self._duration
+        for path in self._directory.glob("*.ts"):
+            try:
+                if path.stat().st_mtime < expired:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
+
+        with self._lock:
+            for session in list(self._sessions):
+                if session != self._session and not any(
+                    self._directory.glob(f"{session}-*.ts")
+                ):
+                    del self._sessions[session]
+                    (self._directory / f"{session}.csv").unlink(missing_ok=True)
+
+    def _list(self) -> list[tuple[float, float, Path]]:
+        """
+        Start and end timestamps and paths of the archived segments, in order.
+        """
+        with self._lock:
+            sessions = [
+                (session, anchor)
+                for session, anchor in self._sessions.items()
+                if anchor is not None
+            ]
+
+        segments = {}
+        for session, anchor in sessions:
+            try:
+                lines = (
+                    (self._directory / f"{session}.csv")
+                    .read_text()
+                    .splitlines()
+                )
+            except FileNotFoundError:
+                continue
+            for line in lines:
+                try:
+                    name, segment_start, segment_end = line.rsplit(",", 2)
+                    path = self._directory / name
+                    segments[path] = (
+                        anchor + float(segment_start),
+                        anchor + float(segment_end),
+                        path,
+                    )
+                except ValueError:
+                    continue  # the line being written
+        return sorted(
+            segment for segment in segments.values() if segment[2].exists()
+        )
+
+
+# flow name -> archives, kept across restarts of the flow
+_archives: dict[str, tuple[AudioArchive, VideoArchive | None]] = {}
+_archives_lock = threading.Lock()
+
+
+def open_archive(
+    name: str,
+    sample_rate: int = 16000,
+    sample_width: int = 2,
+    directory: str = settings.ARCHIVE_DIR,
+    duration: float = settings.ARCHIVE_DURATION,
+    video: bool = settings.ARCHIVE_VIDEO,
+) -> tuple[AudioArchive, VideoArchive | None]:
+    """
+    Get the archives of a flow, created on first use.
+    :param name: Name of the flow.
+    :param sample_rate: Sample rate of the audio.
+    :param sample_width: Width of each sample in bytes.
+    :param directory: Directory of the archive files.
+    :param duration: Duration of the archive, in seconds.
+    :param video: Archive the video of the flow too, written by the ffmpeg decoding it.
+    :return: The audio archive and the video archive, if enabled.
+    """
+    with _archives_lock:
+        if name not in _archives:
+            path = Path(directory)
+            _archives[name] = (
+                AudioArchive(
+                    path / f"{name}.pcm", duration, sample_rate, sample_width
+                ),
+                VideoArchive(path / name, duration, name=name)
+                if video
+                else None,
+            )
+        return _archives[name]
+
+
+def serve_clip(query: dict[str, list[str]]) -> tuple[int, str, bytes]:
+    """
+    Server route cutting a clip of a flow out of its archives.
+    Query parameters: flow (default is "main"), start and end timestamps.
+    :param query: The query parameters.
+    :return: An MP4 file with the video if it is archived, with the audio only otherwise.
+    """
+    try:
+        name = query.get("flow", ["main"])[0]
+        start = float(query["start"][0])
+        end = float(query["end"][0])
+    except (KeyError, ValueError):
+        return 400, "text/plain", b"start and end timestamps are required"
+    if not 0 < end - start <= settings.ARCHIVE_MAX_CLIP_DURATION:
+        return 400, "text/plain", b"invalid time range"
+
+    with _archives_lock:
+        archives = _archives.get(name)
+    if archives is None:
+        return 404, "text/plain", b"flow is not archived"
+    audio, video = archives
+
+    if video and (segments := video.segments(start, end)):
+        return 200, "video/mp4", _cut_video(segments, start, end)
+
+    pcm = audio.read(start, end)
+    if pcm is None:
+        return 404, "text/plain", b"time range is not archived"
+    return 200, "audio/mp4", _encode_audio(pcm, audio.sample_rate)
+
+
+def _cut_video(
+    segments: list[tuple[float, Path]], start: float, end: float
+) -> bytes:
+    """
+    Join archived segments and cut a time range out of them without re-encoding.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        playlist = Path(directory) / "segments.txt"
+        playlist.write_text(
+            "".join(f"file '{path.resolve()}'\n" for _, path in segments)
+        )
+        output = Path(directory) / "clip.mp4"
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                str(playlist),
+                "-ss",
+                f"{max(start - segments[0][0], 0):.3f}",
+                "-t",
+                f"{end - start:.3f}",
+                "-c",
+                "copy",
+                "-movflags",
+                "+faststart",
+                str(output),
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            check=True,
+        )
+        return output.read_bytes()
+
+
+def _encode_audio(pcm: bytes, sample_rate: int) -> bytes:
+    """
+    Encode 16-bit mono PCM audio into an AAC MP4 file.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / "clip.m4a"
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-loglevel",
+                "error",
+                "-f",
+                "s16le",
+                "-ar",
+                str(sample_rate),
+                "-ac",
+                "1",
+                "-i",
+                "pipe:0",
+                "-c:a",
+                "aac",
+                "-b:a",
+                "64k",
+                "-movflags",
+                "+faststart",
+                str(output),
+            ],
+            input=pcm,
+            capture_output=True,
+            check=True,
+        )
+        return output.read_bytes()
@@ -0,0 +1,151 @@
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+
+class AudioLease:
+    """
+    Region of an AudioRingBuffer handed downstream as a memoryview.
+    The region is not overwritten until the lease is released.
+    """
+
+    def __init__(self, buffer: "AudioRingBuffer", start: int, end: int):
+        self._buffer = buffer
+        self.start = start
+        self.end = end
+        self.view = buffer._view[start:end]
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def release(self) -> None:
+        """
+        Give the region back to the buffer. Releasing twice is a no-op.
+        :return: None
+        """
+        self._buffer._release(self)
+
+
+class AudioRingBuffer:
+    """
+    Preallocated buffer for the audio read from ffmpeg.
+
+    The reader fills it in place with `readinto`, the segmenter inspects the
+    unsplit audio through a memoryview and takes split segments as leases,
+    so steady-state processing does not allocate per chunk. When the end of
+    the buffer is reached, the unsplit audio (usually a few seconds) is moved
+    to the front, as long as that does not overwrite any outstanding lease.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: Size of the buffer in bytes.
+        """
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._read = 0  # start of the unsplit audio
+        self._write = 0  # end of the unsplit audio
+        self._leases: list[AudioLease] = []
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of bytes read but not split yet.
+        """
+        with self._cond:
+            return self._write - self._read
+
+    @property
+    def leased(self) -> int:
+        """
+        Number of bytes held by outstanding leases.
+        """
+        with self._cond:
+            return sum(len(lease) for lease in self._leases)
+
+    def readinto(
+        self, stream: BinaryIO, size: int, timeout: float | None = None
+    ) -> int | None:
+        """
+        Read up to `size` bytes from the stream straight into the buffer.
+        Only the calling thread writes, so the read itself runs without the lock.
+        :param stream: Stream to read from, e.g. ffmpeg stdout.
+        :param size: Maximum number of bytes to read.
+        :param timeout: How long to wait for free space, in seconds.
+        :return: Number of bytes read (0 on EOF), or None if there was no free space.
+        """
+        with self._cond:
+            if not self._reserve(size):
+                self._cond.wait(timeout)
+                if not self._reserve(size):
+                    return None
+            start = self._write
+
+        with self._view[start : start + size] as view:
+            read = stream.readinto(view) or 0
+
+        with self._cond:
+            self._write += read
+            self._cond.notify_all()
+        return read
+
+    @contextmanager
+    def unsplit(self) -> Iterator[memoryview]:
+        """
+        View of the unsplit audio, valid only inside the with block.
+        :return: Iterator yielding the memoryview.
+        """
+        with self._cond:
+            with self._view[self._read : self._write] as view:
+                yield view
+
+    def take(self, size: int, keep: int = 0) -> AudioLease:
+        """
+        Split the first bytes of the unsplit audio off as a lease.
+        :param size: Number of bytes to take.
+        :param keep: Number of trailing bytes of the lease to keep unsplit as well,
+                     so they also start the next segment.
+        :return: The lease over the taken bytes.
+        """
+        with self._cond:
+            size = min(size, self._write - self._read)
+            lease = AudioLease(self, self._read, self._read + size)
+            self._leases.append(lease)
+            self._read += size - min(keep, size)
+            return lease
+
+    def _release(self, lease: AudioLease) -> None:
+        with self._cond:
+            if lease in self._leases:
+                self._leases.remove(lease)
+                self._cond.notify_all()
+
+    def _reserve(self, size: int) -> bool:
+        """
+        Make sure `size` bytes after the unsplit audio are free, moving the
+        unsplit audio to the front of the buffer if needed.
+        """
+        if self._write + size <= self.capacity and self._is_free(
+            self._write, self._write + size
+        ):
+            return True
+
+        backlog = self._write - self._read
+        if backlog + size > self.capacity or not self._is_free(
+            0, backlog + size
+        ):
+            return False
+
+        self._view[:backlog] = self._view[self._read : self._write]
+        self._read, self._write = 0, backlog
+        return True
+
+    def _is_free(self, start: int, end: int) -> bool:
+        return all(
+            lease.end <= start or lease.start >= end for lease in self._leases
+        )
@@ -0,0 +1,453 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from src import log
+from src.api.transcription.schemas import Segment
+from src.stream.schemas import Message
+
+_TIMESTAMP = re.compile(r"^\[[\d.]+ - [\d.]+\] ", re.MULTILINE)
+_NON_WORD = re.compile(r"\W+")
+
+# bits of every frame, and whether both frames a row compares carry signal
+Fingerprint = tuple[np.ndarray, np.ndarray]
+
+
+class AudioFingerprinter:
+    """
+    Compact fingerprint of 16-bit mono PCM audio that survives re-encoding.
+
+    Audio is cut into overlapping frames and the energy of every frame is
+    measured in log-spaced bands of the speech range. Each bit tells whether
+    the energy difference between neighbouring bands grew or shrank since
+    the previous frame, so the fingerprint depends on the shape of the
+    spectrum over time rather than on the exact samples or the loudness.
+    Bits of near-silent frames say nothing about the content, they are
+    marked so that matching ignores them.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame: int = 2048,
+        hop: int = 512,
+        bands: int = 17,
+        silence_threshold: float = -60,
+    ):
+        """
+        :param sample_rate: Sample rate of the audio (default is 16000).
+        :param frame: Length of the analysed frames in samples (default is 2048).
+        :param hop: Distance between frames in samples (default is 512).
+        :param bands: Number of bands, a frame gives one bit less (default is 17).
+        :param silence_threshold: Frames quieter than this carry no signal, in dBFS (default is -60).
+        """
+        self._frame = frame
+        self._hop = hop
+        self._window = np.hanning(frame).astype(np.float32)
+        self._min_power = 10 ** (silence_threshold / 10)
+
+        frequencies = np.fft.rfftfreq(frame, 1 / sample_rate)
+        edges = np.geomspace(300, 3000, bands + 1)
+        self._bands = np.searchsorted(frequencies, edges)
+
+    def fingerprint(self, audio_bytes: bytes | memoryview) -> Fingerprint:
+        """
+        Fingerprint the audio.
+        :param audio_bytes: Bytes representing the audio data.
+        :return: Boolean arrays of the bits, of shape (frames - 1, bands - 1), and of the rows carrying signal, both empty for audio shorter than two frames.
+        """
+        samples = np.frombuffer(audio_bytes, dtype="<i2")
+        if len(samples) < self._frame + self._hop:
+            return (
+                np.zeros((0, len(self._bands) - 2), dtype=bool),
+                np.zeros(0, dtype=bool),
+            )
+
+        x = np.lib.stride_tricks.sliding_window_view(samples, self._frame)
+        x = x[:: self._hop].astype(np.float32) / 2**15
+        spectrum = np.abs(np.fft.rfft(x * self._window, axis=1)) ** 2
+
+        energy = np.add.reduceat(spectrum, self._bands, axis=1)[:, :-1]
+        band_diff = np.diff(np.log(energy + 1e-10), axis=1)
+        loud = np.mean(x * x, axis=1) > self._min_power
+        return np.diff(band_diff, axis=0) > 0, loud[:-1] & loud[1:]
+
+
+class ContentCache:
+    """
+    Cache of the remote work done on repeated content: ads, jingles and
+    headline intros come back every hour and would be transcribed and
+    analysed again.
+
+    - Audio fingerprints map to the transcribed segments. Fingerprints match
+      when their bits mostly agree at some shift of up to a quarter of a
+      second, as the same audio is never split at exactly the same sample.
+      Bits of silent frames are ignored, and audio that is mostly silence is
+      never cached, as any two such segments would match.
+    - Hashes of the normalized analyzer window map to the verdict.
+
+    Lookups do not scan the whole cache: every few frames of the cached
+    fingerprints are indexed by their bits and position, and only the entries
+    sharing the most of them with the looked up fingerprint at a consistent
+    position are compared, outside the lock.
+
+    Entries expire after the TTL and the least recently used ones are evicted
+    past the size limit. With a path, entries are also kept in an SQLite
+    database so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl: float = 86400,
+        path: str = "",
+        sample_rate: int = 16000,
+        max_bit_error: float = 0.3,
+        max_shift: int = 8,
+        min_signal: float = 0.5,
+        max_candidates: int = 8,
+        index_step: int = 4,
+    ):
+        """
+        :param max_entries: Maximum number of entries of each kind.
+        :param ttl: Lifetime of an entry in seconds.
+        :param path: SQLite database backing the cache, empty to keep it in memory only.
+        :param sample_rate: Sample rate of the fingerprinted audio.
+        :param max_bit_error: Maximum share of differing bits of matching fingerprints.
+        :param max_shift: Maximum shift of matching fingerprints, in frames of 32 ms.
+        :param min_signal: Minimum share of frames carrying signal, of cached audio and of compared frames.
+        :param max_candidates: Maximum number of cached fingerprints compared on a lookup.
+        :param index_step: Distance between the indexed frames of cached fingerprints.
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._max_bit_error = max_bit_error
+        self._max_shift = max_shift
+        self._shifts = sorted(range(-max_shift, max_shift + 1), key=abs)
+        self._min_signal = min_signal
+        self._max_candidates = max_candidates
+        self._index_step = index_step
+        self._fingerprinter = AudioFingerprinter(sample_rate)
+        # key -> (expiry, fingerprint, segments)
+        self._audio: OrderedDict[
+            str, tuple[float, Fingerprint, list[Segment]]
+        ] = OrderedDict()
+        # frame bits -> entry id << 16 | frame position, of the indexed frames
+        self._postings: dict[int, array] = {}
+        self._entry_ids: dict[str, tuple[int, int]] = {}  # id, postings
+        self._entry_keys: dict[int, str] = {}
+        self._next_id = 0
+        self._stale_postings = 0  # of evicted entries, dropped on rebuild
+        # key -> (expiry, verdict)
+        self._verdicts: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (kind TEXT, key TEXT, "
+                "expires REAL, value TEXT, PRIMARY KEY (kind, key))"
+            )
+            self._load()
+
+    def fingerprint(self, audio_bytes: bytes | memoryview) -> Fingerprint:
+        """
+        Fingerprint audio for `get_segments` and `put_segments`.
+        :param audio_bytes: Bytes representing the audio data.
+        :return: The fingerprint.
+        """
+        return self._fingerprinter.fingerprint(audio_bytes)
+
+    def get_segments(self, fingerprint: Fingerprint) -> list[Segment] | None:
+        """
+        Find the segments of previously transcribed matching audio.
+        :param fingerprint: Fingerprint of the audio.
+        :return: The segments, or None if the audio was not seen before.
+        """
+        if not self._has_signal(fingerprint):
+            return None
+
+        now = time.time()
+        with self._lock:
+            candidates = [
+                (key, self._audio[key]) for key in self._candidates(fingerprint)
+            ]
+        for key, (expires, cached, segments) in candidates:
+            if expires > now and self._matches(fingerprint, cached):
+                with self._lock:
+                    if key in self._audio:
+                        self._audio.move_to_end(key)
+                return segments
+        return None
+
+    def put_segments(
+        self, fingerprint: Fingerprint, segments: list[Segment]
+    ) -> None:
+        """
+        Remember the segments transcribed from audio.
+        Audio that is mostly silence is not cached.
+        :param fingerprint: Fingerprint of the audio.
+        :param segments: The transcribed segments.
+        :return: None
+        """
+        if not self._has_signal(fingerprint):
+            return
+
+        bits, signal = fingerprint
+        key = hashlib.sha1(np.packbits(bits).tobytes()).hexdigest()
+        expires = time.time() + self._ttl
+        with self._lock:
+            self._audio[key] = (expires, fingerprint, segments)
+            self._add_postings(key, fingerprint)
+            self._evict(self._audio, "audio")
+        self._store(
+            "audio",
+            key,
+            expires,
+            {
+                "shape": bits.shape,
+                "bits": np.packbits(bits).tobytes().hex(),
+                "signal": np.packbits(signal).tobytes().hex(),
+                "segments": segments,
+            },
+        )
+
+    def get_verdict(self, messages: list[Message]) -> str | None:
+        """
+        Find the analyzer verdict on the same transcript window.
+        :param messages: Messages sent to the analyzer.
+        :return: The verdict, or None if the window was not seen before.
+        """
+        key = self.window_key(messages)
+        with self._lock:
+            expires, verdict = self._verdicts.get(key, (0, None))
+            if expires <= time.time():
+                return None
+            self._verdicts.move_to_end(key)
+            return verdict
+
+    def put_verdict(self, messages: list[Message], verdict: str) -> None:
+        """
+        Remember the analyzer verdict on a transcript window.
+        :param messages: Messages sent to the analyzer.
+        :param verdict: The verdict.
+        :return: None
+        """
+        key = self.window_key(messages)
+        expires = time.time() + self._ttl
+        with self._lock:
+            self._verdicts[key] = (expires, verdict)
+            self._evict(self._verdicts, "verdict")
+        self._store("verdict", key, expires, verdict)
+
+    @staticmethod
+    def window_key(messages: list[Message]) -> str:
+        """
+        Hash of the transcript window without timestamps, case and punctuation.
+        :param messages: Messages sent to the analyzer.
+        :return: The hash.
+        """
+        text = " ".join(
+            _NON_WORD.sub(" ", _TIMESTAMP.sub("", message["content"]).lower())
+            for message in messages
+        )
+        return hashlib.sha1(" ".join(text.split()).encode()).hexdigest()
+
+    def close(self) -> None:
+        """
+        Close the backing database.
+        :return: None
+        """
+        if self._db:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    def _has_signal(self, fingerprint: Fingerprint) -> bool:
+        bits, signal = fingerprint
+        return len(bits) > 0 and signal.mean() >= self._min_signal
+
+    def _matches(self, fingerprint: Fingerprint, cached: Fingerprint) -> bool:
+        """
+        Compare the bits of frames carrying signal at every allowed shift.
+        """
+        bits, signal = fingerprint
+        cached_bits, cached_signal = cached
+        if abs(len(bits) - len(cached_bits)) > 0.05 * len(cached_bits) + 16:
+            return False
+
+        for shift in self._shifts:
+            a = slice(max(shift, 0), None)
+            b = slice(max(-shift, 0), None)
+            frames = min(len(bits[a]), len(cached_bits[b]))
+            compared = signal[a][:frames] & cached_signal[b][:frames]
+            count = np.count_nonzero(compared)
+            if count < self._min_signal * frames or not count:
+                continue
+            errors = np.count_nonzero(
+                bits[a][:frames][compared] != cached_bits[b][:frames][compared]
+            )
+            if errors <= self._max_bit_error * count * bits.shape[1]:
+                return True
+        return False
+
+    def _candidates(self, fingerprint: Fingerprint) -> list[str]:
+        """
+        Keys of the cached fingerprints sharing the most indexed frames with
+        the fingerprint, at a position within the allowed shift.
+        Must be called with the lock held.
+        """
+        votes = Counter()
+        for position, value in _frame_values(fingerprint):
+            postings = self._postings.get(value)
+            # Frames of most entries, like steady tones, tell nothing
+            if not postings or len(postings) > len(self._audio):
+                continue
+            for posting in postings:
+                if abs((posting & 0xFFFF) - position) <= self._max_shift:
+                    votes[posting >> 16] += 1
+
+        keys = []
+        for entry_id, _ in votes.most_common():
+            key = self._entry_keys.get(entry_id)
+            if key is not None:
+                keys.append(key)
+                if len(keys) == self._max_candidates:
+                    break
+        return keys
+
+    def _add_postings(self, key: str, fingerprint: Fingerprint) -> None:
+        """
+        Index a cached fingerprint, replacing the postings of the same key.
+        Must be called with the lock held.
+        """
+        self._remove_postings([key])
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entry_keys[entry_id] = key
+        self._entry_ids[key] = (entry_id, self._index(entry_id, fingerprint))
+
+    def _remove_postings(self, keys: list[str]) -> None:
+        """
+        Forget the postings of entries. They stay in the index, skipped by
+        lookups, until they outnumber the live ones and the index is rebuilt.
+        Must be called with the lock held.
+        """
+        for key in keys:
+            entry_id, postings = self._entry_ids.pop(key, (None, 0))
+            if entry_id is not None:
+                del self._entry_keys[entry_id]
+                self._stale_postings += postings
+        live = sum(count for _, count in self._entry_ids.values())
+        if self._stale_postings > live:
+            self._postings = {}
+            self._stale_postings = 0
+            for key, (entry_id, _) in self._entry_ids.items():
+                self._index(entry_id, self._audio[key][1])
+
+    def _index(self, entry_id: int, fingerprint: Fingerprint) -> int:
+        """
+        Add every few frames carrying signal of a fingerprint to the index.
+        :return: The number of added postings.
+        """
+        count = 0
+        for position, value in _frame_values(fingerprint):
+            if position % self._index_step == 0:
+                self._postings.setdefault(value, array("q")).append(
+                    entry_id << 16 | min(position, 0xFFFF)
+                )
+                count += 1
+        return count
+
+    def _evict(self, entries: OrderedDict, kind: str) -> None:
+        """
+        Drop expired entries, then the least recently used ones over the limit.
+        Must be called with the lock held.
+        """
+        now = time.time()
+        expired = [key for key, entry in entries.items() if entry[0] <= now]
+        for key in expired:
+            del entries[key]
+        while len(entries) > self._max_entries:
+            expired.append(entries.popitem(last=False)[0])
+
+        if entries is self._audio:
+            self._remove_postings(expired)
+        if self._db and expired:
+            self._db.executemany(
+                "DELETE FROM cache WHERE kind = ? AND key = ?",
+                [(kind, key) for key in expired],
+            )
+            self._db.commit()
+
+    def _store(self, kind: str, key: str, expires: float, value) -> None:
+        if not self._db:
+            return
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                    (kind, key, expires, json.dumps(value)),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.error(f"Failed to store {kind} cache entry: {e}")
+
+    def _load(self) -> None:
+        """
+        Load the unexpired entries of the backing database, oldest first.
+        Audio entries stored without their signal frames are skipped.
+        """
+        now = time.time()
+        self._db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT kind, key, expires, value FROM cache ORDER BY expires"
+        ).fetchall()
+
+        with self._lock:
+            for kind, key, expires, value in rows:
+                value = json.loads(value)
+                if kind == "verdict":
+                    self._verdicts[key] = (expires, value)
+                elif "signal" in value:
+                    shape = tuple(value["shape"])
+                    bits = _unpack(value["bits"], shape[0] * shape[1])
+                    signal = _unpack(value["signal"], shape[0])
+                    fingerprint = (bits.reshape(shape), signal)
+                    self._audio[key] = (expires, fingerprint, value["segments"])
+                    self._add_postings(key, fingerprint)
+
+            self._evict(self._audio, "audio")
+            self._evict(self._verdicts, "verdict")
+        if rows:
+            log.info(
+                f"Loaded {len(self._audio)} audio and {len(self._verdicts)} "
+                f"verdict cache entries"
+            )
+
+
+def _frame_values(fingerprint: Fingerprint) -> list[tuple[int, int]]:
+    """
+    Position and bits, as an integer, of the frames carrying signal.
+    """
+    bits, signal = fingerprint
+    weights = 1 << np.arange(bits.shape[1], dtype=np.int64)
+    values = bits.astype(np.int64) @ weights
+    positions = np.flatnonzero(signal)
+    return list(
+        zip(positions.tolist(), values[positions].tolist(), strict=True)
+    )
+
+
+def _unpack(hex_bits: str, count: int) -> np.ndarray:
+    packed = np.frombuffer(bytes.fromhex(hex_bits), np.uint8)
+    return np.unpackbits(packed, count=count).astype(bool)
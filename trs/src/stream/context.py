@@ -0,0 +1,142 @@
+from typing import Callable
+
+from requests import RequestException
+
+from src import log
+from src.config import settings
+from src.stream.schemas import Message
+
+SUMMARY_PROMPT = (
+    "You summarize the transcript of a live broadcast for a system that "
+    "detects news events in it. The first message may be your summary of the "
+    "earlier transcript, the following ones continue the transcript. Write "
+    "one updated summary of all of it: the topics and stories, who and what "
+    "was named, and what is still developing. Leave out ads, jingles, "
+    "greetings and small talk. Write in the language of the transcript and "
+    "answer with the summary only, in at most {limit} characters."
+)
+
+
+class AnalyzerContext:
+    """
+    Bounded context for the analyzer.
+
+    It keeps a sliding window of the newest transcript messages within a
+    character budget and a message limit. Messages pushed out of the window
+    are folded into a rolling summary, one batch at a time, so the prompt
+    stays roughly the same size however long a story runs. Messages leave
+    the window only once they are summarized; while the summarizer fails
+    they stay, up to twice the limits.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str, list[Message]], str],
+        max_chars: int = settings.AI_CONTEXT_MAX_CHARS,
+        max_messages: int = settings.AI_CONTEXT_MAX_MESSAGES,
+    ):
+        """
+        :param summarize: Function producing the new summary from a system prompt,
+                          the previous summary message (if any) and the evicted messages.
+        :param max_chars: Character budget of the window and the summary together.
+        :param max_messages: Maximum number of messages in the window.
+        """
+        self._summarize = summarize
+        self._max_chars = max_chars
+        self._max_messages = max_messages
+        self._window: list[Message] = []
+        self._summary: Message | None = None
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def __getitem__(self, index: int) -> Message:
+        return self._window[index]
+
+    def messages(self) -> list[Message]:
+        """
+        Messages to send to the analyzer: the summary, then the window.
+        :return: List of messages.
+        """
+        if self._summary is None:
+            return list(self._window)
+        return [self._summary, *self._window]
+
+    def append(self, message: Message) -> None:
+        """
+        Add a message to the window, compacting the oldest ones if it goes over budget.
+        :param message: The message to add.
+        :return: None
+        """
+        self._window.append(message)
+
+        if not self._overflow(self._max_messages, self._max_chars):
+            return
+
+        # Evict down to half the limits, so the summary is updated once
+        # every few messages rather than on every call
+        count = self._overflow(self._max_messages // 2, self._max_chars // 2)
+        if count and self._compact(self._window[:count]):
+            del self._window[:count]
+
+        # Without a summary, prompts still may not grow without bound
+        count = self._overflow(2 * self._max_messages, 2 * self._max_chars)
+        if count:
+            log.warning(f"Dropped {count} messages that were not summarized")
+            del self._window[:count]
+
+    def drop_oldest(self) -> None:
+        """
+        Forget the oldest message of the window.
+        :return: None
+        """
+        if self._window:
+            self._window.pop(0)
+
+    def clear(self) -> None:
+        """
+        Forget the window and the summary.
+        :return: None
+        """
+        self._window = []
+        self._summary = None
+
+    def _overflow(self, max_messages: int, max_chars: int) -> int:
+        """
+        Number of the oldest messages to remove for the window to fit the
+        limits, always keeping the newest message.
+        """
+        count = len(self._window)
+        chars = sum(len(message["content"]) for message in self._window)
+        if self._summary is not None:
+            chars += len(self._summary["content"])
+
+        for i, message in enumerate(self._window[:-1]):
+            if count - i <= max_messages and chars <= max_chars:
+                return i
+            chars -= len(message["content"])
+        return len(self._window) - 1
+
+    def _compact(self, evicted: list[Message]) -> bool:
+        """
+        Fold evicted messages into the summary.
+        :return: True if the summary was updated.
+        """
+        previous = [self._summary] if self._summary is not None else []
+        # The summary must leave room for the window
+        limit = self._max_chars // 4
+        try:
+            summary = self._summarize(
+                SUMMARY_PROMPT.format(limit=limit), [*previous, *evicted]
+            )
+        except RequestException as e:
+            log.error(f"Failed to summarize context: {e}")
+            return False
+
+        summary = summary.strip()[:limit]
+        self._summary = {
+            "content": f"Summary of the earlier transcript:\n{summary}",
+            "start": (previous or evicted)[0]["start"],
+            "end": evicted[-1]["end"],
+        }
+        return True
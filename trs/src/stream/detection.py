@@ -1,30 +1,179 @@
-from pydub import AudioSegment
-from pydub.silence import detect_silence
+import math
 
+import numpy as np
 
+from src.profiling import profiled
+
+
+class SilenceDetector:
+    """
+    Incremental silence detector for 16-bit mono PCM audio.
+
+    It keeps the energy of every millisecond of the buffered audio and the state
+    of the last silent range between calls, so feeding a chunk only scans the
+    newly arrived samples. Silences are detected like pydub's `detect_silence`
+    with a 1 ms seek step: a window of `min_silence_len` ms is silent when its
+    RMS is at or below `silence_thresh` dBFS, and silent windows closer than
+    `min_silence_len` ms to each other are merged into one range.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        min_silence_len: int = 300,
+        silence_thresh: float = -40,
+    ):
+        """
+        :param sample_rate: Sample rate of the audio (default is 16000).
+        :param min_silence_len: Minimum length of a silence in milliseconds (default is 300).
+        :param silence_thresh: Upper bound for how quiet is silent in dBFS (default is -40).
+        """
+        self._samples_per_ms = sample_rate // 1000
+        self._min_silence_len = min_silence_len
+
+        # pydub compares the truncated integer RMS of a window with the threshold
+        # amplitude, which is the same as comparing the window's sum of squares
+        # with the bound below
+        thresh = 10 ** (silence_thresh / 20) * 2**15
+        self._energy_limit = (
+            (math.floor(thresh) + 1) ** 2
+            * min_silence_len
+            * self._samples_per_ms
+        )
+
+        self._energy = np.zeros(1024, dtype=np.int64)  # sum of squares per ms
+        self._size = 0  # number of complete milliseconds in the buffer
+        self._tail = b""  # bytes of the incomplete last millisecond
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget the silent ranges found so far, keeping the buffered energy.
+        :return: None
+        """
+        self._scanned = 0  # number of window starts already scanned
+        self._range_start: int | None = None
+        self._prev_start: int | None = None
+
+    def __len__(self) -> int:
+        """
+        Length of the buffered audio in milliseconds.
+        """
+        return self._size
+
+    @profiled
+    def feed(self, audio_bytes: bytes | memoryview) -> None:
+        """
+        Append audio to the buffer and scan the windows it completes.
+        :param audio_bytes: Bytes representing the audio data.
+        :return: None
+        """
+        if self._tail:
+            audio_bytes = self._tail + bytes(audio_bytes)
+
+        bytes_per_ms = self._samples_per_ms * 2
+        ms = len(audio_bytes) // bytes_per_ms
+        self._tail = bytes(audio_bytes[ms * bytes_per_ms :])
+        if not ms:
+            return
+
+        samples = np.frombuffer(
+            audio_bytes, dtype="<i2", count=ms * self._samples_per_ms
+        ).astype(np.int64)
+        energy = (samples * samples).reshape(ms, -1).sum(axis=1)
+
+        if self._size + ms > len(self._energy):
+            grown = np.zeros(
+                max(2 * len(self._energy), self._size + ms), dtype=np.int64
+            )
+            grown[: self._size] = self._energy[: self._size]
+            self._energy = grown
+        self._energy[self._size : self._size + ms] = energy
+        self._size += ms
+
+        self._scan()
+
+    def consume(self, ms: int) -> None:
+        """
+        Drop the first milliseconds of the buffer, e.g. after splitting there.
+        The remaining audio is rescanned, so ranges are found as if it had been fed anew.
+        :param ms: Number of milliseconds to drop.
+        :return: None
+        """
+        ms = min(ms, self._size)
+        self._energy[: self._size - ms] = self._energy[ms : self._size]
+        self._size -= ms
+        self.reset()
+        self._scan()
+
+    def split_ms(self) -> int:
+        """
+        Calculate the index in milliseconds of the middle of the last silence.
+        :return: The index in milliseconds, or 0 if there is no silence.
+        """
+        if self._range_start is None:
+            return 0
+        end = self._prev_start + self._min_silence_len
+        return (self._range_start + end) // 2
+
+    def quietest_ms(self, start: int, end: int, window: int = 50) -> int:
+        """
+        Find the middle of the quietest window between two points of the buffer.
+        :param start: Start of the search range in milliseconds.
+        :param end: End of the search range in milliseconds.
+        :param window: Length of the compared windows in milliseconds (default is 50).
+        :return: The index in milliseconds of the middle of the quietest window.
+        """
+        start = max(0, start)
+        end = min(end, self._size)
+        if end - start <= window:
+            return (start + end) // 2
+
+        cumulative = np.concatenate(([0], np.cumsum(self._energy[start:end])))
+        window_energy = cumulative[window:] - cumulative[:-window]
+        return start + int(np.argmin(window_energy)) + window // 2
+
+    def _scan(self) -> None:
+        """
+        Scan the window starts that have not been scanned yet.
+        """
+        window = self._min_silence_len
+        last_start = self._size - window
+        if last_start < self._scanned:
+            return
+
+        cumulative = np.concatenate(
+            ([0], np.cumsum(self._energy[self._scanned : self._size]))
+        )
+        window_energy = cumulative[window:] - cumulative[:-window]
+        starts = np.flatnonzero(window_energy < self._energy_limit)
+        starts += self._scanned
+        self._scanned = last_start + 1
+
+        if not starts.size:
+            return
+
+        if self._prev_start is None:
+            self._range_start = self._prev_start = int(starts[0])
+            starts = starts[1:]
+            if not starts.size:
+                return
+
+        previous = np.concatenate(([self._prev_start], starts[:-1]))
+        breaks = np.flatnonzero(starts > previous + window)
+        if breaks.size:
+            self._range_start = int(starts[breaks[-1]])
+        self._prev_start = int(starts[-1])
+
+
+@profiled
 def get_split_ms(audio_bytes: bytes, sample_rate=16000) -> int:
     """
     Calculate the index in milliseconds where the last silence occurs in the audio bytes.
-    This function uses the pydub library to analyze the audio data and detect silences.
     :param audio_bytes: Bytes representing the audio data.
     :param sample_rate: Sample rate of the audio (default is 16000).
     :return: The index in milliseconds where the last silence occurs.
     """
-    audio = AudioSegment(
-        data=audio_bytes,
-        sample_width=2,
-        frame_rate=sample_rate,
-        channels=1,
-    )
-
-    silences = detect_silence(
-        audio,
-        min_silence_len=300,
-        silence_thresh=-40,
-    )
-
-    if not silences:
-        return 0
-
-    last_silence = silences[-1]
-    return sum(last_silence) // 2
+    detector = SilenceDetector(sample_rate)
+    detector.feed(audio_bytes)
+    return detector.split_ms()
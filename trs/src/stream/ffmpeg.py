@@ -1,22 +1,47 @@
+import re
 import subprocess
+import threading
+import time
+from typing import BinaryIO
+
+from src import log
+from src.config import settings
+from src.stream.archive import VideoArchive
+from src.stream.buffer import AudioRingBuffer
+
+_START_PATTERN = re.compile(rb"Duration: .*, start: (-?\d+\.\d+)")
+_PROGRESS_PATTERN = re.compile(rb"^out_time_us=(\d+)")
+_ERROR_PATTERN = re.compile(rb"error|failed|refused|timed out", re.IGNORECASE)
 
 
 def get_stream(
-    flow: str, sample_rate: int = 16000, flow_format: str = "s16le"
+    flow: str,
+    sample_rate: int = 16000,
+    flow_format: str = "s16le",
+    stderr: int = subprocess.DEVNULL,
+    outputs: list[str] | None = None,
 ) -> subprocess.Popen:
     """
     Get a subprocess stream for the given flow.
     This function uses ffmpeg to convert the input flow into a raw audio stream.
+    Gaps and overlaps in the input timestamps are filled with silence or trimmed,
+    so the number of samples always follows the stream PTS.
     :param flow: The input flow, which can be a file path or a URL.
     :param sample_rate: The sample rate for the audio stream (default is 16000).
     :param flow_format: The format of the audio stream (default is "s16le" for 16-bit signed little-endian PCM).
+    :param stderr: Where ffmpeg logs go. With subprocess.PIPE, progress is reported there too.
+    :param outputs: ffmpeg arguments of additional outputs of the input, e.g. archive segments.
     :return: subprocess.Popen object that streams the audio data.
     """
+    progress = ["-nostats", "-progress", "pipe:2"]
     return subprocess.Popen(
         [
             "ffmpeg",
+            *(progress if stderr == subprocess.PIPE else []),
             "-i",
             flow,
+            "-af",
+            "aresample=async=1",
             "-ac",
             "1",
             "-ar",
@@ -24,8 +49,302 @@ def get_stream(
             "-f",
             flow_format,
             "pipe:1",
+            *(outputs or []),
         ],
         stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
+        stderr=stderr,
         bufsize=10**8,
     )
+
+
+class _Pipe:
+    """
+    ffmpeg stdout, recording since when the reader waits for data.
+    """
+
+    def __init__(self, stdout: BinaryIO):
+        self._stdout = stdout
+        self.waiting_since: float | None = None
+
+    def readinto(self, view: memoryview) -> int | None:
+        self.waiting_since = time.monotonic()
+        try:
+            return self._stdout.readinto(view)
+        finally:
+            self.waiting_since = None
+
+    def read(self, size: int) -> bytes:
+        self.waiting_since = time.monotonic()
+        try:
+            return self._stdout.read(size)
+        finally:
+            self.waiting_since = None
+
+
+class FFmpegStream:
+    """
+    Supervised ffmpeg process decoding a flow into raw audio.
+
+    ffmpeg logs are parsed for errors, the start PTS of the input and the
+    progress of the output. A process that stalls while the reader waits for
+    its audio is killed; one blocked on a full pipe because the buffer is
+    full is left alone. A process that
+    exited is reconnected at once, then with exponential backoff. The stream
+    PTS measure the gap between the audio before and after a reconnect, so
+    the timeline of the flow stays continuous; audio the new process delivers
+    again is skipped. The wall clock is used when the PTS are unusable.
+    """
+
+    def __init__(
+        self,
+        flow: str,
+        sample_rate: int = 16000,
+        flow_format: str = "s16le",
+        sample_width: int = 2,
+        reconnect_delay: float = settings.FFMPEG_RECONNECT_DELAY,
+        reconnect_max_delay: float = settings.FFMPEG_RECONNECT_MAX_DELAY,
+        stall_timeout: float = settings.FFMPEG_STALL_TIMEOUT,
+        terminate_timeout: float = 5,
+        max_overlap: float = 120,
+        video_archive: VideoArchive | None = None,
+        name: str = "main",
+    ):
+        """
+        :param flow: The input flow, which can be a file path or a URL.
+        :param reconnect_delay: Delay before the second reconnect attempt in a row, in seconds.
+        :param reconnect_max_delay: Maximum delay between reconnect attempts, in seconds.
+        :param stall_timeout: ffmpeg is killed when its output does not advance for this long while audio is awaited, in seconds.
+        :param terminate_timeout: ffmpeg is killed when it does not exit this long after being terminated, in seconds.
+        :param max_overlap: PTS gaps and overlaps beyond this are treated as discontinuities, in seconds.
+        :param video_archive: Archive the input is also copied to, by the same ffmpeg process.
+        :param name: Name of the flow, used in log messages and thread names.
+        """
+        self._flow = flow
+        self._sample_rate = sample_rate
+        self._flow_format = flow_format
+        self._bytes_per_second = sample_rate * sample_width
+        self._sample_width = sample_width
+        self._reconnect_delay = reconnect_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._stall_timeout = stall_timeout
+        self._terminate_timeout = terminate_timeout
+        self._max_overlap = max_overlap
+        self._video_archive = video_archive
+        self._name = name
+
+        self._process: subprocess.Popen | None = None
+        self._pipe: _Pipe | None = None
+        self._stopped = False
+        self._attempt = 0  # reconnects in a row without audio
+        self.reconnects = 0
+        self.errors = 0
+        self.last_error: str | None = None
+
+        self._start_pts: float | None = None  # PTS of the first sample
+        self._probed = threading.Event()
+        self._session_bytes = 0
+        self._progress = 0.0
+
+    def start(self) -> None:
+        """
+        Start the ffmpeg process.
+        :return: None
+        """
+        self._stopped = False
+        self._spawn()
+
+    def stop(self) -> None:
+        """
+        Terminate ffmpeg for good.
+        :return: None
+        """
+        self._stopped = True
+        if self._process:
+            self._process.terminate()
+
+    def readinto(
+        self, buffer: AudioRingBuffer, size: int, timeout: float | None = None
+    ) -> int | None:
+        """
+        Read audio from ffmpeg into the buffer.
+        :param buffer: Buffer to read into.
+        :param size: Maximum number of bytes to read.
+        :param timeout: How long to wait for free space in the buffer, in seconds.
+        :return: Number of bytes read (0 when ffmpeg exited), or None if the buffer is full.
+        """
+        if not self._process:
+            raise RuntimeError("Failed to start stream process.")
+
+        read = buffer.readinto(self._pipe, size, timeout)
+        if read:
+            self._session_bytes += read
+            self._attempt = 0
+        return read
+
+    def reconnect(self, stop: threading.Event) -> float | None:
+        """
+        Restart ffmpeg after it exited, waiting longer after every attempt without audio.
+        :param stop: Event that interrupts the wait.
+        :return: Duration of the stream missing between the two processes in seconds,
+                 or None if the pipeline was stopped.
+        """
+        ended = time.time()
+        end_pts = self._end_pts()
+        if self._process:
+            self._process.terminate()
+            try:
+                self._process.wait(self._terminate_timeout)
+            except subprocess.TimeoutExpired:
+                log.warning(
+                    f"ffmpeg of flow {self._name} ignored the termination, "
+                    f"killing it"
+                )
+                self._process.kill()
+                self._process.wait()
+            log.warning(
+                f"ffmpeg of flow {self._name} exited with code "
+                f"{self._process.returncode}, last error: {self.last_error}"
+            )
+
+        delay = (
+            min(
+                self._reconnect_delay * 2 ** (self._attempt - 1),
+                self._reconnect_max_delay,
+            )
+            if self._attempt
+            else 0
+        )
+        self._attempt += 1
+        if delay:
+            log.info(f"Reconnecting flow {self._name} in {delay:.0f} seconds")
+        if stop.wait(delay) or self._stopped:
+            return None
+
+        self.reconnects += 1
+        self._spawn()
+        self._probed.wait(self._stall_timeout)
+
+        wall_gap = time.time() - ended
+        if end_pts is None or self._start_pts is None:
+            return wall_gap
+
+        gap = self._start_pts - end_pts
+        if not -self._max_overlap <= gap <= wall_gap + self._max_overlap:
+            log.warning(
+                f"PTS discontinuity of {gap:.2f}s in flow {self._name}, "
+                f"using the wall clock"
+            )
+            return wall_gap
+
+        if gap < 0:
+            self._skip(-gap)
+            return 0.0
+        return gap
+
+    @property
+    def position(self) -> float:
+        """
+        Seconds of audio of the current ffmpeg process read or skipped so far.
+        """
+        return self._session_bytes / self._bytes_per_second
+
+    def _end_pts(self) -> float | None:
+        """
+        PTS of the end of the audio read from the current process.
+        """
+        if self._start_pts is None:
+            return None
+        return self._start_pts + self._session_bytes / self._bytes_per_second
+
+    def _skip(self, seconds: float) -> None:
+        """
+        Discard audio the new process delivers again.
+        :param seconds: Duration of the repeated audio.
+        """
+        size = int(seconds * self._sample_rate) * self._sample_width
+        log.info(
+            f"Skipping {seconds:.2f}s of repeated audio in flow {self._name}"
+        )
+        while size > 0 and self._process:
+            data = self._pipe.read(min(size, 2**20))
+            if not data:
+                break
+            size -= len(data)
+            self._session_bytes += len(data)
+
+    def _spawn(self) -> None:
+        """
+        Start a new ffmpeg process with threads watching its logs and progress.
+        """
+        self._start_pts = None
+        self._probed.clear()
+        self._session_bytes = 0
+        self._progress = time.monotonic()
+
+        self._process = get_stream(
+            flow=self._flow,
+            sample_rate=self._sample_rate,
+            flow_format=self._flow_format,
+            stderr=subprocess.PIPE,
+            outputs=(
+                self._video_archive.output_args()
+                if self._video_archive
+                else None
+            ),
+        )
+        self._pipe = _Pipe(self._process.stdout)
+        for target, args, role in (
+            (self._watch_logs, (self._process,), "ffmpeg-logs"),
+            (
+                self._watch_progress,
+                (self._process, self._pipe),
+                "ffmpeg-watchdog",
+            ),
+        ):
+            threading.Thread(
+                target=target,
+                args=args,
+                name=f"{self._name}:{role}",
+                daemon=True,
+            ).start()
+
+    def _watch_logs(self, process: subprocess.Popen) -> None:
+        """
+        Parse ffmpeg logs for the start PTS, progress and errors.
+        """
+        out_time = 0
+        for line in process.stderr:
+            if match := _PROGRESS_PATTERN.match(line):
+                if int(match[1]) > out_time:
+                    out_time = int(match[1])
+                    self._progress = time.monotonic()
+            elif match := _START_PATTERN.search(line):
+                if process is self._process and self._start_pts is None:
+                    self._start_pts = float(match[1])
+                    self._probed.set()
+            elif _ERROR_PATTERN.search(line):
+                self.errors += 1
+                self.last_error = line.decode(errors="replace").strip()
+                log.warning(f"ffmpeg of flow {self._name}: {self.last_error}")
+        if process is self._process:
+            self._probed.set()
+
+    def _watch_progress(self, process: subprocess.Popen, pipe: _Pipe) -> None:
+        """
+        Kill ffmpeg when its output stops advancing while the reader waits
+        for it. While the reader is not waiting, ffmpeg may block on a full
+        pipe, which is no stall.
+        """
+        while process.poll() is None:
+            time.sleep(1)
+            waiting_since = pipe.waiting_since
+            if waiting_since is None:
+                continue
+            stalled = time.monotonic() - max(waiting_since, self._progress)
+            if stalled > self._stall_timeout:
+                log.warning(
+                    f"ffmpeg of flow {self._name} stalled for "
+                    f"{self._stall_timeout:.0f} seconds, restarting"
+                )
+                process.kill()
+                return
@@ -0,0 +1,245 @@
+import functools
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TypedDict
+
+from src import log
+from src.config import settings
+
+
+class IndexedSegment(TypedDict):
+    flow: str
+    start: float  # absolute timestamp
+    end: float
+    text: str
+
+
+class TranscriptIndex:
+    """
+    Persistent full-text index of the transcripts of every flow.
+
+    Segments are queued by the analyzers and written in batches, one
+    transaction each, by a background thread, so the pipeline never waits
+    for the disk. The SQLite database keeps the segments in a table indexed
+    by flow and time, and their text in an FTS5 table, which answers keyword
+    and time range lookups over months of transcripts in milliseconds.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        flush_interval: float = 1,
+        queue_size: int = 10000,
+    ):
+        """
+        :param path: The SQLite database, created if missing.
+        :param batch_size: Maximum number of segments written in a transaction.
+        :param flush_interval: Maximum delay before queued segments are written, in seconds.
+        :param queue_size: Maximum number of segments waiting to be written, newer ones are dropped.
+        """
+        self._path = path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._pending: queue.Queue[IndexedSegment | None] = queue.Queue(
+            queue_size
+        )
+        self._dropped = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Readers do not block the writer
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY,
+                flow TEXT NOT NULL,
+                start REAL NOT NULL,
+                end REAL NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS segments_start ON segments (start);
+            CREATE INDEX IF NOT EXISTS segments_flow_start
+                ON segments (flow, start);
+            CREATE VIRTUAL TABLE IF NOT EXISTS segments_text USING fts5 (
+                text, content = 'segments', content_rowid = 'id'
+            );
+            CREATE TRIGGER IF NOT EXISTS segments_insert AFTER INSERT
+                ON segments BEGIN
+                INSERT INTO segments_text (rowid, text)
+                VALUES (new.id, new.text);
+            END;
+            """
+        )
+        self._db.commit()
+
+        self._thread = threading.Thread(
+            target=self._run, name="transcript-index", daemon=True
+        )
+        self._thread.start()
+
+    def add(self, segments: list[IndexedSegment]) -> None:
+        """
+        Queue segments to be written.
+        :param segments: The segments.
+        :return: None
+        """
+        for segment in segments:
+            try:
+                self._pending.put_nowait(segment)
+            except queue.Full:
+                self._dropped += 1
+                if self._dropped % 1000 == 1:
+                    log.warning(
+                        f"Transcript index is behind, dropped "
+                        f"{self._dropped} segments"
+                    )
+
+    def search(
+        self,
+        words: str = "",
+        flow: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        limit: int = 20,
+    ) -> list[IndexedSegment]:
+        """
+        Find indexed segments, most recent first.
+        :param words: Words the segments contain, all of them, empty to match any text.
+        :param flow: Name of the flow, None for every flow.
+        :param start: Absolute timestamp the segments end after.
+        :param end: Absolute timestamp the segments start before.
+        :param limit: Maximum number of segments.
+        :return: The segments.
+        """
+        conditions = []
+        parameters: list = []
+        if words.split():
+            conditions.append(
+                "s.id IN (SELECT rowid FROM segments_text "
+                "WHERE segments_text MATCH ?)"
+            )
+            parameters.append(_match_expression(words))
+        if flow is not None:
+            conditions.append("s.flow = ?")
+            parameters.append(flow)
+        if start is not None:
+            conditions.append("s.end > ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("s.start < ?")
+            parameters.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # A connection per query, as searches come from server threads
+        db = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True)
+        try:
+            rows = db.execute(
+                f"SELECT s.flow, s.start, s.end, s.text FROM segments s "
+                f"{where} ORDER BY s.start DESC LIMIT ?",
+                [*parameters, limit],
+            ).fetchall()
+        finally:
+            db.close()
+        return [
+            {"flow": flow, "start": start, "end": end, "text": text}
+            for flow, start, end, text in rows
+        ]
+
+    def close(self) -> None:
+        """
+        Write the queued segments and close the database.
+        :return: None
+        """
+        self._pending.put(None)
+        self._thread.join()
+        self._db.close()
+
+    def _run(self) -> None:
+        """
+        Writer loop: collect a batch of queued segments and write it.
+        """
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self._flush_interval
+            while batch[-1] is not None and len(batch) < self._batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            closing = batch[-1] is None
+            segments = [segment for segment in batch if segment is not None]
+            if segments:
+                self._write(segments)
+            if closing:
+                return
+
+    def _write(self, segments: list[IndexedSegment]) -> None:
+        try:
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO segments (flow, start, end, text) "
+                    "VALUES (:flow, :start, :end, :text)",
+                    segments,
+                )
+        except sqlite3.Error as e:
+            log.error(f"Failed to index {len(segments)} segments: {e}")
+
+
+def _match_expression(words: str) -> str:
+    """
+    FTS5 query matching every word, quoted so that user input is never
+    parsed as query syntax.
+    """
+    return " ".join(
+        '"' + word.replace('"', '""') + '"' for word in words.split()
+    )
+
+
+@functools.cache
+def open_index(
+    path: str = settings.INDEX_PATH,
+    batch_size: int = settings.INDEX_BATCH_SIZE,
+    flush_interval: float = settings.INDEX_FLUSH_INTERVAL,
+) -> TranscriptIndex:
+    """
+    Get the transcript index of the process, created on first use.
+    :param path: The SQLite database.
+    :param batch_size: Maximum number of segments written in a transaction.
+    :param flush_interval: Maximum delay before queued segments are written, in seconds.
+    :return: The index.
+    """
+    log.info(f"Indexing transcripts in {path}")
+    return TranscriptIndex(path, batch_size, flush_interval)
+
+
+def serve_search(query: dict[str, list[str]]) -> tuple[int, str, bytes]:
+    """
+    Server route searching the transcript index.
+    Query parameters: q (words), flow, start and end timestamps and limit, all optional.
+    :param query: The query parameters.
+    :return: JSON list of the matching segments, most recent first.
+    """
+    try:
+        words = query.get("q", [""])[0]
+        flow = query.get("flow", [None])[0]
+        start = float(query["start"][0]) if "start" in query else None
+        end = float(query["end"][0]) if "end" in query else None
+        limit = int(query.get("limit", [20])[0])
+    except ValueError:
+        return 400, "text/plain", b"invalid start, end or limit"
+    if not 0 < limit <= settings.INDEX_MAX_RESULTS:
+        return 400, "text/plain", b"invalid limit"
+
+    segments = open_index().search(words, flow, start, end, limit)
+    return 200, "application/json", json.dumps(segments).encode()
@@ -0,0 +1,60 @@
+import re
+
+from src.api.transcription.schemas import Segment
+
+
+def _normalize(token: str) -> str:
+    return re.sub(r"\W+", "", token.lower())
+
+
+def drop_overlap(
+    previous: list[Segment],
+    segments: list[Segment],
+    overlap: float,
+    max_words: int = 20,
+) -> list[Segment]:
+    """
+    Drop the words of a transcript that repeat the end of the previous one.
+    The transcript starts `overlap` seconds before the previous one ended, so
+    the longest run of words at its start that matches the end of the previous
+    transcript is removed. Without such a match, the segments lying entirely
+    in the overlap are dropped.
+    :param previous: Segments of the previous transcript.
+    :param segments: Segments of the new transcript, timed relative to its start.
+    :param overlap: Duration of the overlap in seconds.
+    :param max_words: Maximum number of words compared (default is 20).
+    :return: Segments of the new transcript without the duplicated words.
+    """
+    if not previous or not segments or overlap <= 0:
+        return segments
+
+    tail = [
+        word
+        for word in map(
+            _normalize, " ".join(s["text"] for s in previous).split()
+        )
+        if word
+    ][-max_words:]
+
+    # (segment index, token index, normalized word) of the words in the overlap
+    head: list[tuple[int, int, str]] = []
+    for i, segment in enumerate(segments):
+        if segment["start"] >= overlap:
+            break
+        for j, token in enumerate(segment["text"].split()):
+            word = _normalize(token)
+            if word:
+                head.append((i, j, word))
+    head = head[:max_words]
+
+    for size in range(min(len(tail), len(head)), 0, -1):
+        if tail[-size:] != [word for _, _, word in head[:size]]:
+            continue
+
+        i, j, _ = head[size - 1]
+        rest = " ".join(segments[i]["text"].split()[j + 1 :])
+        if not rest:
+            return segments[i + 1 :]
+        return [{**segments[i], "text": rest}, *segments[i + 1 :]]
+
+    return [segment for segment in segments if segment["end"] > overlap]
@@ -0,0 +1,140 @@
+import threading
+from queue import Empty, Full, Queue
+from typing import Callable, Generic, TypeVar
+
+from src import log
+
+T = TypeVar("T")
+
+
+class StageQueue(Queue, Generic[T]):
+    """
+    Bounded queue joining two pipeline stages.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(maxsize=maxsize)
+        self.name = name
+        self.dropped = 0
+
+    def put_or_drop_oldest(self, item: T) -> None:
+        """
+        Put an item without blocking, dropping the oldest item when the queue is full.
+        Used by stages that must never block, such as the ffmpeg reader.
+        :param item: The item to put into the queue.
+        :return: None
+        """
+        while True:
+            try:
+                self.put_nowait(item)
+                return
+            except Full:
+                try:
+                    self.get_nowait()
+                    self.dropped += 1
+                    log.warning(
+                        f"Queue {self.name} is full, dropped oldest item "
+                        f"(total dropped: {self.dropped})"
+                    )
+                except Empty:
+                    pass
+
+    def put_until(self, item: T, stop: threading.Event) -> bool:
+        """
+        Put an item, blocking while the queue is full until the stop event is set.
+        :param item: The item to put into the queue.
+        :param stop: Event that interrupts the wait.
+        :return: True if the item was put, False if the stop event was set.
+        """
+        while not stop.is_set():
+            try:
+                self.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+
+    def get_until(self, stop: threading.Event) -> T | None:
+        """
+        Get an item, blocking while the queue is empty until the stop event is set.
+        :param stop: Event that interrupts the wait.
+        :return: The item, or None if the stop event was set.
+        """
+        while not stop.is_set():
+            try:
+                return self.get(timeout=0.5)
+            except Empty:
+                continue
+        return None
+
+
+class Stage(threading.Thread):
+    """
+    Pipeline stage running a step function in a loop on its own thread
+    until the stop event is set or the step raises.
+    """
+
+    def __init__(
+        self, name: str, step: Callable[[], None], stop: threading.Event
+    ):
+        super().__init__(name=name, daemon=True)
+        self._step = step
+        self._stop_event = stop
+        self.error: BaseException | None = None
+
+    def run(self) -> None:
+        try:
+            while not self._stop_event.is_set():
+                self._step()
+        except BaseException as e:
+            self.error = e
+            log.exception(f"Stage {self.name} failed: {e}")
+            self._stop_event.set()
+
+
+class Reorderer(Generic[T]):
+    """
+    Restores the stream order of items completed out of order by
+    concurrent workers. Items are numbered consecutively from zero;
+    numbers that will never complete must be skipped explicitly.
+    """
+
+    def __init__(self):
+        self._next = 0
+        self._pending: dict[int, T | None] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def push(self, index: int, item: T) -> None:
+        """
+        Store a completed item.
+        :param index: Stream position of the item.
+        :param item: The item.
+        :return: None
+        """
+        with self._lock:
+            self._pending[index] = item
+
+    def skip(self, index: int) -> None:
+        """
+        Mark a stream position that will never complete, such as a dropped item.
+        :param index: Stream position to skip.
+        :return: None
+        """
+        with self._lock:
+            self._pending[index] = None
+
+    def pop(self) -> T | None:
+        """
+        Take the next item in stream order, if it has completed.
+        :return: The next item, or None if it is still in progress.
+        """
+        with self._lock:
+            while self._next in self._pending:
+                item = self._pending.pop(self._next)
+                self._next += 1
+                if item is not None:
+                    return item
+            return None
@@ -0,0 +1,107 @@
+import re
+from typing import Protocol
+
+from src import log
+from src.metrics import RELEVANCE_DECISIONS
+
+
+class Scorer(Protocol):
+    def score(self, text: str) -> float:
+        """
+        Relevance of a transcript text, higher is more likely an event.
+        :param text: The transcript text.
+        :return: The score.
+        """
+
+
+class KeywordScorer:
+    """
+    Scores text with weighted keyword or regular expression rules.
+    Every rule matching the text adds its weight once, however often it matches.
+    """
+
+    def __init__(self, rules: dict[str, float]):
+        """
+        :param rules: Mapping of case-insensitive regular expressions to their weights.
+        """
+        self._rules = [
+            (re.compile(pattern, re.IGNORECASE), weight)
+            for pattern, weight in rules.items()
+        ]
+
+    def score(self, text: str) -> float:
+        return sum(
+            weight for pattern, weight in self._rules if pattern.search(text)
+        )
+
+
+class RelevanceFilter:
+    """
+    Local pre-filter deciding whether new transcript text is worth an analyzer call.
+
+    Text is accumulated until its score reaches the threshold or enough of it
+    is pending, then the analyzer is called and the accumulated text starts
+    over. Skipped text still reaches the analyzer with the next call, as it
+    stays in the analyzer context.
+    """
+
+    def __init__(
+        self,
+        scorer: Scorer | None,
+        threshold: float,
+        max_pending_chars: int,
+        name: str = "main",
+    ):
+        """
+        :param scorer: Relevance scorer, None disables the filter.
+        :param threshold: Score of the pending text calling the analyzer.
+        :param max_pending_chars: Amount of pending text calling the analyzer whatever its score.
+        :param name: Name of the flow, used in metrics and log messages.
+        """
+        self._scorer = scorer
+        self._threshold = threshold
+        self._max_pending_chars = max_pending_chars
+        self._name = name
+        self._pending = ""
+        self._force = False
+        self.skipped = 0
+
+    def check(self, text: str) -> bool:
+        """
+        Add new transcript text and decide whether to call the analyzer.
+        :param text: The new transcript text.
+        :return: True if the analyzer should be called.
+        """
+        if self._scorer is None:
+            return True
+
+        self._pending = f"{self._pending}\n{text}" if self._pending else text
+        score = self._scorer.score(self._pending)
+
+        if self._force:
+            decision = "forced"
+        elif score >= self._threshold:
+            decision = "relevant"
+        elif len(self._pending) >= self._max_pending_chars:
+            decision = "accumulated"
+        else:
+            self.skipped += 1
+            RELEVANCE_DECISIONS.labels(self._name, "skipped").inc()
+            log.info(
+                f"Flow {self._name}: analyzer call skipped, score "
+                f"{score:.2f} of {len(self._pending)} pending characters "
+                f"(total skipped: {self.skipped})"
+            )
+            return False
+
+        RELEVANCE_DECISIONS.labels(self._name, decision).inc()
+        self._pending = ""
+        self._force = False
+        return True
+
+    def expect_more(self) -> None:
+        """
+        Call the analyzer on the next text whatever its score, e.g. after a "wait" verdict.
+        :return: None
+        """
+        self._force = True
@@ -1,7 +1,30 @@
 from typing import TypedDict
 
+from src.api.transcription.schemas import Segment
+from src.stream.buffer import AudioLease
+
 
 class Message(TypedDict):
     content: str
     start: float
     end: float
+
+
+class Gap(TypedDict):
+    duration: float  # seconds of the stream missing after a reconnect
+
+
+class Chunk(TypedDict):
+    index: int  # stream position, restores the order after transcription
+    audio: AudioLease  # released once the audio has been encoded
+    start: float  # absolute timestamp of the first sample
+    duration: float
+    overlap: float  # leading seconds shared with the previous chunk
+
+
+class Transcript(TypedDict):
+    index: int  # stream position of the transcribed chunk
+    segments: list[Segment]
+    start: float  # absolute timestamp of the transcribed chunk
+    duration: float
+    overlap: float  # leading seconds shared with the previous chunk
@@ -1,24 +1,68 @@
 import json
+import threading
 import time
+from collections import deque
+from concurrent.futures import Executor
+from contextlib import closing
 from datetime import timezone, datetime
 from json import JSONDecodeError
-from subprocess import Popen
-from requests import HTTPError
+from queue import Empty
+from subprocess import CalledProcessError
+from typing import Callable, TypeVar
+
+from requests import RequestException
 
 from src import log
-from src.api import AIClient, TranscriptionClient
+from src.api import AIClient
+from src.api.transcription.schemas import Segment
+from src.api.transcription import (
+    TranscriptionBackend,
+    get_transcription_backend,
+)
 from src.config import settings
-from src.mq import RabbitMQ
-from src.stream.detection import get_split_ms
-from src.stream.ffmpeg import get_stream
-from src.stream.schemas import Message
-from src.stream.utils import write_bytes_to_wav, delete_file
+from src.metrics import (
+    AI_DECISIONS,
+    BUFFER_BYTES,
+    CACHE_LOOKUPS,
+    REAL_TIME_FACTOR,
+    RECONNECTS,
+    SPEECH_RATIO,
+    STAGE_SECONDS,
+)
+from src.mq import RabbitMQPublisher
+from src.profiling import profiled
+from src.stream.adaptive import ChunkController
+from src.stream.archive import open_archive
+from src.stream.buffer import AudioRingBuffer
+from src.stream.cache import ContentCache, Fingerprint
+from src.stream.context import AnalyzerContext
+from src.stream.detection import SilenceDetector
+from src.stream.ffmpeg import FFmpegStream
+from src.stream.index import open_index
+from src.stream.overlap import drop_overlap
+from src.stream.pipeline import Reorderer, Stage, StageQueue
+from src.stream.relevance import KeywordScorer, RelevanceFilter, Scorer
+from src.stream.schemas import Chunk, Gap, Message, Transcript
+from src.stream.shedding import LoadShedder
+from src.stream.subtitles import open_subtitles
+from src.stream.vad import SpeechDetector
+from src.stream.verdict import read_verdict
+
+T = TypeVar("T")
 
 
 class StreamService:
     """
     StreamService is responsible for processing audio streams, transcribing them,
     and interacting with AI and transcription clients to analyze the content.
+
+    Processing is split into stages running concurrently on their own threads
+    and joined by bounded queues:
+    reader -> segmenter -> transcriber -> analyzer -> publisher.
+    The reader never blocks on downstream stages, so the ffmpeg pipe is drained
+    in real time however slow the transcription and AI services are.
+    Several transcribers may run in parallel; the analyzer restores the
+    stream order of their transcripts.
     """
 
     def __init__(
@@ -28,147 +72,790 @@ class StreamService:
         flow_format: str = "s16le",
         sample_width: int = 2,
         chunk_duration: int = 30,
+        queue_size: int = 8,
+        buffer_duration: int = 600,
+        max_segment_duration: float = settings.MAX_SEGMENT_DURATION,
+        segment_overlap: float = settings.SEGMENT_OVERLAP,
+        split_search_window: float = settings.SPLIT_SEARCH_WINDOW,
+        codec: str = settings.TRANSCRIPTION_CODEC,
+        transcription_concurrency: int = settings.TRANSCRIPTION_CONCURRENCY,
+        adaptive: bool = settings.ADAPTIVE_CHUNKS,
+        latency_target: float = settings.LATENCY_TARGET,
+        shed_lag_threshold: float = settings.SHED_LAG_THRESHOLD,
+        archive: bool = bool(settings.ARCHIVE_DIR),
+        subtitles: bool = bool(settings.SUBTITLES_DIR),
+        index: bool = bool(settings.INDEX_PATH),
+        vad: bool = settings.VAD_ENABLED,
+        min_speech_ratio: float = settings.VAD_MIN_SPEECH_RATIO,
+        streaming: bool = settings.AI_STREAMING,
+        relevance_scorer: Scorer | None = None,
+        relevance_threshold: float = settings.RELEVANCE_THRESHOLD,
+        relevance_max_pending_chars: int = settings.RELEVANCE_MAX_PENDING_CHARS,
+        stats_interval: float = 30,
+        name: str = "main",
+        ai_client: AIClient | None = None,
+        transcription_client: TranscriptionBackend | None = None,
+        executor: Executor | None = None,
+        publisher: RabbitMQPublisher | None = None,
+        stream: FFmpegStream | None = None,
+        cache: ContentCache | None = None,
     ):
+        """
+        :param flow: The input flow, which can be a file path or a URL.
+        :param buffer_duration: Capacity of the audio buffer in seconds.
+        :param max_segment_duration: Segments are force-split past this duration, in seconds.
+        :param segment_overlap: Audio shared by force-split segments, in seconds.
+        :param split_search_window: Window before the maximum duration searched for the quietest split point, in seconds.
+        :param codec: Codec the audio is uploaded to the transcription service with.
+        :param transcription_concurrency: Number of segments transcribed in parallel.
+        :param adaptive: Tune the chunk duration to the measured backend latency.
+        :param latency_target: Target delay from the end of a chunk to the analyzer verdict, in seconds.
+        :param shed_lag_threshold: Lag behind real time that starts load shedding, in seconds.
+        :param archive: Keep the last minutes of the flow in its rolling archive, served as clips.
+        :param subtitles: Write live WebVTT and SRT subtitles of the flow with an HLS playlist.
+        :param index: Keep the transcripts in the full-text index of the process.
+        :param vad: Skip transcription of segments without enough speech.
+        :param min_speech_ratio: Minimum share of speech in a segment sent for transcription.
+        :param streaming: Stream analyzer answers and stop reading once the verdict is known.
+        :param relevance_scorer: Local scorer of new transcript text, the analyzer is only called on relevant text. Defaults to the RELEVANCE_RULES of the flow.
+        :param relevance_threshold: Score of the pending text calling the analyzer.
+        :param relevance_max_pending_chars: Amount of pending text calling the analyzer whatever its score.
+        :param name: Name of the flow, used in stage thread names and published events.
+        :param ai_client: AI client, shared between flows in supervisor mode.
+        :param transcription_client: Transcription backend, defaults to the one of the process set by TRANSCRIPTION_BACKEND.
+        :param executor: Worker pool for remote calls, shared between flows in supervisor mode.
+        :param publisher: RabbitMQ publisher, shared between flows in supervisor mode.
+        :param stream: ffmpeg process supervisor, e.g. one that replays a file once.
+        :param cache: Cache of transcripts and verdicts of repeated content, shared between flows in supervisor mode.
+        """
         self._flow = flow
+        self._name = name
         self._flow_format = flow_format
-        self._stream: Popen[bytes] | None = None
+        self._archive, self._video_archive = (
+            open_archive(name, sample_rate, sample_width)
+            if archive
+            else (None, None)
+        )
+        if stream is not None:
+            self._video_archive = None  # only the own ffmpeg copies the video
+        self._stream = stream or FFmpegStream(
+            flow,
+            sample_rate,
+            flow_format,
+            sample_width,
+            video_archive=self._video_archive,
+            name=name,
+        )
+        self._flushed = threading.Event()  # the segmenter reached a gap
+        self._gaps: deque[tuple[float, float]] = deque(maxlen=100)
         self._SAMPLE_RATE = sample_rate
         self._SAMPLE_WIDTH = sample_width
         self._CHUNK_DURATION = chunk_duration
         self._CHUNK_SIZE = sample_rate * chunk_duration * sample_width
-        self._remaining_bytes = b""
+        self._remaining_bytes = AudioRingBuffer(
+            sample_rate * buffer_duration * sample_width
+        )
+        self._max_segment_ms = int(max_segment_duration * 1000)
+        self._segment_overlap_ms = int(segment_overlap * 1000)
+        self._split_search_ms = int(split_search_window * 1000)
+        self._detector = SilenceDetector(sample_rate)
+        self._fed_bytes = 0  # pending bytes already fed to the detector
+        self._overlap_ms = 0  # pending audio shared with the last segment
+        self._index = 0  # stream position of the next segment
+        self._subtitles = open_subtitles(name) if subtitles else None
+        self._transcript_index = open_index() if index else None
+
+        self._speech_detector = SpeechDetector(sample_rate) if vad else None
+        self._min_speech_ratio = min_speech_ratio
+        self._speech_seconds = 0.0
+        self._audio_seconds = 0.0
+        self._stats_lock = threading.Lock()
 
         self._max_diff_time_for_last_message = 60 * 7
 
-        self._messages: list[Message] = []
+        self._messages = AnalyzerContext(self._summarize)
+        self._previous_segments: list[Segment] = []
         self._time: float | None = (
-            None  # timestamp of the last processed audio chunk
+            None  # timestamp of the first unsplit byte in self._remaining_bytes
+        )
+
+        self._ai_client = ai_client or AIClient()
+        self._transcription_client = (
+            transcription_client or get_transcription_backend()
+        )
+        self._executor = executor
+        self._owns_publisher = publisher is None
+        self._publisher = publisher or RabbitMQPublisher()
+        self._codec = codec
+        self._owns_cache = cache is None and settings.CACHE_ENABLED
+        self._cache = cache
+        if self._owns_cache:
+            self._cache = ContentCache(
+                settings.CACHE_MAX_ENTRIES,
+                settings.CACHE_TTL,
+                settings.CACHE_PATH,
+                sample_rate,
+            )
+        self._transcription_concurrency = max(1, transcription_concurrency)
+        self._controller = (
+            ChunkController(
+                chunk_duration,
+                settings.CHUNK_MIN_DURATION,
+                settings.CHUNK_MAX_DURATION,
+                latency_target,
+                self._transcription_concurrency,
+                name=name,
+            )
+            if adaptive
+            else None
+        )
+        self._streaming = streaming
+        self._shedder = LoadShedder(shed_lag_threshold, name)
+        self._skipped_analysis = False
+        if relevance_scorer is None:
+            rules = settings.RELEVANCE_RULES.get(
+                name, settings.RELEVANCE_RULES.get("*")
+            )
+            relevance_scorer = KeywordScorer(rules) if rules else None
+        self._relevance = RelevanceFilter(
+            relevance_scorer,
+            relevance_threshold,
+            relevance_max_pending_chars,
+            name,
         )
 
-        self._ai_client = AIClient()
-        self._transcription_client = TranscriptionClient()
+        self._stop = threading.Event()
+        self._stats_interval = stats_interval
+        self._chunks: StageQueue[int | Gap] = StageQueue("chunks", queue_size)
+        self._segments: StageQueue[Chunk] = StageQueue("segments", queue_size)
+        self._transcripts: StageQueue[Transcript] = StageQueue(
+            "transcripts", queue_size
+        )
+        self._events: StageQueue[dict] = StageQueue("events", queue_size)
+        self._reorderer: Reorderer[Transcript] = Reorderer()
 
-    # TODO: Decompose this method into smaller methods for better readability and maintainability.
     def process(self) -> None:
         """
-        Process the audio stream by reading data in chunks, transcribing it,
-        and sending the results to the AI service for analysis.
+        Process the audio stream by running the pipeline stages until one of them fails.
         :return: None
         """
-        self._stream = get_stream(
-            flow=self._flow,
-            sample_rate=self._SAMPLE_RATE,
-            flow_format=self._flow_format,
-        )
+        self._stop.clear()
+        self._stream.start()
         self._time = datetime.now(timezone.utc).timestamp()
+        if self._video_archive:
+            self._video_archive.anchor(self._time)
+
+        stages = [
+            Stage(f"{self._name}:reader", self._read, self._stop),
+            Stage(f"{self._name}:segmenter", self._segment, self._stop),
+            *(
+                Stage(
+                    f"{self._name}:transcriber-{i}",
+                    self._transcribe,
+                    self._stop,
+                )
+                for i in range(self._transcription_concurrency)
+            ),
+            Stage(f"{self._name}:analyzer", self._analyze, self._stop),
+            Stage(f"{self._name}:publisher", self._publish, self._stop),
+        ]
+        if self._owns_publisher:
+            self._publisher.start()
+        for stage in stages:
+            stage.start()
+
+        try:
+            while not self._stop.wait(self._stats_interval):
+                if self._video_archive:
+                    self._video_archive.prune()
+                log.info(
+                    f"Queue depths: {self.queue_depths()}, "
+                    f"speech ratio: {self.speech_ratio():.2f}, "
+                    f"lag: {self._shedder.lag:.0f}s, "
+                    f"shed: {dict(self._shedder.counts)}"
+                )
+        finally:
+            self.stop()
+            for stage in stages:
+                stage.join()
+            if self._owns_publisher:
+                self._publisher.close()
+            if self._owns_cache:
+                self._cache.close()
+            if self._subtitles:
+                self._subtitles.close()
+
+        for stage in stages:
+            if stage.error:
+                raise RuntimeError(
+                    f"Stage {stage.name} failed"
+                ) from stage.error
+
+    def stop(self) -> None:
+        """
+        Stop the pipeline and terminate the ffmpeg process.
+        :return: None
+        """
+        self._stop.set()
+        self._stream.stop()
 
-        while True:
-            if not self._stream:
-                raise RuntimeError("Failed to start stream process.")
-
-            data = self._stream.stdout.read(self._CHUNK_SIZE)
-            log.info(f"Chunk size readed: {len(data)} bytes")
-
-            if not data:
-                try:
-                    self._stream.terminate()
-                finally:
-                    time.sleep(5)
-                    self._stream = get_stream(
-                        flow=self._flow,
-                        sample_rate=self._SAMPLE_RATE,
-                        flow_format=self._flow_format,
-                    )
-                    self._time = datetime.now(timezone.utc).timestamp()
-                    continue
+    def queue_depths(self) -> dict[str, int]:
+        """
+        Get the current depth of every queue between the pipeline stages.
+        :return: Dictionary mapping queue names to the number of queued items.
+        """
+        depths = {
+            queue.name: queue.qsize()
+            for queue in (
+                self._chunks,
+                self._segments,
+                self._transcripts,
+                self._events,
+            )
+        }
+        depths["reordering"] = len(self._reorderer)
+        return depths
+
+    def gaps(self) -> list[tuple[float, float]]:
+        """
+        Get the most recent gaps recorded in the stream after ffmpeg reconnects.
+        :return: List of gap start timestamps and durations in seconds.
+        """
+        return list(self._gaps)
 
-            self._remaining_bytes += data
+    def speech_ratio(self) -> float:
+        """
+        Get the share of speech in the audio segmented so far.
+        :return: Share of speech from 0 to 1, or 1 if the speech gate is disabled.
+        """
+        if self._speech_detector is None or not self._audio_seconds:
+            return 1.0
+        return self._speech_seconds / self._audio_seconds
 
-            split_ms = get_split_ms(self._remaining_bytes, self._SAMPLE_RATE)
-            split_seconds = split_ms / 1000
-            samples = int(split_seconds * self._SAMPLE_RATE)
-            byte_index = samples * self._SAMPLE_WIDTH
+    def _call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run a blocking remote call, on the shared worker pool if there is one.
+        :param func: The function to call.
+        :param args: Positional arguments for the function.
+        :param kwargs: Keyword arguments for the function.
+        :return: The function result.
+        """
+        if self._executor is None:
+            return func(*args, **kwargs)
+        return self._executor.submit(func, *args, **kwargs).result()
 
-            audio_bytes = self._remaining_bytes[:byte_index]
-            self._remaining_bytes = self._remaining_bytes[byte_index:]
+    @profiled
+    def _read(self) -> None:
+        """
+        Read a chunk from ffmpeg into the audio buffer and notify the segmenter.
+        A Gap item tells the segmenter that ffmpeg was reconnected.
+        """
+        with STAGE_SECONDS.labels(self._name, "ffmpeg_read").time():
+            read = self._stream.readinto(
+                self._remaining_bytes, self._chunk_size(), timeout=1
+            )
+        BUFFER_BYTES.labels(self._name).set(
+            self._remaining_bytes.pending + self._remaining_bytes.leased
+        )
+        if read is None:
+            self._drop_oldest_segment()
+            return
+
+        log.info(f"Chunk size readed: {read} bytes")
+
+        if read:
+            self._chunks.put_or_drop_oldest(read)
+            return
+
+        if self._stop.is_set():
+            return
+
+        gap = self._stream.reconnect(self._stop)
+        if gap is None:
+            return
+        RECONNECTS.labels(self._name).inc()
+
+        # Audio of the new process is read only once the segmenter has
+        # split off everything before the gap
+        self._flushed.clear()
+        self._chunks.put_or_drop_oldest({"duration": gap})
+        while not self._flushed.wait(0.5):
+            if self._stop.is_set():
+                return
+        if self._video_archive:
+            # The timeline now continues with the next audio of the new process
+            self._video_archive.anchor(self._time - self._stream.position)
+
+    def _chunk_size(self) -> int:
+        """
+        Number of bytes to read per chunk, tuned by the chunk controller if enabled.
+        """
+        if self._controller is None:
+            return self._CHUNK_SIZE
+        return (
+            self._controller.chunk_duration
+            * self._SAMPLE_RATE
+            * self._SAMPLE_WIDTH
+        )
 
-            if len(audio_bytes) == 0:
-                continue
+    def _drop_oldest_segment(self) -> None:
+        """
+        Free space in the audio buffer by dropping the oldest segment waiting
+        for transcription, so the reader can keep draining ffmpeg.
+        """
+        try:
+            chunk = self._segments.get_nowait()
+        except Empty:
+            log.warning("Audio buffer is full, waiting for transcription")
+            return
+
+        chunk["audio"].release()
+        self._reorderer.skip(chunk["index"])
+        self._segments.dropped += 1
+        log.warning(
+            f"Audio buffer is full, dropped {chunk['duration']:.2f}s segment "
+            f"(total dropped: {self._segments.dropped})"
+        )
 
-            file_path = write_bytes_to_wav(audio_bytes)
+    @profiled
+    def _segment(self) -> None:
+        """
+        Feed newly read audio to the silence detector and split it on the last silence.
+        """
+        read = self._chunks.get_until(self._stop)
+        if self._stop.is_set():
+            return
+
+        if isinstance(read, dict):
+            self._record_gap(read["duration"])
+            return
+
+        with STAGE_SECONDS.labels(self._name, "silence_detection").time():
+            with self._remaining_bytes.unsplit() as pending:
+                # Split chunk by chunk like ffmpeg delivered them, unless
+                # notifications were dropped and the rest has to be caught up
+                end = (
+                    len(pending)
+                    if self._chunks.empty()
+                    else self._fed_bytes + read
+                )
+                self._detector.feed(pending[self._fed_bytes : end])
+                self._fed_bytes = end
+            split_ms = self._detector.split_ms()
 
-            segments = []
+        self._split_bounded(split_ms)
+
+    def _split_bounded(self, split_ms: int) -> None:
+        """
+        Split the pending audio on its last silence, then keep splitting until
+        what is left fits the maximum segment duration, however much audio
+        the chunk notifications left pending.
+        :param split_ms: Middle of the last silence in milliseconds, 0 if there is none.
+        """
+        while not self._stop.is_set():
+            if 0 < split_ms <= self._max_segment_ms:
+                self._split(split_ms)
+                if len(self._detector) <= self._max_segment_ms:
+                    return
+            elif len(self._detector) > self._max_segment_ms:
+                # No silence within the maximum duration: split at the quietest
+                # point before it, keeping an overlap for the next segment
+                split_ms = self._detector.quietest_ms(
+                    self._max_segment_ms - self._split_search_ms,
+                    self._max_segment_ms,
+                )
+                log.warning(
+                    f"No silence found, splitting {split_ms} ms of audio"
+                )
+                self._split(split_ms, self._segment_overlap_ms)
+            else:
+                return
+            split_ms = self._detector.split_ms()
+
+    def _record_gap(self, duration: float) -> None:
+        """
+        Split off all audio read before a reconnect and move the timeline past the gap.
+        :param duration: Duration of the stream missing after the reconnect, in seconds.
+        """
+        with self._remaining_bytes.unsplit() as pending:
+            self._detector.feed(pending[self._fed_bytes :])
+            self._fed_bytes = len(pending)
+
+        # Everything read so far is split off, in segments no longer than
+        # the maximum
+        if len(self._detector) > self._max_segment_ms:
+            self._split_bounded(self._detector.split_ms())
+        if len(self._detector):
+            self._split(len(self._detector))
+        self._overlap_ms = 0
+
+        self._gaps.append((self._time, duration))
+        log.warning(
+            f"Recorded {duration:.2f}s gap in flow {self._name} at "
+            f"{datetime.fromtimestamp(self._time, timezone.utc).isoformat()}"
+        )
+        self._time += duration
+        self._flushed.set()
+
+    def _split(self, split_ms: int, keep_ms: int = 0) -> None:
+        """
+        Split the first milliseconds of the pending audio off and queue them for transcription.
+        :param split_ms: Duration of the segment in milliseconds.
+        :param keep_ms: Duration of the end of the segment to keep as the start of the next one.
+        """
+        byte_index = split_ms * self._SAMPLE_RATE // 1000 * self._SAMPLE_WIDTH
+        keep = keep_ms * self._SAMPLE_RATE // 1000 * self._SAMPLE_WIDTH
+
+        audio = self._remaining_bytes.take(byte_index, keep)
+        if self._archive:
+            # The kept end is archived with the next segment
+            self._archive.write(self._time, audio.view[: byte_index - keep])
+        self._fed_bytes -= byte_index - keep
+        self._detector.consume(split_ms - keep_ms)
+
+        chunk: Chunk = {
+            "index": self._index,
+            "audio": audio,
+            "start": self._time,
+            "duration": split_ms / 1000,
+            "overlap": self._overlap_ms / 1000,
+        }
+        self._index += 1
+        self._overlap_ms = keep_ms
+        self._time += (split_ms - keep_ms) / 1000
+        self._segments.put_until(chunk, self._stop)
+
+    @profiled
+    def _transcribe(self) -> None:
+        """
+        Transcribe the next split chunk.
+        """
+        chunk = self._segments.get_until(self._stop)
+        if chunk is None:
+            return
+
+        segments = []
+        audio = None
+        fingerprint = None
+        tier = self._shedder.update(chunk["start"] + chunk["duration"])
+
+        try:
+            if tier >= 3:
+                self._shedder.shed(LoadShedder.DROP_AUDIO, chunk["duration"])
+            elif self._is_speech(chunk):
+                cached = None
+                if self._cache:
+                    fingerprint = self._cache.fingerprint(chunk["audio"].view)
+                    cached = self._cached_segments(fingerprint)
+                if cached is not None:
+                    segments = cached
+                else:
+                    with STAGE_SECONDS.labels(self._name, "encoding").time():
+                        audio = self._transcription_client.prepare(
+                            chunk["audio"].view,
+                            self._SAMPLE_RATE,
+                            codec=self._codec,
+                        )
+        except CalledProcessError as e:
+            log.error(f"Failed to encode audio: {e.stderr.decode()}")
+        finally:
+            chunk["audio"].release()
+
+        if audio is not None:
+            options = {}
+            if tier >= 2:
+                self._shedder.shed(LoadShedder.CHEAP_MODEL, chunk["duration"])
+                options["model"] = settings.SHED_TRANSCRIPTION_MODEL
 
             try:
                 log.info("Transcribing...")
-                segments = self._transcription_client.transcribe(str(file_path))
-            except HTTPError as e:
+                started = time.monotonic()
+                segments = self._call(
+                    self._transcription_client.transcribe_prepared,
+                    audio,
+                    **options,
+                )
+                elapsed = time.monotonic() - started
+                STAGE_SECONDS.labels(self._name, "transcription").observe(
+                    elapsed
+                )
+                REAL_TIME_FACTOR.labels(self._name).set(
+                    elapsed / chunk["duration"]
+                )
+                # The cheaper model would make the backend look faster than it is
+                if self._controller and not options:
+                    self._controller.observe_transcription(
+                        chunk["duration"], elapsed
+                    )
+                if fingerprint is not None and not options:
+                    self._cache.put_segments(fingerprint, segments)
+            except RequestException as e:
                 log.error(e)
 
-            delete_file(str(file_path))
+        self._transcripts.put_until(
+            {
+                "index": chunk["index"],
+                "segments": segments,
+                "start": chunk["start"],
+                "duration": chunk["duration"],
+                "overlap": chunk["overlap"],
+            },
+            self._stop,
+        )
 
-            if not segments:
-                self._time += split_seconds
-                continue
+    def _cached_segments(
+        self, fingerprint: Fingerprint
+    ) -> list[Segment] | None:
+        """
+        Look up the transcript of previously seen matching audio.
+        :param fingerprint: Fingerprint of the chunk audio.
+        :return: The cached segments, or None on a miss.
+        """
+        segments = self._cache.get_segments(fingerprint)
+        CACHE_LOOKUPS.labels(
+            self._name, "audio", "miss" if segments is None else "hit"
+        ).inc()
+        if segments is not None:
+            log.info(f"Flow {self._name}: transcript taken from the cache")
+        return segments
+
+    def _is_speech(self, chunk: Chunk) -> bool:
+        """
+        Check whether a segment has enough speech to be worth transcribing.
+        Skipped segments still reach the analyzer as empty transcripts,
+        so timestamps and overlap handling stay in step with the stream.
+        :param chunk: The split chunk.
+        :return: True if the segment should be transcribed.
+        """
+        if self._speech_detector is None:
+            return True
+
+        ratio = self._speech_detector.speech_ratio(chunk["audio"].view)
+        with self._stats_lock:
+            self._speech_seconds += ratio * chunk["duration"]
+            self._audio_seconds += chunk["duration"]
+        SPEECH_RATIO.labels(self._name).set(self.speech_ratio())
+
+        if ratio < self._min_speech_ratio:
+            log.info(
+                f"Skipping {chunk['duration']:.2f}s segment "
+                f"with speech ratio {ratio:.2f}"
+            )
+            return False
+        return True
 
-            message = "\n".join(
-                f"[{(self._time + segment['start']):.2f} - "
-                f"{(self._time + segment['end']):.2f}] "
-                f"{segment['text']}"
-                for segment in segments
+    @profiled
+    def _analyze(self) -> None:
+        """
+        Send the accumulated transcript to the AI service and detect events.
+        """
+        transcript = self._next_transcript()
+        if transcript is None:
+            return
+
+        start = transcript["start"]
+        end = start + transcript["duration"]
+        segments = drop_overlap(
+            self._previous_segments,
+            transcript["segments"],
+            transcript["overlap"],
+        )
+        self._previous_segments = transcript["segments"]
+
+        if self._subtitles:
+            self._subtitles.write(
+                start,
+                end,
+                [
+                    (
+                        start + segment["start"],
+                        start + segment["end"],
+                        segment["text"],
+                    )
+                    for segment in segments
+                ],
             )
-            log.info(f"message: {message}")
-
-            self._messages.append(
-                {
-                    "content": message,
-                    "start": self._time + segments[0]["start"],
-                    "end": self._time + segments[-1]["end"],
-                }
+        if self._transcript_index:
+            self._transcript_index.add(
+                [
+                    {
+                        "flow": self._name,
+                        "start": start + segment["start"],
+                        "end": start + segment["end"],
+                        "text": segment["text"],
+                    }
+                    for segment in segments
+                    if segment["text"].strip()
+                ]
             )
 
-            self._time += split_seconds
+        if not segments:
+            return
 
-            result: str | None = None
+        message = "\n".join(
+            f"[{(start + segment['start']):.2f} - "
+            f"{(start + segment['end']):.2f}] "
+            f"{segment['text']}"
+            for segment in segments
+        )
+        log.info(f"message: {message}")
+
+        self._messages.append(
+            {
+                "content": message,
+                "start": start + segments[0]["start"],
+                "end": start + segments[-1]["end"],
+            }
+        )
 
-            try:
-                result = self._ai_client.chat_completions(
-                    "trs-analyzer-main", self._messages
-                )
-            except HTTPError as e:
-                log.error(f"HTTP error: {e}")
-
-            if not result:
-                continue
-
-            log.info(f"Chat result: {result}")
-
-            if result.strip() == "-":
-                if (
-                    self._messages[-1]["start"]
-                    < self._time - self._max_diff_time_for_last_message
-                ):
-                    self._messages = self._messages[1:]
-                continue
-
-            if result.strip() == "wait":
-                continue
-
-            result = (
-                result.replace("```json", "")
-                .replace("```text", "")
-                .replace("```", "")
-                .replace("“", '"')
-                .replace("”", '"')
-                .strip("`")
+        if not self._relevance.check(
+            "\n".join(segment["text"] for segment in segments)
+        ):
+            # Stale messages are dropped as on a "-" verdict rather than summarized
+            while (
+                len(self._messages) > 1
+                and self._messages[0]["end"]
+                < end - self._max_diff_time_for_last_message
+            ):
+                self._messages.drop_oldest()
+            return
+
+        # Behind real time, every other segment only extends the context;
+        # the next one is analyzed whatever its score, not to lose this one
+        if self._shedder.tier >= 1 and not self._skipped_analysis:
+            self._skipped_analysis = True
+            self._relevance.expect_more()
+            self._shedder.shed(
+                LoadShedder.SKIP_ANALYSIS, transcript["duration"]
             )
+            return
+        self._skipped_analysis = False
+
+        result = self._verdict(transcript["duration"])
+        if not result:
+            return
+
+        log.info(f"Chat result: {result}")
+
+        if result.strip() == "-":
+            AI_DECISIONS.labels(self._name, "-").inc()
+            if (
+                self._messages[-1]["start"]
+                < end - self._max_diff_time_for_last_message
+            ):
+                self._messages.drop_oldest()
+            return
+
+        if result.strip() == "wait":
+            AI_DECISIONS.labels(self._name, "wait").inc()
+            self._relevance.expect_more()
+            return
+
+        result = (
+            result.replace("```json", "")
+            .replace("```text", "")
+            .replace("```", "")
+            .replace("“", '"')
+            .replace("”", '"')
+            .strip("`")
+        )
 
-            try:
-                result_json = json.loads(result)
-                with RabbitMQ() as mq:
-                    mq.publish(settings.RABBITMQ_QUEUE, json.dumps(result_json))
-
-            except JSONDecodeError as e:
-                log.error(f"JSONDecodeError: {e}")
-            finally:
-                self._messages = []
+        try:
+            result_json = json.loads(result)
+            result_json["flow"] = self._name
+            AI_DECISIONS.labels(self._name, "event").inc()
+            self._events.put_until(result_json, self._stop)
+        except JSONDecodeError as e:
+            AI_DECISIONS.labels(self._name, "json_error").inc()
+            log.error(f"JSONDecodeError: {e}")
+        finally:
+            self._messages.clear()
+
+    def _verdict(self, duration: float) -> str | None:
+        """
+        Ask the analyzer about the current context, unless the same window was analysed before.
+        Only "-" and "wait" verdicts are cached: events carry the time range of the transcript.
+        :param duration: Duration of the newest transcript, in seconds.
+        :return: The analyzer answer, or None if the request failed.
+        """
+        messages = self._messages.messages()
+        if self._cache:
+            result = self._cache.get_verdict(messages)
+            CACHE_LOOKUPS.labels(
+                self._name, "verdict", "miss" if result is None else "hit"
+            ).inc()
+            if result is not None:
+                log.info(f"Flow {self._name}: verdict taken from the cache")
+                return result
+
+        try:
+            started = time.monotonic()
+            result = self._call(
+                self._stream_verdict
+                if self._streaming
+                else self._ai_client.chat_completions,
+                "trs-analyzer-main",
+                messages,
+            )
+        except RequestException as e:
+            log.error(f"Analyzer request failed: {e}")
+            return None
+
+        elapsed = time.monotonic() - started
+        STAGE_SECONDS.labels(self._name, "chat_completion").observe(elapsed)
+        if self._controller:
+            self._controller.observe_analysis(duration, elapsed)
+        if self._cache and result and result.strip() in ("-", "wait"):
+            self._cache.put_verdict(messages, result.strip())
+        return result
+
+    def _next_transcript(self) -> Transcript | None:
+        """
+        Wait for the next transcript in stream order.
+        :return: The transcript, or None if the pipeline was stopped.
+        """
+        while (transcript := self._reorderer.pop()) is None:
+            completed = self._transcripts.get_until(self._stop)
+            if completed is None:
+                return None
+            self._reorderer.push(completed["index"], completed)
+        return transcript
+
+    def _stream_verdict(self, model: str, messages: list[Message]) -> str:
+        """
+        Stream the analyzer answer and stop generating as soon as the verdict is known.
+        :param model: The model to use for chat completions.
+        :param messages: The messages to use for chat completions.
+        :return: The verdict, see read_verdict.
+        """
+        with closing(
+            self._ai_client.stream_chat_completions(model, messages)
+        ) as tokens:
+            return read_verdict(tokens)
+
+    def _summarize(self, prompt: str, messages: list[Message]) -> str:
+        """
+        Summarize transcript messages pushed out of the analyzer context.
+        :param prompt: System prompt saying what to summarize and how long.
+        :param messages: The previous summary, if any, and the evicted messages.
+        :return: The new summary.
+        """
+        return self._call(
+            self._ai_client.chat_completions,
+            settings.AI_SUMMARY_MODEL,
+            messages,
+            system=prompt,
+        )
+
+    @profiled
+    def _publish(self) -> None:
+        """
+        Hand the next detected event to the RabbitMQ publisher.
+        """
+        event = self._events.get_until(self._stop)
+        if event is None:
+            return
+
+        self._publisher.publish(
+            settings.RABBITMQ_QUEUE, json.dumps(event), self._name
+        )
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import Counter
+
+from src import log
+from src.metrics import LAG_SECONDS, SHED_DECISIONS
+
+
+class LoadShedder:
+    """
+    Tiered degradation policy for a flow falling behind real time.
+
+    The lag is the wall-clock delay between the end of a segment in the
+    stream and the moment it is picked up for transcription. Every multiple
+    of the threshold it crosses enables one more tier:
+    1. skip the AI call on every other segment, the context still grows;
+    2. transcribe with a cheaper model;
+    3. drop the oldest audio instead of transcribing it.
+    """
+
+    SKIP_ANALYSIS = "skip_analysis"
+    CHEAP_MODEL = "cheap_model"
+    DROP_AUDIO = "drop_audio"
+
+    def __init__(self, threshold: float, name: str = "main"):
+        """
+        :param threshold: Lag enabling the first tier, in seconds. 0 disables shedding.
+        :param name: Name of the flow, used in log messages.
+        """
+        self._threshold = threshold
+        self._name = name
+        self._lag = 0.0
+        self._tier = 0
+        self.counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def lag(self) -> float:
+        """
+        Last measured lag, in seconds.
+        """
+        return self._lag
+
+    @property
+    def tier(self) -> int:
+        """
+        Current degradation tier, 0 when the flow keeps up.
+        """
+        return self._tier
+
+    def update(self, end: float) -> int:
+        """
+        Measure the lag of a segment and update the tier.
+        :param end: Absolute timestamp of the end of the segment.
+        :return: The current tier.
+        """
+        self._lag = max(time.time() - end, 0.0)
+        LAG_SECONDS.labels(self._name).set(self._lag)
+        if not self._threshold:
+            return 0
+
+        tier = min(int(self._lag // self._threshold), 3)
+        if tier != self._tier:
+            log.warning(
+                f"Flow {self._name} lags {self._lag:.0f}s behind real time, "
+                f"degradation tier {self._tier} -> {tier}"
+            )
+            self._tier = tier
+        return tier
+
+    def shed(self, decision: str, duration: float) -> None:
+        """
+        Log and count a shed decision.
+        :param decision: One of SKIP_ANALYSIS, CHEAP_MODEL or DROP_AUDIO.
+        :param duration: Duration of the affected segment, in seconds.
+        :return: None
+        """
+        with self._lock:
+            self.counts[decision] += 1
+            total = self.counts[decision]
+        SHED_DECISIONS.labels(self._name, decision).inc()
+        log.warning(
+            f"Flow {self._name} lags {self._lag:.0f}s: {decision} on "
+            f"{duration:.2f}s segment (total: {total})"
+        )
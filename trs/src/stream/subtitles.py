@@ -0,0 +1,235 @@
+import math
+import os
+import shutil
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TextIO
+
+from src import log
+from src.config import settings
+
+# start, end (absolute timestamps) and text of a cue
+Cue = tuple[float, float, str]
+
+
+class SubtitleWriter:
+    """
+    Live subtitles of a flow as rolling WebVTT and SRT segment files.
+
+    The stream timeline is cut into segments of a fixed duration, each with
+    its own .vtt and .srt file. Cues are appended to the file of the segment
+    they start in as soon as they are transcribed. A segment is complete
+    once the transcripts have moved past its end; it is then added to an
+    HLS subtitle playlist listing the latest segments. Files older than the
+    retention are deleted. Only the open segment and the playlist window are
+    kept in memory, however long the flow runs.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_duration: float = 10,
+        window: int = 30,
+        retention: float = 3600,
+        name: str = "main",
+    ):
+        """
+        :param directory: Directory of the flow subtitles, cleared on start.
+        :param segment_duration: Duration of a segment, in seconds.
+        :param window: Number of segments listed in the playlist.
+        :param retention: Duration of the segments kept on disk, in seconds.
+        :param name: Name of the flow, used in log messages.
+        """
+        self._directory = directory
+        self._segment_duration = segment_duration
+        self._retention = max(int(retention // segment_duration), window)
+        self._name = name
+
+        self._origin: float | None = None  # timestamp of the timeline start
+        self._sequence = 0  # the open segment
+        self._files: tuple[TextIO, TextIO] | None = None
+        self._srt_number = 0
+        self._playlist: deque[int] = deque(maxlen=window)
+        self._completed: deque[int] = deque()
+        self._ended = False  # the flow stopped, the playlist is complete
+        self._lock = threading.Lock()
+
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+
+    def write(self, start: float, end: float, cues: list[Cue]) -> None:
+        """
+        Append the cues of a transcript.
+        :param start: Absolute timestamp of the start of the transcript.
+        :param end: Absolute timestamp of the end of the transcript.
+        :param cues: Cues of the transcript, in order.
+        :return: None
+        """
+        with self._lock:
+            if self._origin is None:
+                self._origin = start
+                self._open()
+            elif self._files is None:
+                # The flow was restarted after `close`
+                self._ended = False
+                self._sequence += 1
+                self._open()
+
+            for cue_start, cue_end, text in cues:
+                self._advance(self._segment_at(cue_start))
+                self._append(cue_start, cue_end, text)
+            self._advance(self._segment_at(end))
+
+            vtt, srt = self._files
+            vtt.flush()
+            srt.flush()
+
+    def close(self) -> None:
+        """
+        Complete the open segment and end the playlist, so players know no
+        segment follows. A later write starts a new segment.
+        :return: None
+        """
+        with self._lock:
+            if self._files:
+                self._ended = True
+                self._complete()
+                self._files = None
+
+    def _segment_at(self, timestamp: float) -> int:
+        # Cues never go back to a completed segment
+        return max(
+            int((timestamp - self._origin) // self._segment_duration),
+            self._sequence,
+        )
+
+    def _advance(self, sequence: int) -> None:
+        """
+        Complete the segments before a new one, then open it.
+        """
+        while self._sequence < sequence:
+            self._complete()
+            # After a long outage only the empty segments of a full playlist
+            # are written, which keeps the listed sequence contiguous
+            self._sequence = max(
+                self._sequence + 1, sequence - self._playlist.maxlen
+            )
+            self._open()
+
+    def _open(self) -> None:
+        vtt = (self._directory / f"{self._sequence}.vtt").open("w")
+        vtt.write("WEBVTT\nX-TIMESTAMP-MAP=MPEGTS:0,LOCAL:00:00:00.000\n\n")
+        srt = (self._directory / f"{self._sequence}.srt").open("w")
+        self._files = (vtt, srt)
+        self._srt_number = 0
+
+    def _append(self, start: float, end: float, text: str) -> None:
+        vtt, srt = self._files
+        start -= self._origin
+        end = max(end - self._origin, start)
+        text = text.strip().replace("-->", "->")
+
+        escaped = (
+            text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        )
+        vtt.write(f"{_timestamp(start)} --> {_timestamp(end)}\n{escaped}\n\n")
+
+        self._srt_number += 1
+        srt.write(
+            f"{self._srt_number}\n"
+            f"{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n"
+            f"{text}\n\n"
+        )
+
+    def _complete(self) -> None:
+        """
+        Close the open segment, list it in the playlist and delete expired ones.
+        """
+        for file in self._files:
+            file.close()
+        self._playlist.append(self._sequence)
+        self._completed.append(self._sequence)
+        self._write_playlist()
+
+        while len(self._completed) > self._retention:
+            expired = self._completed.popleft()
+            for extension in ("vtt", "srt"):
+                (self._directory / f"{expired}.{extension}").unlink(
+                    missing_ok=True
+                )
+
+    def _write_playlist(self) -> None:
+        """
+        Replace the playlist atomically, so players never read half of it.
+        """
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{math.ceil(self._segment_duration)}",
+            f"#EXT-X-MEDIA-SEQUENCE:{self._playlist[0]}",
+        ]
+        for sequence in self._playlist:
+            started = datetime.fromtimestamp(
+                self._origin + sequence * self._segment_duration, timezone.utc
+            )
+            lines += [
+                f"#EXT-X-PROGRAM-DATE-TIME:{started.isoformat(timespec='milliseconds')}",
+                f"#EXTINF:{self._segment_duration:.3f},",
+                f"{sequence}.vtt",
+            ]
+        if self._ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        path = self._directory / "subtitles.m3u8"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text("\n".join(lines) + "\n")
+        os.replace(temporary, path)
+
+
+def _timestamp(seconds: float, separator: str = ".") -> str:
+    """
+    Format an offset as hh:mm:ss.ttt, or hh:mm:ss,ttt for SRT.
+    """
+    milliseconds = round(seconds * 1000)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return (
+        f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+    )
+
+
+# flow name -> subtitle writer, kept across restarts of the flow
+_writers: dict[str, SubtitleWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def open_subtitles(
+    name: str,
+    directory: str = settings.SUBTITLES_DIR,
+    segment_duration: float = settings.SUBTITLES_SEGMENT_DURATION,
+    window: int = settings.SUBTITLES_WINDOW,
+    retention: float = settings.SUBTITLES_RETENTION,
+) -> SubtitleWriter:
+    """
+    Get the subtitle writer of a flow, created on first use.
+    :param name: Name of the flow.
+    :param directory: Directory of the subtitles of all flows.
+    :param segment_duration: Duration of a segment, in seconds.
+    :param window: Number of segments listed in the playlist.
+    :param retention: Duration of the segments kept on disk, in seconds.
+    :return: The writer.
+    """
+    with _writers_lock:
+        if name not in _writers:
+            _writers[name] = SubtitleWriter(
+                Path(directory) / name,
+                segment_duration,
+                window,
+                retention,
+                name,
+            )
+            log.info(f"Writing subtitles of flow {name} to {directory}/{name}")
+        return _writers[name]
@@ -0,0 +1,143 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import log
+from src.api import AIClient
+from src.api.transcription import get_transcription_backend
+from src.config import settings
+from src.mq import RabbitMQPublisher
+from src.stream.cache import ContentCache
+from src.stream.services import StreamService
+
+
+class FlowSupervisor:
+    """
+    FlowSupervisor runs one StreamService pipeline per flow in a single process.
+    Flows share the API clients, a worker pool for remote calls and the
+    RabbitMQ publisher, while every flow keeps its own pipeline state.
+    A crashed flow is restarted with exponential backoff without affecting
+    the others.
+    """
+
+    def __init__(
+        self,
+        flows: dict[str, str],
+        worker_pool_size: int = settings.WORKER_POOL_SIZE,
+        restart_delay: float = settings.FLOW_RESTART_DELAY,
+        restart_max_delay: float = settings.FLOW_RESTART_MAX_DELAY,
+    ):
+        """
+        :param flows: Mapping of flow names to flow URLs.
+        :param worker_pool_size: Number of workers shared by all flows for remote calls.
+        :param restart_delay: Initial delay before restarting a crashed flow, in seconds.
+        :param restart_max_delay: Maximum delay before restarting a crashed flow, in seconds.
+        """
+        if not flows:
+            raise ValueError("No flows to supervise")
+
+        self._flows = flows
+        self._restart_delay = restart_delay
+        self._restart_max_delay = restart_max_delay
+
+        self._ai_client = AIClient()
+        self._transcription_client = get_transcription_backend()
+        self._executor = ThreadPoolExecutor(
+            max_workers=worker_pool_size, thread_name_prefix="worker"
+        )
+
+        self._publisher = RabbitMQPublisher()
+        self._cache = (
+            ContentCache(
+                settings.CACHE_MAX_ENTRIES,
+                settings.CACHE_TTL,
+                settings.CACHE_PATH,
+            )
+            if settings.CACHE_ENABLED
+            else None
+        )
+
+        self._stop = threading.Event()
+        self._services: dict[str, StreamService] = {}
+        self._lock = threading.Lock()
+
+    def run(self) -> None:
+        """
+        Start every flow and block until the supervisor is stopped.
+        :return: None
+        """
+        threads = [
+            threading.Thread(
+                target=self._supervise,
+                args=(name, flow),
+                name=f"{name}:supervisor",
+                daemon=True,
+            )
+            for name, flow in self._flows.items()
+        ]
+        self._publisher.start()
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self._stop.wait(1):
+                pass
+        finally:
+            self.stop()
+            for thread in threads:
+                thread.join()
+            self._executor.shutdown(cancel_futures=True)
+            self._publisher.close()
+            if self._cache:
+                self._cache.close()
+
+    def stop(self) -> None:
+        """
+        Stop every flow.
+        :return: None
+        """
+        self._stop.set()
+        with self._lock:
+            for service in self._services.values():
+                service.stop()
+
+    def _supervise(self, name: str, flow: str) -> None:
+        """
+        Run a flow and restart it whenever it crashes.
+        :param name: Name of the flow.
+        :param flow: The input flow URL.
+        :return: None
+        """
+        delay = self._restart_delay
+
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                # Invalid flow settings are retried like runtime failures
+                service = StreamService(
+                    flow,
+                    name=name,
+                    ai_client=self._ai_client,
+                    transcription_client=self._transcription_client,
+                    executor=self._executor,
+                    publisher=self._publisher,
+                    cache=self._cache,
+                )
+                with self._lock:
+                    if self._stop.is_set():
+                        return
+                    self._services[name] = service
+                service.process()
+            except Exception as e:
+                log.error(f"Flow {name} crashed: {e}")
+
+            if self._stop.is_set():
+                return
+
+            # A flow that ran for a while before crashing starts over with the initial delay
+            if time.monotonic() - started > self._restart_max_delay:
+                delay = self._restart_delay
+
+            log.info(f"Restarting flow {name} in {delay:.0f} seconds")
+            self._stop.wait(delay)
+            delay = min(delay * 2, self._restart_max_delay)
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class SpeechDetector:
+    """
+    Lightweight CPU voice-activity detector for 16-bit mono PCM audio.
+
+    Audio is cut into 30 ms frames. A frame is voiced when it is loud enough
+    and most of its energy lies in the speech band. Every second of audio is
+    then classified as speech when enough of its frames are voiced and its
+    loudness fluctuates the way syllables and pauses do, which tells speech
+    apart from music, jingles and steady noise in the same band.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        min_level: float = -50,
+        min_band_ratio: float = 0.5,
+        min_voiced_ratio: float = 0.3,
+        min_modulation: float = 6,
+    ):
+        """
+        :param sample_rate: Sample rate of the audio (default is 16000).
+        :param frame_ms: Length of the analysed frames in milliseconds (default is 30).
+        :param min_level: Minimum frame level of a voiced frame in dBFS (default is -50).
+        :param min_band_ratio: Minimum share of frame energy in the 300-3400 Hz band (default is 0.5).
+        :param min_voiced_ratio: Minimum share of voiced frames in a second of speech (default is 0.3).
+        :param min_modulation: Minimum standard deviation of frame levels in a second of speech, in dB (default is 6).
+        """
+        self._sample_rate = sample_rate
+        self._frame = sample_rate * frame_ms // 1000
+        self._frames_per_second = 1000 // frame_ms
+        self._min_level = min_level
+        self._min_band_ratio = min_band_ratio
+        self._min_voiced_ratio = min_voiced_ratio
+        self._min_modulation = min_modulation
+
+        frequencies = np.fft.rfftfreq(self._frame, 1 / sample_rate)
+        self._band = (frequencies >= 300) & (frequencies <= 3400)
+        self._window = np.hanning(self._frame).astype(np.float32)
+
+    def speech_ratio(self, audio_bytes: bytes | memoryview) -> float:
+        """
+        Estimate the share of the audio that is speech.
+        :param audio_bytes: Bytes representing the audio data.
+        :return: Share of seconds classified as speech, from 0 to 1.
+                 Audio shorter than a second is assumed to be speech.
+        """
+        samples = np.frombuffer(audio_bytes, dtype="<i2")
+        frames = len(samples) // self._frame
+        seconds = frames // self._frames_per_second
+        if not seconds:
+            return 1.0
+
+        frames = seconds * self._frames_per_second
+        x = samples[: frames * self._frame].reshape(frames, self._frame)
+        x = x.astype(np.float32) / 2**15
+
+        level = 10 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+
+        spectrum = np.abs(np.fft.rfft(x * self._window, axis=1)) ** 2
+        band_ratio = spectrum[:, self._band].sum(axis=1) / (
+            spectrum.sum(axis=1) + 1e-10
+        )
+
+        voiced = (level > self._min_level) & (band_ratio > self._min_band_ratio)
+
+        voiced = voiced.reshape(seconds, self._frames_per_second)
+        level = level.reshape(seconds, self._frames_per_second)
+        speech = (voiced.mean(axis=1) >= self._min_voiced_ratio) & (
+            level.std(axis=1) >= self._min_modulation
+        )
+        return float(speech.mean())
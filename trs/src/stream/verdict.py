@@ -0,0 +1,43 @@
+import json
+from typing import Iterable
+
+_decoder = json.JSONDecoder()
+
+
+def read_verdict(tokens: Iterable[str]) -> str:
+    """
+    Read streamed analyzer tokens only until the verdict is known.
+    "-" and "wait" are recognized from the first tokens. For an event the
+    JSON payload is parsed as it arrives and reading stops once it is complete.
+    :param tokens: Content tokens of the analyzer answer.
+    :return: "-", "wait", the JSON text of the event, or the whole answer if it could not be parsed.
+    """
+    text = ""
+    start = -1
+
+    for token in tokens:
+        text += token
+        stripped = text.strip().strip("`").lstrip()
+
+        if not stripped:
+            continue
+        if stripped.startswith("-"):
+            return "-"
+        if stripped.lower().startswith("wait"):
+            return "wait"
+        if "wait".startswith(stripped.lower()):
+            continue
+
+        if start < 0:
+            start = text.find("{")
+        if start < 0 or "}" not in token:
+            continue
+
+        payload = text[start:].replace("“", '"').replace("”", '"')
+        try:
+            _, end = _decoder.raw_decode(payload)
+        except json.JSONDecodeError:
+            continue
+        return payload[:end]
+
+    return text
@@ -0,0 +1,22 @@
+import os
+
+# src.config reads the environment on import, the tests never reach the
+# services themselves
+for name, value in {
+    "FLOW": "test",
+    "AI_BASE_URL": "http://127.0.0.1:9",
+    "AI_EMAIL": "test",
+    "AI_PASSWORD": "test",
+    "TRANSCRIPTION_BASE_URL": "http://127.0.0.1:9",
+    "TRANSCRIPTION_USERNAME": "test",
+    "TRANSCRIPTION_PASSWORD": "test",
+    "RABBITMQ_USER": "test",
+    "RABBITMQ_PASSWORD": "test",
+    "RABBITMQ_HOST": "127.0.0.1",
+    "RABBITMQ_PORT": "5672",
+    "RABBITMQ_QUEUE": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+# src.api imports src.stream, which must be imported first
+import src.stream  # noqa: E402, F401
@@ -0,0 +1,59 @@
+import pytest
+
+from src.stream.adaptive import ChunkController, LatencyModel
+
+
+def _observe(controller: ChunkController, overhead: float, rate: float):
+    for seconds in (10, 20, 30, 10, 20, 30):
+        controller.observe_transcription(seconds, 0.5 + 0.1 * seconds)
+        controller.observe_analysis(seconds, overhead + rate * seconds)
+
+
+def test_latency_model_fits_overhead_and_rate():
+    model = LatencyModel()
+    assert not model
+    for seconds in (10, 20, 30, 15, 25):
+        model.observe(seconds, 2 + 0.25 * seconds)
+
+    assert model
+    assert model.estimate() == pytest.approx((2, 0.25))
+
+
+def test_latency_model_is_proportional_for_equal_durations():
+    model = LatencyModel()
+    for latency in (4, 6):
+        model.observe(10, latency)
+
+    overhead, rate = model.estimate()
+    assert overhead == 0
+    assert 0.4 < rate < 0.6
+
+
+def test_chunks_shrink_while_the_backends_are_fast():
+    controller = ChunkController(30, 5, 60, latency_target=60)
+    _observe(controller, overhead=1, rate=0)
+
+    assert controller.chunk_duration == 5
+
+
+def test_chunks_grow_with_the_request_overhead():
+    controller = ChunkController(30, 5, 60, latency_target=60)
+    _observe(controller, overhead=8, rate=0)
+
+    # overhead / (utilization - rate) = 8 / 0.8
+    assert controller.chunk_duration == 10
+
+
+def test_chunks_are_longest_when_a_backend_cannot_keep_up():
+    controller = ChunkController(30, 5, 60, latency_target=60)
+    _observe(controller, overhead=1, rate=1)
+
+    assert controller.chunk_duration == 60
+
+
+def test_chunk_duration_waits_for_both_backends():
+    controller = ChunkController(30, 5, 60, latency_target=60)
+    for seconds in (10, 20, 30):
+        controller.observe_transcription(seconds, 0.1 * seconds)
+
+    assert controller.chunk_duration == 30
@@ -0,0 +1,99 @@
+import random
+from pathlib import Path
+
+import numpy as np
+
+from src.stream.archive import AudioArchive, VideoArchive
+
+SAMPLE_RATE = 16000
+
+
+def _ramp(seconds: float) -> bytes:
+    # Every sample holds its own index, so misplaced audio is detectable
+    return (
+        (np.arange(int(seconds * SAMPLE_RATE)) % 30000).astype("<i2").tobytes()
+    )
+
+
+def _samples(audio: bytes) -> np.ndarray:
+    return np.frombuffer(audio, dtype="<i2").astype(int)
+
+
+def test_read_at_random_non_integer_starts(tmp_path):
+    archive = AudioArchive(tmp_path / "flow.pcm", 60, SAMPLE_RATE)
+    archive.write(1000.0, _ramp(20))
+    rng = random.Random(0)
+
+    for _ in range(500):
+        start = 1000 + rng.randint(0, 1800) / 100
+        audio = archive.read(start, start + 2)
+
+        assert len(audio) == 2 * SAMPLE_RATE * 2
+        expected = round((start - 1000) * SAMPLE_RATE)
+        samples = _samples(audio)
+        assert abs(samples[0] - expected % 30000) <= 1
+        assert np.all(np.diff(samples) % 30000 == 1)
+
+
+def test_read_fills_what_is_missing_with_silence(tmp_path):
+    archive = AudioArchive(tmp_path / "flow.pcm", 60, SAMPLE_RATE)
+    archive.write(1000.0, _ramp(2))
+    archive.write(1005.0, _ramp(2))  # after a 3-second gap
+
+    for start in (999.37, 1001.13, 1004.01):
+        audio = archive.read(start, start + 3)
+        assert len(audio) == 3 * SAMPLE_RATE * 2
+
+    samples = _samples(archive.read(999.5, 1007.5))
+    assert len(samples) == 8 * SAMPLE_RATE
+    assert not samples[: SAMPLE_RATE // 2].any()
+    assert samples[SAMPLE_RATE // 2 + 1] == 1
+    assert not samples[int(3 * SAMPLE_RATE) : int(5.5 * SAMPLE_RATE)].any()
+    assert samples[int(5.5 * SAMPLE_RATE) + 1] == 1
+    assert archive.read(990, 995) is None
+
+
+def test_read_after_the_ring_wrapped(tmp_path):
+    archive = AudioArchive(tmp_path / "flow.pcm", 10, SAMPLE_RATE)
+    for second in range(25):
+        archive.write(1000.0 + second, _ramp(1))
+
+    # Overwritten audio reads as missing, the rest survives the wrap-around
+    assert archive.read(1000, 1010) is None
+    samples = _samples(archive.read(1016.25, 1019.75))
+    assert len(samples) == 3.5 * SAMPLE_RATE
+    assert samples[0] == SAMPLE_RATE // 4
+    assert samples[SAMPLE_RATE - SAMPLE_RATE // 4] == 0
+    samples = _samples(archive.read(1013.5, 1015.5))
+    assert not samples[: int(1.5 * SAMPLE_RATE)].any()
+    assert samples[int(1.5 * SAMPLE_RATE) + 1] == 1
+
+
+def _write_session(archive: VideoArchive, directory, times) -> None:
+    # What ffmpeg writes for the output returned by output_args
+    args = archive.output_args()
+    prefix = args[args.index("-segment_list") + 1].removesuffix(".csv")
+    lines = []
+    for i, (start, end) in enumerate(times):
+        name = f"{prefix}-{i:06d}.ts"
+        (directory / name).write_bytes(b"ts")
+        lines.append(f"{Path(name).name},{start:.6f},{end:.6f}\n")
+    Path(f"{prefix}.csv").write_text("".join(lines))
+
+
+def test_video_segments_follow_the_timeline_across_sessions(tmp_path):
+    directory = tmp_path / "flow"
+    archive = VideoArchive(directory, 600)
+
+    _write_session(archive, directory, [(0, 10), (10, 20), (20, 30)])
+    archive.anchor(1000.0)
+    # The reconnected process delivers the last 5 seconds again
+    _write_session(archive, directory, [(0, 4), (4, 10), (10, 20)])
+    archive.anchor(1025.0)
+    # Not anchored yet
+    _write_session(archive, directory, [(0, 10)])
+
+    timestamps = [timestamp for timestamp, _ in archive.segments(0, 2000)]
+    assert timestamps == [1000.0, 1010.0, 1020.0, 1029.0, 1035.0]
+    timestamps = [timestamp for timestamp, _ in archive.segments(1012, 1021)]
+    assert timestamps == [1010.0, 1020.0]
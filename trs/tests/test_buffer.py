@@ -0,0 +1,57 @@
+import io
+import threading
+
+from src.stream.buffer import AudioRingBuffer
+
+
+def _fill(buffer: AudioRingBuffer, data: bytes) -> int | None:
+    return buffer.readinto(io.BytesIO(data), len(data), timeout=0.1)
+
+
+def test_take_keeps_the_overlap_unsplit():
+    buffer = AudioRingBuffer(100)
+    assert _fill(buffer, bytes(range(40))) == 40
+
+    lease = buffer.take(30, keep=10)
+    assert bytes(lease.view) == bytes(range(30))
+    assert buffer.pending == 20
+    assert buffer.leased == 30
+    with buffer.unsplit() as pending:
+        assert bytes(pending) == bytes(range(20, 40))
+
+    lease.release()
+    lease.release()
+    assert buffer.leased == 0
+
+
+def test_unsplit_audio_moves_to_the_front_without_touching_leases():
+    buffer = AudioRingBuffer(100)
+    _fill(buffer, bytes(range(90)))
+    buffer.take(80).release()
+    lease = buffer.take(5)
+
+    # The 5 unsplit bytes move to the front, ahead of the lease at 80..85
+    assert _fill(buffer, bytes(range(100, 150))) == 50
+    assert bytes(lease.view) == bytes(range(80, 85))
+    with buffer.unsplit() as pending:
+        assert bytes(pending) == bytes([*range(85, 90), *range(100, 150)])
+
+
+def test_reader_waits_for_a_lease_in_the_way():
+    buffer = AudioRingBuffer(100)
+    _fill(buffer, bytes(90))
+    lease = buffer.take(90)
+
+    assert _fill(buffer, bytes(20)) is None
+
+    threading.Timer(0.05, lease.release).start()
+    data = bytes(range(20))
+    assert buffer.readinto(io.BytesIO(data), 20, timeout=5) == 20
+    with buffer.unsplit() as pending:
+        assert bytes(pending) == data
+
+
+def test_end_of_stream_reads_nothing():
+    buffer = AudioRingBuffer(100)
+    assert _fill(buffer, b"") == 0
+    assert buffer.pending == 0
@@ -0,0 +1,140 @@
+import time
+
+import numpy as np
+
+from src.stream.cache import ContentCache
+
+SAMPLE_RATE = 16000
+
+
+def _speech(seed: int, seconds: float) -> np.ndarray:
+    # Noise in syllables of random loudness, different for every seed
+    rng = np.random.default_rng(seed)
+    syllables = int(seconds * 10)
+    loudness = np.repeat(rng.uniform(300, 6000, syllables), SAMPLE_RATE // 10)
+    return rng.normal(0, 1, len(loudness)) * loudness
+
+
+def _pcm(*parts: np.ndarray) -> bytes:
+    samples = np.concatenate(parts)
+    return samples.clip(-32768, 32767).astype("<i2").tobytes()
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE))
+
+
+def _segments(text: str) -> list:
+    return [{"number": 1, "start": 0.0, "end": 1.0, "text": text}]
+
+
+def test_audio_split_elsewhere_matches():
+    cache = ContentCache()
+    speech = _speech(1, 31)
+    cache.put_segments(
+        cache.fingerprint(_pcm(speech[: 30 * SAMPLE_RATE])), _segments("a")
+    )
+
+    rng = np.random.default_rng(2)
+    for offset in (37, 901, 3000):
+        repeat = speech[offset : offset + 30 * SAMPLE_RATE]
+        repeat = repeat + rng.normal(0, 100, len(repeat))
+        assert cache.get_segments(cache.fingerprint(_pcm(repeat))) == (
+            _segments("a")
+        )
+
+
+def test_different_audio_does_not_match():
+    cache = ContentCache()
+    cache.put_segments(cache.fingerprint(_pcm(_speech(1, 30))), _segments("a"))
+
+    assert cache.get_segments(cache.fingerprint(_pcm(_speech(2, 30)))) is None
+
+
+def test_zero_padding_does_not_make_different_audio_match():
+    cache = ContentCache()
+    cache.put_segments(
+        cache.fingerprint(_pcm(_speech(1, 18), _silence(12))), _segments("a")
+    )
+
+    fingerprint = cache.fingerprint(_pcm(_speech(2, 18), _silence(12)))
+    assert cache.get_segments(fingerprint) is None
+
+
+def test_mostly_silent_audio_is_not_cached():
+    cache = ContentCache()
+    audio = _pcm(_speech(1, 5), _silence(25))
+    cache.put_segments(cache.fingerprint(audio), _segments("a"))
+
+    assert cache.get_segments(cache.fingerprint(audio)) is None
+    assert not cache._audio
+
+
+def test_match_is_found_among_many_entries():
+    cache = ContentCache(max_entries=300)
+    rng = np.random.default_rng(0)
+    frames = len(cache.fingerprint(_pcm(_speech(0, 30)))[0])
+    for i in range(200):
+        bits = rng.random((frames, 16)) > 0.5
+        cache.put_segments((bits, np.ones(frames, bool)), _segments(str(i)))
+    speech = _speech(1, 31)
+    cache.put_segments(
+        cache.fingerprint(_pcm(speech[: 30 * SAMPLE_RATE])), _segments("a")
+    )
+
+    fingerprint = cache.fingerprint(_pcm(speech[901 : 901 + 30 * SAMPLE_RATE]))
+    with cache._lock:
+        candidates = cache._candidates(fingerprint)
+    assert len(candidates) == cache._max_candidates
+    assert cache.get_segments(fingerprint) == _segments("a")
+
+
+def test_evicted_entries_leave_the_index():
+    cache = ContentCache(max_entries=5)
+    for seed in range(20):
+        cache.put_segments(
+            cache.fingerprint(_pcm(_speech(seed, 10))), _segments(str(seed))
+        )
+
+    assert len(cache._audio) == len(cache._entry_ids) == 5
+    live = sum(count for _, count in cache._entry_ids.values())
+    assert sum(map(len, cache._postings.values())) <= 2 * live
+    fingerprint = cache.fingerprint(_pcm(_speech(0, 10)))
+    assert cache.get_segments(fingerprint) is None
+    fingerprint = cache.fingerprint(_pcm(_speech(19, 10)))
+    assert cache.get_segments(fingerprint) == _segments("19")
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    audio = _pcm(_speech(1, 20), _silence(5))
+    messages = [{"role": "user", "content": "[0.0 - 2.5] Hello, World!"}]
+    cache = ContentCache(path=path)
+    cache.put_segments(cache.fingerprint(audio), _segments("a"))
+    cache.put_verdict(messages, "no")
+    cache.close()
+
+    cache = ContentCache(path=path)
+    assert cache.get_segments(cache.fingerprint(audio)) == _segments("a")
+    messages = [{"role": "user", "content": "[3.1 - 5.0] hello world"}]
+    assert cache.get_verdict(messages) == "no"
+
+
+def test_expired_entries_leave_the_index(monkeypatch):
+    cache = ContentCache(max_entries=100, ttl=60)
+    now = time.time()
+    for seed in range(4):
+        cache.put_segments(
+            cache.fingerprint(_pcm(_speech(seed, 10))), _segments(str(seed))
+        )
+
+    # Expiring several entries at once rebuilds the index
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    cache.put_segments(cache.fingerprint(_pcm(_speech(4, 10))), _segments("4"))
+
+    assert list(cache._entry_ids) == list(cache._audio)
+    assert cache._stale_postings == 0
+    fingerprint = cache.fingerprint(_pcm(_speech(0, 10)))
+    assert cache.get_segments(fingerprint) is None
+    fingerprint = cache.fingerprint(_pcm(_speech(4, 10)))
+    assert cache.get_segments(fingerprint) == _segments("4")
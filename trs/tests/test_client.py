@@ -0,0 +1,41 @@
+import base64
+import json
+import time
+
+from src.api.client import BaseClient
+from src.api.utils import get_token_expiry
+from src.config import settings
+
+
+def _jwt(claims: dict) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+    return f"header.{payload.decode()}.signature"
+
+
+class _Client(BaseClient):
+    def __init__(self, expires_in: float):
+        super().__init__("http://127.0.0.1:9", {})
+        self.expires_in = expires_in
+        self.logins = 0
+
+    def login(self) -> None:
+        self.logins += 1
+        self._set_token(_jwt({"exp": time.time() + self.expires_in}))
+
+
+def test_token_expiry_is_read_from_the_jwt():
+    assert get_token_expiry(_jwt({"exp": 1700000000})) == 1700000000
+    assert get_token_expiry(_jwt({"sub": "user"})) is None
+    assert get_token_expiry("opaque-token") is None
+
+
+def test_token_is_refreshed_only_shortly_before_it_expires():
+    client = _Client(expires_in=3600)
+    client.ensure_token()
+    client.ensure_token()
+    assert client.logins == 1
+
+    client = _Client(expires_in=settings.TOKEN_REFRESH_MARGIN / 2)
+    client.ensure_token()
+    client.ensure_token()
+    assert client.logins == 2
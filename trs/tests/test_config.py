@@ -0,0 +1,13 @@
+import pytest
+from pydantic import ValidationError
+
+from src.config import Settings
+
+
+def test_a_flow_is_required(monkeypatch):
+    monkeypatch.delenv("FLOW")
+    with pytest.raises(ValidationError, match="Set FLOW, or FLOWS"):
+        Settings(_env_file=None)
+
+    monkeypatch.setenv("FLOWS", '{"first": "udp://a"}')
+    assert Settings(_env_file=None).FLOWS == {"first": "udp://a"}
@@ -0,0 +1,62 @@
+from requests import HTTPError
+
+from src.stream.context import AnalyzerContext
+
+
+def _message(i: int) -> dict:
+    return {"content": f"message {i}", "start": float(i), "end": i + 1.0}
+
+
+class _Summarizer:
+    def __init__(self):
+        self.calls: list[tuple[str, list]] = []
+        self.failing = False
+
+    def __call__(self, prompt: str, messages: list) -> str:
+        self.calls.append((prompt, messages))
+        if self.failing:
+            raise HTTPError("503 Server Error")
+        return "summary " + ", ".join(m["content"] for m in messages) * 100
+
+
+def test_evicted_messages_are_summarized():
+    summarizer = _Summarizer()
+    context = AnalyzerContext(summarizer, max_chars=1000, max_messages=4)
+    for i in range(5):
+        context.append(_message(i))
+
+    prompt, messages = summarizer.calls[0]
+    assert "at most 250 characters" in prompt
+    assert messages == [_message(i) for i in range(3)]
+    summary, *window = context.messages()
+    assert window == [_message(3), _message(4)]
+    assert summary["start"] == 0.0 and summary["end"] == 3.0
+    header, text = summary["content"].split("\n", 1)
+    assert header == "Summary of the earlier transcript:"
+    assert len(text) == 250
+
+
+def test_messages_are_kept_while_the_summarizer_fails():
+    summarizer = _Summarizer()
+    summarizer.failing = True
+    context = AnalyzerContext(summarizer, max_chars=1000, max_messages=4)
+    for i in range(6):
+        context.append(_message(i))
+
+    assert context.messages() == [_message(i) for i in range(6)]
+
+    summarizer.failing = False
+    context.append(_message(6))
+    _, messages = summarizer.calls[-1]
+    assert messages == [_message(i) for i in range(5)]
+    assert context.messages()[1:] == [_message(5), _message(6)]
+
+
+def test_window_stays_bounded_while_the_summarizer_fails():
+    summarizer = _Summarizer()
+    summarizer.failing = True
+    context = AnalyzerContext(summarizer, max_chars=1000, max_messages=4)
+    for i in range(20):
+        context.append(_message(i))
+
+    assert context.messages() == [_message(i) for i in range(12, 20)]
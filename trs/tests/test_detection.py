@@ -0,0 +1,65 @@
+import numpy as np
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+
+from src.stream.detection import SilenceDetector, get_split_ms
+
+BYTES_PER_MS = 32
+
+
+def _pydub_split_ms(audio: bytes) -> int:
+    # The detection replaced by SilenceDetector
+    silences = detect_silence(
+        AudioSegment(data=audio, sample_width=2, frame_rate=16000, channels=1),
+        min_silence_len=300,
+        silence_thresh=-40,
+    )
+    return sum(silences[-1]) // 2 if silences else 0
+
+
+def _audio(rng: np.random.Generator) -> bytes:
+    # Parts around the -40 dBFS threshold, at an amplitude of about 328
+    parts = [
+        rng.normal(0, rng.choice([5, 200, 330, 400, 3000]), n * 16)
+        for n in rng.integers(50, 1500, rng.integers(1, 8))
+    ]
+    return np.concatenate(parts).clip(-32768, 32767).astype("<i2").tobytes()
+
+
+def test_split_matches_pydub():
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        audio = _audio(rng)
+        assert get_split_ms(audio) == _pydub_split_ms(audio)
+
+
+def test_incremental_feeding_matches_pydub():
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        audio = _audio(rng)
+        detector = SilenceDetector()
+        fed = b""
+        position = 0
+        while position < len(audio):
+            # Chunks of any size, even splitting samples
+            chunk = audio[position : position + int(rng.integers(1, 20000))]
+            position += len(chunk)
+            detector.feed(chunk)
+            fed += chunk
+
+            split = detector.split_ms()
+            complete = len(fed) // BYTES_PER_MS * BYTES_PER_MS
+            assert split == _pydub_split_ms(fed[:complete])
+            if split and rng.random() < 0.5:
+                detector.consume(split)
+                fed = fed[split * BYTES_PER_MS :]
+
+
+def test_quietest_ms_finds_the_quietest_window():
+    rng = np.random.default_rng(3)
+    samples = rng.normal(0, 3000, 16000 * 3)
+    samples[16000 + 8000 : 16000 + 8800] *= 0.01  # 1.5 s to 1.55 s
+    detector = SilenceDetector()
+    detector.feed(samples.astype("<i2").tobytes())
+
+    assert 1500 <= detector.quietest_ms(1000, 2000) <= 1550
@@ -0,0 +1,47 @@
+import io
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from src.api import TranscriptionClient
+from src.api.transcription.utils import encode_pcm
+
+PCM = np.arange(-8000, 8000, dtype="<i2").tobytes()
+
+
+def test_wav_is_encoded_in_memory():
+    contents, filename = encode_pcm(memoryview(PCM), 16000)
+
+    assert filename == "audio.wav"
+    with wave.open(io.BytesIO(contents)) as wf:
+        assert (wf.getframerate(), wf.getnchannels()) == (16000, 1)
+        assert wf.readframes(wf.getnframes()) == PCM
+
+
+@pytest.mark.skipif(not shutil.which("ffmpeg"), reason="needs ffmpeg")
+def test_flac_is_encoded_through_ffmpeg():
+    contents, filename = encode_pcm(PCM, 16000, codec="flac")
+
+    assert filename == "audio.flac"
+    assert contents.startswith(b"fLaC")
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        encode_pcm(PCM, codec="mp3")
+
+
+def test_transcribe_pcm_uploads_the_prepared_audio(monkeypatch):
+    client = TranscriptionClient()
+    uploads = []
+
+    def transcribe_audio(contents: bytes, filename: str, **kwargs) -> list:
+        uploads.append((contents, filename, kwargs))
+        return []
+
+    monkeypatch.setattr(client, "transcribe_audio", transcribe_audio)
+
+    assert client.transcribe_pcm(PCM, model="small") == []
+    assert uploads == [(*encode_pcm(PCM), {"model": "small"})]
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import threading
+import time
+
+from src.stream.ffmpeg import FFmpegStream, _Pipe
+
+
+def _start(script: str, stall_timeout: float = 1) -> FFmpegStream:
+    # A Python process stands in for ffmpeg, started like `_spawn` does
+    stream = FFmpegStream("test", stall_timeout=stall_timeout)
+    stream._process = subprocess.Popen(
+        [sys.executable, "-c", script], stdout=subprocess.PIPE
+    )
+    stream._pipe = _Pipe(stream._process.stdout)
+    stream._progress = time.monotonic()
+    threading.Thread(
+        target=stream._watch_progress,
+        args=(stream._process, stream._pipe),
+        daemon=True,
+    ).start()
+    return stream
+
+
+def test_process_blocked_on_a_full_pipe_is_not_killed():
+    # Fills the pipe, then blocks while nobody reads
+    stream = _start(
+        "import sys\nwhile True: sys.stdout.buffer.write(b'0' * 4096)"
+    )
+    try:
+        time.sleep(3)
+        assert stream._process.poll() is None
+    finally:
+        stream._process.kill()
+        stream._process.wait()
+
+
+def test_process_stalled_while_audio_is_awaited_is_killed():
+    stream = _start("import time\ntime.sleep(60)")
+    try:
+        assert stream._pipe.read(1) == b""
+        assert stream._process.wait(5) == -9
+    finally:
+        stream._process.kill()
+
+
+def test_process_ignoring_termination_is_killed_on_reconnect():
+    stream = _start(
+        "import signal, time\n"
+        "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+        "print(flush=True)\n"
+        "time.sleep(60)",
+        stall_timeout=60,
+    )
+    stream._terminate_timeout = 0.5
+    assert stream._pipe.read(1) == b"\n"
+    stop = threading.Event()
+    stop.set()
+
+    assert stream.reconnect(stop) is None
+    assert stream._process.returncode == -9
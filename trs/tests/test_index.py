@@ -0,0 +1,55 @@
+from src.stream.index import TranscriptIndex, serve_search
+
+
+def _index(path: str) -> None:
+    index = TranscriptIndex(path)
+    index.add(
+        [
+            {"flow": "a", "start": 0, "end": 5, "text": "Kick-off in Madrid"},
+            {"flow": "a", "start": 5, "end": 10, "text": "Early goal, Madrid"},
+            {"flow": "b", "start": 7, "end": 12, "text": "Goal in Paris"},
+            {"flow": "b", "start": 12, "end": 15, "text": 'A "quoted" goal'},
+        ]
+    )
+    # Writes the queued segments
+    index.close()
+
+
+def _texts(segments: list) -> list[str]:
+    return [segment["text"] for segment in segments]
+
+
+def test_search_matches_every_word(tmp_path):
+    path = str(tmp_path / "index.db")
+    _index(path)
+    index = TranscriptIndex(path)
+
+    assert _texts(index.search("goal")) == [
+        'A "quoted" goal',
+        "Goal in Paris",
+        "Early goal, Madrid",
+    ]
+    assert _texts(index.search("madrid GOAL")) == ["Early goal, Madrid"]
+    # Query syntax in the words is searched as text
+    assert _texts(index.search('"quoted" OR')) == []
+    assert _texts(index.search('"quoted"')) == ['A "quoted" goal']
+    index.close()
+
+
+def test_search_filters_by_flow_and_time(tmp_path):
+    path = str(tmp_path / "index.db")
+    _index(path)
+    index = TranscriptIndex(path)
+
+    assert [s["start"] for s in index.search(flow="a")] == [5, 0]
+    assert [s["start"] for s in index.search(start=6, end=12)] == [7, 5]
+    assert index.search("goal", flow="b", limit=1) == [
+        {"flow": "b", "start": 12, "end": 15, "text": 'A "quoted" goal'}
+    ]
+    index.close()
+
+
+def test_search_route_rejects_invalid_parameters():
+    assert serve_search({"start": ["yesterday"]})[0] == 400
+    assert serve_search({"limit": ["0"]})[0] == 400
+    assert serve_search({"limit": ["100000"]})[0] == 400
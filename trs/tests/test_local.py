@@ -0,0 +1,118 @@
+import sys
+import threading
+import types
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.api.transcription.local import (
+    SAMPLE_RATE,
+    WINDOW_SAMPLES,
+    LocalTranscriber,
+)
+
+
+class _Pipeline:
+    """
+    Stands in for the faster-whisper batched pipeline: adjacent clips are
+    merged into chunks of up to a window, like its VAD chunking, and every
+    chunk is transcribed as the distinct 16-bit sample values it holds.
+    """
+
+    calls = []
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, clip_timestamps, **options):
+        chunks = []
+        for clip in clip_timestamps:
+            if chunks and clip["end"] - chunks[-1]["start"] <= WINDOW_SAMPLES:
+                chunks[-1]["end"] = clip["end"]
+            else:
+                chunks.append(dict(clip))
+        _Pipeline.calls.append((self.model, len(clip_timestamps)))
+
+        segments = [
+            SimpleNamespace(
+                start=chunk["start"] / SAMPLE_RATE + 0.5,
+                end=chunk["end"] / SAMPLE_RATE,
+                text=" "
+                + " ".join(
+                    str(round(value * 2**15))
+                    for value in np.unique(audio[chunk["start"] : chunk["end"]])
+                ),
+            )
+            for chunk in chunks
+        ]
+        return iter(segments), None
+
+
+@pytest.fixture
+def transcriber(monkeypatch):
+    module = types.ModuleType("faster_whisper")
+    module.BatchedInferencePipeline = _Pipeline
+    module.WhisperModel = lambda model, **options: model
+    monkeypatch.setitem(sys.modules, "faster_whisper", module)
+    _Pipeline.calls = []
+    return LocalTranscriber("base", batch_size=8, batch_wait=0.5)
+
+
+def _samples(value: int, seconds: float) -> np.ndarray:
+    return np.full(int(seconds * SAMPLE_RATE), value, "<i2")
+
+
+def _request(transcriber: LocalTranscriber, value: int, seconds: float):
+    return transcriber.prepare(_samples(value, seconds)), "base", None
+
+
+def test_segments_are_mapped_to_their_request(transcriber):
+    results = transcriber._transcribe(
+        "base", [_request(transcriber, 1, 45), _request(transcriber, 2, 20)]
+    )
+
+    assert results == [
+        [
+            {"number": 1, "start": 0.5, "end": 30.0, "text": "1"},
+            {"number": 2, "start": 30.5, "end": 45.0, "text": "1"},
+        ],
+        [{"number": 1, "start": 0.5, "end": 20.0, "text": "2"}],
+    ]
+
+
+def test_short_requests_are_not_decoded_together(transcriber):
+    requests = [
+        _request(transcriber, value, seconds)
+        for value, seconds in ((1, 10), (2, 10), (3, 30))
+    ]
+    results = transcriber._transcribe("base", requests)
+
+    assert [[s["text"] for s in segments] for segments in results] == [
+        ["1"],
+        ["2"],
+        ["3"],
+    ]
+    assert [s["end"] for segments in results for s in segments] == [10, 10, 30]
+    assert _Pipeline.calls == [("base", 3)]
+
+
+def test_concurrent_requests_are_batched_per_model(transcriber):
+    results = {}
+
+    def transcribe(value: int, model: str):
+        audio = transcriber.prepare(_samples(value, 5))
+        results[value] = transcriber.transcribe_prepared(audio, model)
+
+    threads = [
+        threading.Thread(target=transcribe, args=(value, model))
+        for value, model in ((1, None), (2, None), (3, "tiny"))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(_Pipeline.calls) == [("base", 2), ("tiny", 1)]
+    for value in (1, 2, 3):
+        assert results[value][0]["text"] == str(value)
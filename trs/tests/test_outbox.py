@@ -0,0 +1,102 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.mq.client import RabbitMQPublisher
+
+
+class _Broker:
+    """
+    Stand-in for the connected RabbitMQ client, recording committed messages.
+    """
+
+    def __init__(self, stop: threading.Event):
+        self.committed: list[tuple[str, str]] = []
+        self._pending: list[tuple[str, str]] = []
+        self.channel = SimpleNamespace(tx_commit=self._commit)
+        # Called once the outbox is empty
+        self.connection = SimpleNamespace(
+            process_data_events=lambda time_limit: stop.set()
+        )
+
+    def publish(self, queue_name: str, message: str) -> None:
+        self._pending.append((queue_name, message))
+
+    def _commit(self) -> None:
+        self.committed += self._pending
+        self._pending = []
+
+
+def _flush(publisher: RabbitMQPublisher) -> _Broker:
+    broker = _Broker(publisher._stop)
+    publisher._mq = broker
+    publisher._flush()
+    publisher._stop.clear()
+    return broker
+
+
+def _ack(publisher: RabbitMQPublisher, count: int) -> None:
+    with publisher._lock:
+        for _ in range(count):
+            publisher._outbox.popleft()
+        publisher._ack_outbox(count)
+
+
+def test_outbox_is_replayed_after_a_restart(tmp_path):
+    path = tmp_path / "missing" / "outbox.jsonl"
+    publisher = RabbitMQPublisher(str(path), batch_size=2)
+    for i in range(5):
+        publisher.publish("events", f"message {i}", "main")
+
+    restarted = RabbitMQPublisher(str(path), batch_size=2)
+    assert len(restarted) == 5
+    broker = _flush(restarted)
+    assert broker.committed == [("events", f"message {i}") for i in range(5)]
+    assert len(restarted) == 0
+    assert path.read_text() == ""
+    assert len(RabbitMQPublisher(str(path))) == 0
+    assert REGISTRY.get_sample_value(
+        "trs_publish_seconds_count", {"flow": "main"}
+    ) == pytest.approx(5)
+
+
+def test_acknowledged_messages_are_not_replayed(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    publisher = RabbitMQPublisher(str(path))
+    for i in range(10):
+        publisher.publish("events", f"message {i}")
+    _ack(publisher, 2)
+    _ack(publisher, 1)
+    publisher.publish("events", "message 10")
+
+    restarted = RabbitMQPublisher(str(path))
+    assert [entry[:2] for entry in restarted._outbox] == [
+        ("events", f"message {i}") for i in range(3, 11)
+    ]
+
+
+def test_outbox_file_stays_proportional_to_the_outbox(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    publisher = RabbitMQPublisher(str(path))
+    for i in range(100):
+        publisher.publish("events", f"message {i}")
+    for _ in range(99):
+        _ack(publisher, 1)
+        publisher.publish("events", "more")
+        lines = path.read_text().count("\n")
+        assert lines <= 2 * len(publisher) + 2
+
+    assert len(RabbitMQPublisher(str(path))) == len(publisher)
+
+
+def test_a_line_cut_short_by_a_crash_is_skipped(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    path.write_text(
+        json.dumps(["events", "a"]) + "\n" + json.dumps(["events", "b"])[:7]
+    )
+
+    outbox = RabbitMQPublisher(str(path))._outbox
+    assert [entry[:2] for entry in outbox] == [("events", "a")]
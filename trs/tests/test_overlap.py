@@ -0,0 +1,45 @@
+from src.stream.overlap import drop_overlap
+
+
+def _segment(start: float, end: float, text: str) -> dict:
+    return {"number": 1, "start": start, "end": end, "text": text}
+
+
+PREVIOUS = [_segment(20.0, 28.0, "The minister said that talks, will resume")]
+
+
+def test_repeated_words_are_dropped_within_a_segment():
+    segments = [
+        _segment(0.0, 3.0, "talks will Resume. On Monday in Geneva"),
+        _segment(3.0, 5.0, "Weather next."),
+    ]
+
+    assert drop_overlap(PREVIOUS, segments, overlap=2.0) == [
+        _segment(0.0, 3.0, "On Monday in Geneva"),
+        _segment(3.0, 5.0, "Weather next."),
+    ]
+
+
+def test_segments_repeated_entirely_are_dropped():
+    segments = [
+        _segment(0.0, 1.5, "will resume"),
+        _segment(1.5, 4.0, "on Monday"),
+    ]
+
+    assert drop_overlap(PREVIOUS, segments, overlap=2.0) == [segments[1]]
+
+
+def test_without_a_match_segments_inside_the_overlap_are_dropped():
+    segments = [
+        _segment(0.0, 1.5, "garbled"),
+        _segment(1.0, 4.0, "on Monday"),
+    ]
+
+    assert drop_overlap(PREVIOUS, segments, overlap=2.0) == [segments[1]]
+
+
+def test_nothing_is_dropped_without_an_overlap():
+    segments = [_segment(0.0, 1.5, "will resume")]
+
+    assert drop_overlap(PREVIOUS, segments, overlap=0) == segments
+    assert drop_overlap([], segments, overlap=2.0) == segments
@@ -0,0 +1,78 @@
+import threading
+
+from src.stream.pipeline import Reorderer, Stage, StageQueue
+
+
+def test_put_or_drop_oldest_keeps_the_newest_items():
+    queue = StageQueue("test", maxsize=3)
+    for i in range(5):
+        queue.put_or_drop_oldest(i)
+
+    assert [queue.get_nowait() for _ in range(3)] == [2, 3, 4]
+    assert queue.dropped == 2
+
+
+def test_put_until_gives_up_once_stopped():
+    queue = StageQueue("test", maxsize=1)
+    stop = threading.Event()
+    assert queue.put_until(1, stop)
+
+    threading.Timer(0.1, stop.set).start()
+    assert not queue.put_until(2, stop)
+    assert queue.get_nowait() == 1
+
+
+def test_get_until_waits_for_an_item_or_the_stop():
+    queue = StageQueue("test", maxsize=1)
+    stop = threading.Event()
+    threading.Timer(0.1, queue.put, (1,)).start()
+    assert queue.get_until(stop) == 1
+
+    threading.Timer(0.1, stop.set).start()
+    assert queue.get_until(stop) is None
+
+
+def test_failing_stage_stops_the_pipeline():
+    stop = threading.Event()
+    steps = []
+
+    def step():
+        steps.append(None)
+        if len(steps) == 3:
+            raise ValueError("broken")
+
+    idle = Stage("idle", lambda: stop.wait(0.01), stop)
+    failing = Stage("failing", step, stop)
+    idle.start()
+    failing.start()
+    idle.join(5)
+    failing.join(5)
+
+    assert stop.is_set()
+    assert idle.error is None
+    assert isinstance(failing.error, ValueError)
+    assert len(steps) == 3
+
+
+def test_reorderer_restores_the_stream_order():
+    reorderer = Reorderer()
+    reorderer.push(2, "c")
+    reorderer.push(1, "b")
+    assert reorderer.pop() is None
+
+    reorderer.push(0, "a")
+    assert [reorderer.pop() for _ in range(4)] == ["a", "b", "c", None]
+    assert not reorderer
+
+
+def test_reorderer_passes_over_skipped_positions():
+    reorderer = Reorderer()
+    reorderer.push(2, "c")
+    reorderer.skip(1)
+    reorderer.skip(0)
+
+    assert reorderer.pop() == "c"
+    reorderer.skip(3)
+    reorderer.push(4, "e")
+    assert reorderer.pop() == "e"
+    assert len(reorderer) == 0
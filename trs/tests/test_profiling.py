@@ -0,0 +1,43 @@
+import threading
+import time
+import tracemalloc
+
+from src.profiling import Profiler
+
+
+def _wait(profiler: Profiler) -> None:
+    # The profiles are written after the window is closed
+    for thread in threading.enumerate():
+        if thread.name == "profiler":
+            thread.join(10)
+    assert not profiler.active
+
+
+def test_memory_growth_is_traced_during_the_window_only(tmp_path):
+    profiler = Profiler(str(tmp_path), duration=0.5, interval=0.01)
+    assert not tracemalloc.is_tracing()
+
+    assert profiler.trigger()
+    while not tracemalloc.is_tracing():
+        time.sleep(0.01)
+    # Allocated during the window, kept alive past its end
+    kept = [bytearray(1000) for _ in range(1000)]
+    _wait(profiler)
+
+    assert not tracemalloc.is_tracing()
+    (memory,) = tmp_path.glob("*-memory.txt")
+    lines = memory.read_text().splitlines()
+    assert lines[0] == "Heap growth by line during the window"
+    assert "test_profiling.py" in lines[1]
+    assert len(kept) == 1000
+
+
+def test_tracing_started_elsewhere_is_left_on(tmp_path):
+    profiler = Profiler(str(tmp_path), duration=0.05, interval=0.01)
+    tracemalloc.start()
+    try:
+        assert profiler.trigger()
+        _wait(profiler)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
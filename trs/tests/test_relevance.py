@@ -0,0 +1,45 @@
+from src.stream.relevance import KeywordScorer, RelevanceFilter
+
+RULES = {r"\bgoals?\b": 1, "penalty|red card": 2}
+
+
+def test_every_matching_rule_counts_once():
+    scorer = KeywordScorer(RULES)
+
+    assert scorer.score("A quiet first half") == 0
+    assert scorer.score("Goal! And another goal!") == 1
+    assert scorer.score("A RED CARD after the goal") == 3
+
+
+def test_text_is_accumulated_until_it_is_relevant():
+    relevance = RelevanceFilter(KeywordScorer(RULES), 2, 1000)
+
+    assert not relevance.check("Kick-off.")
+    assert not relevance.check("Early goal for the hosts.")
+    assert not relevance.check("Another goal!")
+    assert relevance.check("Penalty!")
+    # The accumulated text starts over once the analyzer is called
+    assert not relevance.check("Another goal!")
+    assert relevance.skipped == 4
+
+
+def test_enough_pending_text_calls_the_analyzer():
+    relevance = RelevanceFilter(KeywordScorer(RULES), 2, 20)
+
+    assert not relevance.check("Kick-off.")
+    assert relevance.check("The ball is in midfield.")
+
+
+def test_the_analyzer_is_called_after_a_wait_verdict():
+    relevance = RelevanceFilter(KeywordScorer(RULES), 2, 1000)
+    relevance.expect_more()
+
+    assert relevance.check("Kick-off.")
+    assert not relevance.check("Kick-off.")
+
+
+def test_no_scorer_disables_the_filter():
+    relevance = RelevanceFilter(None, 2, 1000)
+
+    assert relevance.check("Kick-off.")
+    assert relevance.skipped == 0
@@ -0,0 +1,61 @@
+import pytest
+from requests import (
+    ConnectionError,
+    ConnectTimeout,
+    HTTPError,
+    ReadTimeout,
+    Response,
+)
+
+from src.api.utils import retry_on_transient_error
+from src.config import settings
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_RETRY_BACKOFF", 0)
+    monkeypatch.setattr(settings, "HTTP_MAX_RETRIES", 3)
+
+
+def _http_error(status: int) -> HTTPError:
+    response = Response()
+    response.status_code = status
+    return HTTPError(f"{status} Error", response=response)
+
+
+def _failing(error: Exception, failures: int = 100):
+    calls = []
+
+    @retry_on_transient_error
+    def post():
+        calls.append(None)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+
+    return post, calls
+
+
+@pytest.mark.parametrize(
+    "error",
+    [ConnectionError(), ConnectTimeout(), _http_error(503), _http_error(429)],
+)
+def test_transient_errors_are_retried(error):
+    post, calls = _failing(error, failures=2)
+    assert post() == "ok"
+    assert len(calls) == 3
+
+
+def test_retries_are_limited():
+    post, calls = _failing(_http_error(502))
+    with pytest.raises(HTTPError):
+        post()
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize("error", [ReadTimeout(), _http_error(400)])
+def test_read_timeouts_and_client_errors_are_not_retried(error):
+    post, calls = _failing(error)
+    with pytest.raises(type(error)):
+        post()
+    assert len(calls) == 1
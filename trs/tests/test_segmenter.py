@@ -0,0 +1,101 @@
+import io
+
+import numpy as np
+import pytest
+
+from src.stream.services import StreamService
+
+SAMPLE_RATE = 16000
+
+
+def _service(max_segment_duration: float = 60) -> StreamService:
+    # Only the segmenter runs, no stream or backend is reached
+    return StreamService(
+        "test",
+        queue_size=64,
+        buffer_duration=900,
+        max_segment_duration=max_segment_duration,
+        archive=False,
+        subtitles=False,
+        index=False,
+        stream=object(),
+        publisher=object(),
+        cache=None,
+    )
+
+
+def _audio(*parts: tuple[str, float]) -> bytes:
+    rng = np.random.default_rng(0)
+    samples = []
+    for kind, seconds in parts:
+        size = int(seconds * SAMPLE_RATE)
+        if kind == "speech":
+            samples.append(rng.integers(-3000, 3000, size))
+        else:
+            samples.append(np.zeros(size, dtype=int))
+    return np.concatenate(samples).astype("<i2").tobytes()
+
+
+def _read(service: StreamService, audio: bytes, notifications: int) -> None:
+    """
+    Read the audio into the buffer at once. With fewer notifications than
+    chunks, the segmenter catches up like after dropped notifications.
+    """
+    service._time = 1000.0
+    service._remaining_bytes.readinto(io.BytesIO(audio), len(audio))
+    for _ in range(notifications):
+        service._chunks.put_nowait(len(audio) // notifications)
+
+
+def _durations(service: StreamService) -> list[float]:
+    durations = []
+    while not service._segments.empty():
+        durations.append(service._segments.get_nowait()["duration"])
+    return durations
+
+
+def test_silence_split_keeps_splitting_past_the_maximum():
+    service = _service()
+    _read(service, _audio(("speech", 20), ("silence", 1), ("speech", 310)), 1)
+
+    service._segment()
+
+    durations = _durations(service)
+    assert durations[0] == 20.5
+    assert max(durations) <= 60
+    assert len(service._detector) <= 60_000
+
+
+def test_audio_without_silence_is_split_at_the_maximum():
+    service = _service()
+    _read(service, _audio(("speech", 200)), 1)
+
+    service._segment()
+
+    assert max(_durations(service)) <= 60
+    assert len(service._detector) <= 60_000
+
+
+def test_short_audio_waits_for_a_silence():
+    service = _service()
+    _read(service, _audio(("speech", 30)), 1)
+
+    service._segment()
+
+    assert _durations(service) == []
+    assert len(service._detector) == 30_000
+
+
+def test_gap_flushes_the_backlog_in_bounded_segments():
+    service = _service()
+    _read(service, _audio(("speech", 100), ("silence", 1), ("speech", 230)), 0)
+    service._chunks.put_nowait({"duration": 5.0})
+
+    service._segment()
+
+    durations = _durations(service)
+    assert max(durations) <= 60
+    assert len(service._detector) == 0
+    # Forced splits overlap, the timeline only moves past the audio and the gap
+    assert service._time == pytest.approx(1000.0 + 331 + 5)
+    assert service._flushed.is_set()
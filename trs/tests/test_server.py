@@ -0,0 +1,25 @@
+from urllib.request import urlopen
+
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from src.metrics import STAGE_SECONDS
+from src.server import Server
+
+
+def test_metrics_are_served_in_the_prometheus_format():
+    STAGE_SECONDS.labels("main", "transcription").observe(0.3)
+    server = Server("127.0.0.1", 0)
+    server.start()
+    try:
+        host, port = server._server.server_address
+        with urlopen(f"http://{host}:{port}/metrics") as response:
+            content_type = response.headers["Content-Type"]
+            body = response.read().decode()
+    finally:
+        server.close()
+
+    assert content_type == CONTENT_TYPE_LATEST
+    assert (
+        'trs_stage_seconds_bucket{flow="main",le="0.5",stage="transcription"}'
+        in body
+    )
@@ -0,0 +1,133 @@
+import io
+import time
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+from requests.exceptions import ChunkedEncodingError, ReadTimeout
+
+from src.stream.relevance import KeywordScorer
+from src.stream.services import StreamService
+
+SAMPLE_RATE = 16000
+
+
+class _TranscriptionClient:
+    def prepare(self, audio_bytes, sample_rate, codec):
+        return bytes(audio_bytes)
+
+    def transcribe_prepared(self, audio):
+        raise ReadTimeout("read timed out")
+
+
+class _AIClient:
+    def chat_completions(self, model, messages, system=""):
+        raise ReadTimeout("read timed out")
+
+    def stream_chat_completions(self, model, messages):
+        yield "`"
+        raise ChunkedEncodingError("connection broken")
+
+
+def _service(
+    streaming: bool = False, vad: bool = False, **options
+) -> StreamService:
+    # No stream or message broker is reached
+    return StreamService(
+        "test",
+        archive=False,
+        subtitles=False,
+        index=False,
+        vad=vad,
+        adaptive=False,
+        streaming=streaming,
+        stream=object(),
+        publisher=object(),
+        cache=None,
+        ai_client=_AIClient(),
+        transcription_client=_TranscriptionClient(),
+        **options,
+    )
+
+
+def _chunk(service: StreamService, audio: bytes, index: int = 0) -> dict:
+    service._remaining_bytes.readinto(io.BytesIO(audio), len(audio))
+    return {
+        "index": index,
+        "audio": service._remaining_bytes.take(len(audio)),
+        "start": 1000.0 + 10 * index,
+        "duration": len(audio) / SAMPLE_RATE / 2,
+        "overlap": 0.0,
+    }
+
+
+def test_failed_transcription_leaves_an_empty_transcript():
+    service = _service()
+    service._segments.put_nowait(_chunk(service, bytes(10 * SAMPLE_RATE * 2)))
+
+    service._transcribe()
+
+    transcript = service._transcripts.get_nowait()
+    assert transcript["index"] == 0
+    assert transcript["segments"] == []
+    assert service._remaining_bytes.leased == 0
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_failed_analyzer_request_gives_no_verdict(streaming):
+    service = _service(streaming)
+    service._messages.append(
+        {"content": "[0.00 - 2.00] Kick-off.", "start": 0.0, "end": 2.0}
+    )
+
+    assert service._verdict(2.0) is None
+
+
+def test_relevant_segment_skipped_by_shedding_is_analyzed_next():
+    service = _service(
+        shed_lag_threshold=60,
+        relevance_scorer=KeywordScorer({"goal": 1}),
+        relevance_threshold=1,
+    )
+    analyzed = []
+    service._verdict = lambda duration: analyzed.append(duration) or "-"
+    start = time.time() - 100
+    service._shedder.update(start)
+    for index, text in enumerate(["Goal!", "Kick-off.", "Kick-off."]):
+        service._transcripts.put_nowait(
+            {
+                "index": index,
+                "segments": [{"number": 1, "start": 0, "end": 5, "text": text}],
+                "start": start + 10 * index,
+                "duration": 10.0,
+                "overlap": 0.0,
+            }
+        )
+
+    for _ in range(3):
+        service._analyze()
+
+    # The goal is shed, then analyzed with the next segment
+    assert len(analyzed) == 1
+    assert service._shedder.counts == {"skip_analysis": 1}
+    assert service._relevance.skipped == 1
+
+
+def test_speech_ratio_is_exported_per_flow():
+    service = _service(vad=True, name="speech-ratio")
+    t = np.arange(10 * SAMPLE_RATE) / SAMPLE_RATE
+    tones = sum(np.sin(2 * np.pi * f * t) for f in (500, 1000, 1500))
+    # 200 ms syllables separated by 100 ms pauses
+    syllables = tones * np.resize(
+        np.repeat([1, 1, 0], SAMPLE_RATE // 10), len(t)
+    )
+    speech = (syllables * 3000).astype("<i2").tobytes()
+
+    assert service._is_speech(_chunk(service, speech, 0))
+    assert not service._is_speech(_chunk(service, bytes(len(speech)), 1))
+
+    assert service.speech_ratio() == 0.5
+    assert (
+        REGISTRY.get_sample_value("trs_speech_ratio", {"flow": "speech-ratio"})
+        == 0.5
+    )
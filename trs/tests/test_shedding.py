@@ -0,0 +1,41 @@
+import time
+
+from prometheus_client import REGISTRY
+
+from src.stream.shedding import LoadShedder
+
+
+def test_every_threshold_crossed_enables_a_tier():
+    shedder = LoadShedder(threshold=60, name="shedding")
+    now = time.time()
+
+    assert shedder.update(now - 10) == 0
+    assert shedder.update(now - 70) == 1
+    assert shedder.update(now - 130) == 2
+    assert shedder.update(now - 600) == 3
+    assert shedder.update(now + 5) == 0
+    assert shedder.lag == 0
+
+
+def test_zero_threshold_disables_shedding():
+    shedder = LoadShedder(threshold=0)
+
+    assert shedder.update(time.time() - 600) == 0
+    assert shedder.tier == 0
+    assert shedder.lag >= 600
+
+
+def test_shed_decisions_are_counted():
+    shedder = LoadShedder(threshold=60, name="shed-counts")
+    shedder.shed(LoadShedder.DROP_AUDIO, 30)
+    shedder.shed(LoadShedder.DROP_AUDIO, 30)
+    shedder.shed(LoadShedder.SKIP_ANALYSIS, 30)
+
+    assert shedder.counts == {"drop_audio": 2, "skip_analysis": 1}
+    assert (
+        REGISTRY.get_sample_value(
+            "trs_shed_decisions_total",
+            {"flow": "shed-counts", "decision": "drop_audio"},
+        )
+        == 2
+    )
@@ -0,0 +1,45 @@
+from src.stream.subtitles import SubtitleWriter
+
+START = 1_700_000_000.0
+
+
+def _playlist(writer: SubtitleWriter) -> list[str]:
+    return (writer._directory / "subtitles.m3u8").read_text().splitlines()
+
+
+def test_cues_go_to_the_segment_they_start_in(tmp_path):
+    writer = SubtitleWriter(tmp_path / "flow", segment_duration=10)
+    writer.write(START, START + 12, [(START + 1, START + 4, "a < b")])
+    writer.write(START + 12, START + 25, [(START + 12, START + 14, "c")])
+
+    first = (tmp_path / "flow" / "0.vtt").read_text()
+    assert "00:00:01.000 --> 00:00:04.000\na &lt; b\n" in first
+    second = (tmp_path / "flow" / "1.srt").read_text()
+    assert second == "1\n00:00:12,000 --> 00:00:14,000\nc\n\n"
+    assert [line for line in _playlist(writer) if line.endswith(".vtt")] == [
+        "0.vtt",
+        "1.vtt",
+    ]
+
+
+def test_close_ends_the_playlist(tmp_path):
+    writer = SubtitleWriter(tmp_path / "flow", segment_duration=10)
+    writer.write(START, START + 5, [(START + 1, START + 2, "a")])
+    writer.close()
+
+    lines = _playlist(writer)
+    assert lines[-2:] == ["0.vtt", "#EXT-X-ENDLIST"]
+
+
+def test_write_after_close_starts_a_new_segment(tmp_path):
+    writer = SubtitleWriter(tmp_path / "flow", segment_duration=10)
+    writer.write(START, START + 5, [(START + 1, START + 2, "a")])
+    writer.close()
+    writer.write(START + 6, START + 8, [(START + 6, START + 7, "b")])
+    writer.close()
+
+    lines = _playlist(writer)
+    assert lines.count("#EXT-X-ENDLIST") == 1
+    assert "0.vtt" in lines
+    assert lines[-2:] == ["1.vtt", "#EXT-X-ENDLIST"]
+    assert "b" in (tmp_path / "flow" / "1.vtt").read_text()
@@ -0,0 +1,81 @@
+import threading
+
+from src.stream import supervisor
+from src.stream.supervisor import FlowSupervisor
+
+
+class _Publisher:
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _Service:
+    """
+    Stand-in for StreamService: flow "broken" crashes twice and flow
+    "misconfigured" fails to start once, then they run like the others
+    until stopped.
+    """
+
+    started: list[str] = []
+    created: list[str] = []
+
+    def __init__(self, flow: str, name: str, **shared):
+        _Service.created.append(name)
+        if name == "misconfigured" and _Service.created.count(name) == 1:
+            raise OSError("Permission denied: 'archive/misconfigured'")
+        self.name = name
+        self.shared = shared
+        self._stop = threading.Event()
+
+    def process(self) -> None:
+        _Service.started.append(self.name)
+        if _Service.started.count(self.name) <= 2 and self.name == "broken":
+            raise RuntimeError("Stage broken:reader failed")
+        self._stop.wait()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def test_crashed_flow_is_restarted_without_affecting_the_others(
+    monkeypatch,
+):
+    monkeypatch.setattr(supervisor, "StreamService", _Service)
+    monkeypatch.setattr(supervisor, "RabbitMQPublisher", _Publisher)
+    monkeypatch.setattr(_Service, "started", [])
+    monkeypatch.setattr(_Service, "created", [])
+    flows = FlowSupervisor(
+        {
+            "broken": "udp://a",
+            "healthy": "udp://b",
+            "misconfigured": "udp://c",
+        },
+        restart_delay=0.01,
+        restart_max_delay=0.1,
+    )
+    thread = threading.Thread(target=flows.run)
+    thread.start()
+    try:
+        for _ in range(500):
+            if (
+                _Service.started.count("broken") == 3
+                and "misconfigured" in _Service.started
+            ):
+                break
+            threading.Event().wait(0.01)
+    finally:
+        flows.stop()
+        thread.join(5)
+
+    assert not thread.is_alive()
+    assert _Service.started.count("broken") == 3
+    assert _Service.started.count("healthy") == 1
+    assert _Service.created.count("misconfigured") == 2
+    assert _Service.started.count("misconfigured") == 1
+    broken = flows._services["broken"]
+    healthy = flows._services["healthy"]
+    assert broken.shared["publisher"] is healthy.shared["publisher"]
+    assert broken.shared["executor"] is healthy.shared["executor"]
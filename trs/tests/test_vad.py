@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.stream.vad import SpeechDetector
+
+SAMPLE_RATE = 16000
+
+
+def _tones(seconds: float, *frequencies: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return sum(np.sin(2 * np.pi * f * t) for f in frequencies) * 3000
+
+
+def _syllables(audio: np.ndarray) -> np.ndarray:
+    # 200 ms syllables separated by 100 ms pauses
+    envelope = np.resize(np.repeat([1, 1, 0], SAMPLE_RATE // 10), len(audio))
+    return audio * envelope
+
+
+def _pcm(*parts: np.ndarray) -> bytes:
+    return np.concatenate(parts).astype("<i2").tobytes()
+
+
+def test_syllables_in_the_speech_band_are_speech():
+    detector = SpeechDetector()
+    speech = _syllables(_tones(10, 500, 1000, 1500))
+
+    assert detector.speech_ratio(_pcm(speech)) == 1
+    assert detector.speech_ratio(_pcm(speech, np.zeros(10 * SAMPLE_RATE))) == (
+        0.5
+    )
+
+
+def test_steady_tones_are_not_speech():
+    detector = SpeechDetector()
+
+    assert detector.speech_ratio(_pcm(_tones(10, 500, 1000, 1500))) == 0
+
+
+def test_sound_outside_the_speech_band_is_not_speech():
+    detector = SpeechDetector()
+
+    assert detector.speech_ratio(_pcm(_syllables(_tones(10, 80, 5000)))) == 0
+
+
+def test_silence_is_not_speech():
+    detector = SpeechDetector()
+
+    assert detector.speech_ratio(_pcm(np.zeros(10 * SAMPLE_RATE))) == 0
+
+
+def test_audio_shorter_than_a_second_is_assumed_to_be_speech():
+    detector = SpeechDetector()
+
+    assert detector.speech_ratio(_pcm(np.zeros(SAMPLE_RATE // 2))) == 1
+    assert detector.speech_ratio(memoryview(b"")) == 1
@@ -0,0 +1,70 @@
+import json
+from contextlib import closing
+
+from src.api import AIClient
+from src.stream.verdict import read_verdict
+
+
+def _tokens(tokens: list[str], consumed: list[str]):
+    for token in tokens:
+        consumed.append(token)
+        yield token
+
+
+def test_dash_and_wait_are_read_from_the_first_tokens():
+    consumed = []
+    assert read_verdict(_tokens([" -", " no", " event"], consumed)) == "-"
+    assert consumed == [" -"]
+
+    consumed = []
+    tokens = ["```", "\nW", "ai", "t", " for", " more"]
+    assert read_verdict(_tokens(tokens, consumed)) == "wait"
+    assert consumed == ["```", "\nW", "ai", "t"]
+
+
+def test_event_is_read_until_its_json_is_complete():
+    consumed = []
+    tokens = ["```json\n{", '"summary": ', "“a } b”", "}", "\n```", " extra"]
+
+    verdict = read_verdict(_tokens(tokens, consumed))
+
+    assert json.loads(verdict) == {"summary": "a } b"}
+    assert consumed == tokens[:4]
+
+
+def test_unparsable_answer_is_returned_whole():
+    assert read_verdict(["{", "broken", "}"]) == "{broken}"
+
+
+class _Response:
+    def __init__(self, lines: list[str]):
+        self._lines = lines
+        self.closed = False
+
+    def iter_lines(self, decode_unicode: bool):
+        yield from self._lines
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _event(content: str) -> str:
+    return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+def test_streamed_completion_is_cut_once_the_verdict_is_known(monkeypatch):
+    response = _Response(
+        [
+            ": keep-alive",
+            _event("-"),
+            "",
+            _event(" nothing here"),
+            "data: [DONE]",
+        ]
+    )
+    client = AIClient()
+    monkeypatch.setattr(client, "_post", lambda **kwargs: response)
+
+    with closing(client.stream_chat_completions("model", [])) as tokens:
+        assert read_verdict(tokens) == "-"
+    assert response.closed